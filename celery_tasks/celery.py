@@ -13,8 +13,9 @@ app = Celery('simple_rss')
 # 使用 Django settings 配置 Celery
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
-# 自动发现任务
+# 自动发现任务（celery_tasks 不在 INSTALLED_APPS 中，需要显式指定）
 app.autodiscover_tasks()
+app.autodiscover_tasks(['celery_tasks'])
 
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
@@ -1,29 +1,115 @@
 """
 Celery 定时任务定义
 """
+import base64
 import logging
-from datetime import datetime, timedelta
+import random
+from collections import defaultdict
+from datetime import timedelta
 from django.conf import settings
+from django.utils import timezone
 from celery import shared_task
 from core.models import Feed, Article
-from core.services.fetcher import RSSFetcher
-from core.services.parser import RSSParser
-from core.utils.article_utils import save_or_update_article
+from core.services import parse_pool, refresh_jobs, websub
+from core.services.fetcher import get_shared_fetcher
+from core.services.pipeline import FeedPipeline
 
 logger = logging.getLogger(__name__)
 
 
 @shared_task
 def fetch_all_feeds():
-    """抓取所有启用的订阅源"""
-    active_feeds = Feed.objects.filter(is_active=True)
-    logger.info(f"开始抓取 {active_feeds.count()} 个订阅源")
+    """抓取所有启用的订阅源，按批次分发给 fetch_feeds_batch 并发抓取"""
+    feed_ids = list(Feed.objects.filter(is_active=True).values_list('pk', flat=True))
+    logger.info(f"开始抓取 {len(feed_ids)} 个订阅源")
 
-    for feed in active_feeds:
+    batch_size = getattr(settings, 'FETCH_BATCH_SIZE', 50)
+    for i in range(0, len(feed_ids), batch_size):
+        batch = feed_ids[i:i + batch_size]
         try:
-            fetch_feed.delay(feed.pk)
+            fetch_feeds_batch.delay(batch)
         except Exception as e:
-            logger.error(f"启动抓取任务失败 {feed.title}: {e}")
+            logger.error(f"启动批量抓取任务失败 {batch}: {e}")
+
+
+@shared_task
+def schedule_due_feeds(limit: int = None):
+    """
+    分发到期的订阅源
+    按 next_fetch_at 范围扫描选出到期的订阅源，分批并带随机延迟分发，平滑抓取负载
+    """
+    limit = limit or getattr(settings, 'FETCH_SCHEDULE_LIMIT', 1000)
+    jitter = getattr(settings, 'FETCH_SCHEDULE_JITTER', 60)
+    batch_size = getattr(settings, 'FETCH_BATCH_SIZE', 50)
+    now = timezone.now()
+
+    due_feeds = list(
+        Feed.objects.filter(is_active=True, next_fetch_at__lte=now)
+        .order_by('next_fetch_at')
+        .values_list('pk', 'fetch_interval')[:limit]
+    )
+    if not due_feeds:
+        return 0
+
+    # 先把下次抓取时间推后一个间隔，避免任务执行前被下一轮调度重复分发
+    by_interval = defaultdict(list)
+    for pk, interval in due_feeds:
+        by_interval[interval].append(pk)
+    for interval, pks in by_interval.items():
+        Feed.objects.filter(pk__in=pks).update(next_fetch_at=now + timedelta(minutes=interval))
+
+    feed_ids = [pk for pk, _ in due_feeds]
+    for i in range(0, len(feed_ids), batch_size):
+        batch = feed_ids[i:i + batch_size]
+        try:
+            fetch_feeds_batch.apply_async((batch,), countdown=random.uniform(0, jitter))
+        except Exception as e:
+            logger.error(f"启动批量抓取任务失败 {batch}: {e}")
+
+    logger.info(f"分发 {len(feed_ids)} 个到期订阅源")
+    return len(feed_ids)
+
+
+@shared_task
+def fetch_feeds_batch(feed_ids: list):
+    """并发抓取一批订阅源"""
+    feeds = list(Feed.objects.filter(pk__in=feed_ids))
+    if not feeds:
+        return
+
+    fetcher = get_shared_fetcher()
+    before = fetcher.connection_stats()
+    FeedPipeline(fetcher=fetcher, parse_workers=parse_pool.get_workers()).run_many(feeds)
+    _log_connection_stats(fetcher, before)
+
+
+@shared_task
+def refresh_feeds_job(job_id: str):
+    """
+    手动刷新所有订阅源的后台任务
+    按批次并发抓取，每处理完一个订阅源就写入任务进度，供页面轮询展示
+    """
+    feeds = list(Feed.objects.filter(is_active=True))
+    refresh_jobs.start_job(job_id, total=len(feeds))
+
+    fetcher = get_shared_fetcher()
+    before = fetcher.connection_stats()
+    try:
+        # 手动刷新不计入命中率统计，也不改变自适应间隔和下次抓取时间
+        pipeline = FeedPipeline(fetcher=fetcher, auto=False, parse_workers=parse_pool.get_workers())
+        batch_size = getattr(settings, 'FETCH_BATCH_SIZE', 50)
+        for i in range(0, len(feeds), batch_size):
+            pipeline.run_many(
+                feeds[i:i + batch_size],
+                on_done=lambda context: refresh_jobs.add_result(job_id, context.result()),
+            )
+    except Exception as e:
+        logger.exception(f"刷新任务失败 {job_id}: {e}")
+        refresh_jobs.finish_job(job_id, status='failed')
+        raise
+
+    refresh_jobs.finish_job(job_id)
+    _log_connection_stats(fetcher, before)
 
 
 @shared_task
@@ -36,50 +122,53 @@ def fetch_feed(feed_id: int):
         return
 
     logger.info(f"开始抓取订阅源: {feed.title}")
+    feed.last_fetch_status = '抓取中'
+    # 抓取期间不再被 schedule_due_feeds 分发，完成后按结果重新计算
+    feed.next_fetch_at = timezone.now() + timedelta(minutes=feed.fetch_interval)
+    feed.save(update_fields=['last_fetch_status', 'next_fetch_at'])
 
-    # 抓取内容
-    fetcher = RSSFetcher()
-    response = fetcher.fetch(feed.url)
+    FeedPipeline().run(feed)
 
-    if not response:
-        feed.last_fetch_status = '抓取失败'
-        feed.save()
-        return
-
-    # 解析内容
-    parser = RSSParser()
-    feed_data = parser.parse(response['content'], response['encoding'])
 
-    if not feed_data:
-        feed.last_fetch_status = '解析失败'
-        feed.save()
+@shared_task
+def renew_websub_subscriptions():
+    """向 Hub 订阅新发现的订阅源、续订即将到期的订阅，并退订已停用的订阅源"""
+    if not websub.is_enabled():
         return
+    subscribed = unsubscribed = 0
+    for feed in websub.due_subscriptions():
+        subscribed += websub.request_subscription(feed)
+    for feed in websub.stale_subscriptions():
+        unsubscribed += websub.request_subscription(feed, mode=websub.MODE_UNSUBSCRIBE)
+    if subscribed or unsubscribed:
+        logger.info(f"WebSub 订阅请求 {subscribed} 个，退订请求 {unsubscribed} 个")
 
-    # 更新订阅源信息
-    if feed_data['title'] and feed_data['title'] != feed.title:
-        feed.title = feed_data['title']
-    if feed_data['description'] and not feed.description:
-        feed.description = feed_data['description']
 
-    feed.last_fetch_status = '成功'
-    feed.last_fetch_at = datetime.now()
-    feed.last_auto_fetch_at = datetime.now()
-    feed.save()
+@shared_task
+def ingest_websub_push(feed_id: int, payload: str, content_type: str = None):
+    """处理 Hub 推送的订阅源内容（payload 为 base64 编码的请求体）"""
+    try:
+        feed = Feed.objects.get(pk=feed_id)
+    except Feed.DoesNotExist:
+        logger.error(f"订阅源不存在: {feed_id}")
+        return
+    websub.ingest(feed, base64.b64decode(payload), content_type)
 
-    # 保存文章
-    new_articles = 0
-    for entry in feed_data['entries']:
-        is_new, _ = save_or_update_article(feed, entry)
-        if is_new:
-            new_articles += 1
 
-    logger.info(f"订阅源 {feed.title} 抓取完成，新增 {new_articles} 篇文章")
+def _log_connection_stats(fetcher, before):
+    """记录本次任务的连接复用情况"""
+    stats = fetcher.connection_stats(since=before)
+    if stats['requests']:
+        logger.info(
+            f"本次抓取发出 {stats['requests']} 个请求，新建 {stats['connections']} 个连接，"
+            f"复用率 {stats['reuse_rate']:.0%}"
+        )
 
 
 @shared_task
 def cleanup_old_articles(days: int = 30):
     """清理旧文章"""
-    cutoff_date = datetime.now() - timedelta(days=days)
+    cutoff_date = timezone.now() - timedelta(days=days)
     deleted_count = Article.objects.filter(created_at__lt=cutoff_date).delete()[0]
     logger.info(f"清理了 {deleted_count} 篇旧文章")
 
@@ -111,6 +111,67 @@ LOGOUT_REDIRECT_URL = '/'
 
 # CloudFlare 代理配置（示例）
 CLOUDFLARE_PROXY_DOMAIN = None  # 在 local_settings.py 中配置
+# 多个 Worker 组成代理池（配置后忽略 CLOUDFLARE_PROXY_DOMAIN）
+# 元素为域名或 {'domain': ..., 'weight': ...}
+CLOUDFLARE_PROXY_DOMAINS = []
+FETCH_PROXY_STRATEGY = 'weighted'  # weighted（按权重随机）或 least_latency（最低延迟）
+FETCH_PROXY_FAILURE_THRESHOLD = 3  # 代理连续连接失败/超时次数达到后暂停使用
+FETCH_PROXY_COOLDOWN = 60  # 代理暂停使用的时长（秒）
+
+# 并发抓取配置
+FETCH_MAX_CONCURRENCY = 20  # 全局最大并发请求数
+FETCH_PER_HOST_CONCURRENCY = 2  # 同一主机最大并发请求数
+FETCH_POOL_CONNECTIONS = 100  # 连接池缓存的主机数
+# 每个主机保留的空闲连接数（使用代理域名时所有请求共用一个主机，不应小于全局并发数）
+FETCH_POOL_MAXSIZE = 20
+FETCH_CONNECT_RETRIES = 2  # 建立连接失败时的重试次数（已发出的请求不重试）
+FETCH_RETRY_BACKOFF = 0.5  # 连接重试的退避系数（秒）
+FETCH_MAX_BYTES = 10 * 1024 * 1024  # 单个订阅源响应内容上限（解压后字节数），超过时放弃抓取
+FETCH_CHUNK_SIZE = 64 * 1024  # 流式下载的分块大小（字节）
+FETCH_BATCH_SIZE = 50  # 定时任务每批并发抓取的订阅源数量
+FETCH_SCHEDULE_LIMIT = 1000  # 每轮调度最多分发的到期订阅源数量
+FETCH_SCHEDULE_JITTER = 60  # 分发时的随机延迟上限（秒）
+FEED_REFRESH_JOB_TTL = 30 * 60  # 手动刷新任务进度的保留时间（秒）
+
+# 单主机限速（令牌桶）：同一主机连续放行 BURST 个请求后，按每秒 RATE 个请求均匀放行
+FETCH_HOST_RATE = 1.0  # 每个主机每秒请求数，0 表示不限速
+FETCH_HOST_BURST = 3  # 允许连续发出的请求数
+FETCH_HOST_MAX_WAIT = 60  # 单个请求最长等待时间（秒），超过时跳过本次抓取
+FETCH_RATE_LIMIT_REDIS_URL = None  # 配置后由所有 worker 共享限速状态，否则按进程限速
+
+# 失败退避与熔断
+FETCH_BACKOFF_MAX_INTERVAL = 24 * 60  # 连续失败时抓取间隔按 2 的幂延长，最长间隔（分钟）
+FETCH_CIRCUIT_THRESHOLD = 5  # 同一主机连续连接失败/超时/5xx 次数达到后熔断
+FETCH_CIRCUIT_COOLDOWN = 5 * 60  # 首次熔断时长（秒），之后每次探测失败翻倍
+FETCH_CIRCUIT_MAX_COOLDOWN = 6 * 60 * 60  # 最长熔断时长（秒）
+FEED_DEACTIVATE_AFTER_DAYS = 14  # 持续失败超过该天数后自动停用订阅源，0 表示不停用
+
+# WebSub 推送订阅：订阅源声明 Hub 时向 Hub 订阅，更新由 Hub 推送到回调地址
+WEBSUB_CALLBACK_BASE_URL = None  # 外部可访问的站点地址（如 https://reader.example.com），未配置时不订阅
+WEBSUB_LEASE_SECONDS = 7 * 24 * 60 * 60  # 申请的订阅租约（秒），以 Hub 验证时返回的为准
+WEBSUB_RENEW_MARGIN = 6 * 60 * 60  # 租约到期前多久续订（秒）
+WEBSUB_RETRY_DELAY = 60 * 60  # 订阅失败、被拒绝或验证超时后多久重试（秒）
+WEBSUB_POLL_INTERVAL = 24 * 60  # 订阅生效后的兜底轮询间隔（分钟）
+
+# 自适应抓取间隔配置（订阅源启用 adaptive_interval 时生效）
+FETCH_ADAPTIVE_MIN_INTERVAL = 15  # 最小间隔（分钟）
+FETCH_ADAPTIVE_MAX_INTERVAL = 24 * 60  # 最大间隔（分钟）
+FETCH_ADAPTIVE_SAMPLE_SIZE = 20  # 用于估算发布频率的最近文章数
+FETCH_ADAPTIVE_FACTOR = 0.5  # 抓取间隔 = 平均发布间隔 × 系数
+
+# 文章列表摘要预览长度（字符）
+ARTICLE_EXCERPT_LENGTH = 200
+
+# 格式良好的 RSS 2.0 / Atom 使用流式解析（安装 lxml 后自动使用 lxml），失败时回退到 feedparser
+FEED_FAST_PARSER = True
+
+# 增量解析：跳过已知文章，连续遇到 N 篇已知文章后停止解析（fetch_feed --force 时完整解析）
+FEED_INCREMENTAL_PARSE = True
+FEED_INCREMENTAL_STOP_AFTER = 3
+FEED_KNOWN_GUIDS_LIMIT = 200  # 加载最近多少篇文章的 guid 作为已知集合
+
+# 批量刷新时的解析进程数，0 表示在当前进程解析（可按 CPU 核心数配置）
+FEED_PARSE_WORKERS = 0
 
 # 翻译服务配置（示例）
 TRANSLATION_API_URL = None  # 在 local_settings.py 中配置
@@ -53,6 +53,9 @@ CACHES = {
     }
 }
 
+# 单主机限速状态由所有 worker 通过 Redis 共享
+FETCH_RATE_LIMIT_REDIS_URL = f'redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}'
+
 # Celery 配置（开发环境使用 Redis）
 CELERY_BROKER_URL = f'redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}'
 CELERY_RESULT_BACKEND = f'redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}'
@@ -65,3 +68,15 @@ CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 分钟
 CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 CELERY_WORKER_MAX_TASKS_PER_CHILD = 1000
+
+# Celery Beat 定时任务
+CELERY_BEAT_SCHEDULE = {
+    'schedule-due-feeds': {
+        'task': 'celery_tasks.tasks.schedule_due_feeds',
+        'schedule': 60.0,  # 每分钟检查一次到期的订阅源
+    },
+    'renew-websub-subscriptions': {
+        'task': 'celery_tasks.tasks.renew_websub_subscriptions',
+        'schedule': 600.0,  # 每 10 分钟订阅新发现的 Hub 并续订即将到期的订阅
+    },
+}
@@ -4,9 +4,16 @@ from .models import Feed, Article, Category
 
 @admin.register(Feed)
 class FeedAdmin(admin.ModelAdmin):
-    list_display = ['title', 'url', 'category', 'is_active', 'created_at', 'updated_at']
-    list_filter = ['category', 'is_active', 'created_at']
+    list_display = [
+        'title', 'url', 'category', 'is_active', 'adaptive_interval', 'next_fetch_at',
+        'fetch_count', 'hit_count', 'unchanged_count', 'failure_count', 'last_error',
+        'websub_state', 'created_at', 'updated_at',
+    ]
+    list_filter = [
+        'category', 'is_active', 'adaptive_interval', 'proxy_mode', 'websub_state', 'created_at',
+    ]
     search_fields = ['title', 'url', 'description']
+    readonly_fields = ['websub_secret']
     date_hierarchy = 'created_at'
     ordering = ['-created_at']
 
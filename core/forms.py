@@ -10,7 +10,10 @@ class FeedForm(forms.ModelForm):
 
     class Meta:
         model = Feed
-        fields = ['title', 'url', 'description', 'category', 'is_active', 'fetch_interval']
+        fields = [
+            'title', 'url', 'description', 'category', 'is_active', 'fetch_interval',
+            'adaptive_interval', 'proxy_mode',
+        ]
         widgets = {
             'description': forms.Textarea(attrs={'rows': 3}),
             'url': forms.URLInput(attrs={'placeholder': 'https://example.com/rss.xml'}),
@@ -2,21 +2,21 @@
 手动抓取订阅源管理命令
 """
 from django.core.management.base import BaseCommand
-from django.utils import timezone
 from core.models import Feed, Article
-from core.services.fetcher import RSSFetcher
-from core.services.parser import RSSParser
-from core.utils.article_utils import save_or_update_article
+from core.services import parse_pool
+from core.services.fetcher import get_shared_fetcher
+from core.services.pipeline import FeedPipeline, STATUS_NOT_MODIFIED, STATUS_UNCHANGED
 
 
 class Command(BaseCommand):
-    help = '手动抓取指定订阅源的文章'
+    help = '手动抓取指定订阅源的文章（多个订阅源时并发抓取）'
 
     def add_arguments(self, parser):
         parser.add_argument(
-            'feed_id',
+            'feed_ids',
+            nargs='+',
             type=int,
-            help='订阅源 ID',
+            help='订阅源 ID，可指定多个并发抓取',
         )
         parser.add_argument(
             '--timeout',
@@ -24,67 +24,82 @@ class Command(BaseCommand):
             default=30,
             help='抓取超时时间（秒），默认 30 秒',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='解析进程数，默认使用 FEED_PARSE_WORKERS 配置（0 表示不使用进程池）',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='忽略 ETag/Last-Modified 和内容摘要，强制完整抓取并解析所有文章',
+        )
 
     def handle(self, *args, **options):
-        feed_id = options['feed_id']
+        feed_ids = options['feed_ids']
         timeout = options['timeout']
+        force = options['force']
 
-        try:
-            feed = Feed.objects.get(pk=feed_id)
-        except Feed.DoesNotExist:
-            self.stdout.write(self.style.ERROR(f'订阅源 ID {feed_id} 不存在'))
-            return
-
-        self.stdout.write(f'开始抓取订阅源: {feed.title}')
-        self.stdout.write(f'URL: {feed.url}')
-        self.stdout.write('=' * 80)
-
-        # 抓取 RSS 内容
-        fetcher = RSSFetcher()
-        fetch_response = fetcher.fetch(feed.url, timeout=timeout)
-
-        if not fetch_response:
-            self.stdout.write(self.style.ERROR('抓取失败'))
-            feed.last_fetch_status = '抓取失败'
-            feed.last_fetch_at = timezone.now()
-            feed.save()
+        feeds = []
+        for feed_id in feed_ids:
+            try:
+                feeds.append(Feed.objects.get(pk=feed_id))
+            except Feed.DoesNotExist:
+                self.stdout.write(self.style.ERROR(f'订阅源 ID {feed_id} 不存在'))
+        if not feeds:
             return
 
-        self.stdout.write(self.style.SUCCESS(f'抓取成功 (状态码: {fetch_response["status_code"]})'))
-
-        # 解析 RSS 内容
-        parser = RSSParser()
-        feed_data = parser.parse(fetch_response['content'], fetch_response['encoding'])
-
-        if not feed_data:
-            self.stdout.write(self.style.ERROR('解析失败'))
-            feed.last_fetch_status = '解析失败'
-            feed.last_fetch_at = timezone.now()
-            feed.save()
-            return
+        # 多个订阅源时抓取阶段并发执行；手动抓取不计入自动抓取统计
+        self.verbosity = options['verbosity']
+        workers = options['workers']
+        if workers is None:
+            workers = parse_pool.get_workers()
+        fetcher = get_shared_fetcher()
+        pipeline = FeedPipeline(
+            fetcher=fetcher, timeout=timeout, force=force, auto=False, parse_workers=workers,
+        )
+        pipeline.run_many(feeds, on_done=self._report)
 
-        self.stdout.write(self.style.SUCCESS(f'解析成功'))
-        self.stdout.write(f'  - 标题: {feed_data["title"]}')
-        self.stdout.write(f'  - 描述: {feed_data["description"][:100] if feed_data["description"] else "无"}...')
-        self.stdout.write(f'  - 文章数: {len(feed_data["entries"])}')
+        if self.verbosity >= 2:
+            stats = fetcher.connection_stats()
+            if stats['requests']:
+                self.stdout.write(
+                    f"连接复用: {stats['requests']} 个请求，新建 {stats['connections']} 个连接，"
+                    f"复用率 {stats['reuse_rate']:.0%}"
+                )
 
-        # 更新订阅源信息
-        if feed_data['title'] and not feed.title:
-            feed.title = feed_data['title']
-        if feed_data['description'] and not feed.description:
-            feed.description = feed_data['description']
-        feed.last_fetch_status = '成功'
-        feed.last_fetch_at = timezone.now()
-        feed.save()
+    def _report(self, context):
+        """输出单个订阅源的处理结果"""
+        feed = context.feed
+        self.stdout.write(f'订阅源: {feed.title}')
+        self.stdout.write(f'URL: {feed.url}')
+        self.stdout.write('=' * 80)
 
-        # 保存文章
-        new_count = 0
-        for entry in feed_data['entries']:
-            is_new, _ = save_or_update_article(feed, entry)
-            if is_new:
-                new_count += 1
+        if context.fetch_status == STATUS_NOT_MODIFIED:
+            self.stdout.write(self.style.SUCCESS('订阅源未变化 (状态码: 304)，跳过解析'))
+        elif context.fetch_status == STATUS_UNCHANGED:
+            self.stdout.write(self.style.SUCCESS('订阅源内容与上次相同，跳过解析'))
+        elif context.status != 'success':
+            self.stdout.write(self.style.ERROR(context.message))
+            if feed.failure_count:
+                self.stdout.write(
+                    f'  - 连续失败: {feed.failure_count} 次（最后错误: {feed.last_error}）'
+                )
+        else:
+            feed_data = context.feed_data
+            status_code = context.response['status_code']
+            description = feed_data['description'][:100] if feed_data['description'] else '无'
+            self.stdout.write(self.style.SUCCESS(f'抓取成功 (状态码: {status_code})'))
+            self.stdout.write(f'  - 描述: {description}...')
+            self.stdout.write(f'  - 文章数: {len(feed_data["entries"])}')
+            self.stdout.write(f'  - 新增文章: {context.created} 篇')
+            self.stdout.write(f'  - 更新文章: {context.updated} 篇')
+            self.stdout.write(f'  - 总文章数: {Article.objects.filter(feed=feed).count()} 篇')
 
-        self.stdout.write('=' * 80)
-        self.stdout.write(self.style.SUCCESS(f'抓取完成!'))
-        self.stdout.write(f'  - 新增/更新文章: {new_count} 篇')
-        self.stdout.write(f'  - 总文章数: {Article.objects.filter(feed=feed).count()} 篇')
+        if self.verbosity >= 2:
+            timings = ', '.join(
+                f'{name} {elapsed * 1000:.1f}ms' for name, elapsed in context.timings.items()
+            )
+            self.stdout.write(f'  - 阶段耗时: {timings}')
+        self.stdout.write('')
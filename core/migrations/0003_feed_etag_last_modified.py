@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_feed_last_auto_fetch_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feed',
+            name='etag',
+            field=models.CharField(blank=True, max_length=255, verbose_name='ETag'),
+        ),
+        migrations.AddField(
+            model_name='feed',
+            name='last_modified',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Last-Modified'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:22
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def backfill_guid_and_content_hash(apps, schema_editor):
+    """使用文章链接回填 guid，并计算内容哈希"""
+    Article = apps.get_model('core', 'Article')
+    seen = set()
+    last_pk = 0
+
+    # 按主键分批处理，避免边遍历边更新同一张表
+    while True:
+        batch = list(Article.objects.filter(pk__gt=last_pk).order_by('pk')[:500])
+        if not batch:
+            break
+
+        for article in batch:
+            # 同一订阅源下链接重复的历史文章，追加主键保证唯一
+            key = (article.feed_id, article.url)
+            article.guid = article.url if key not in seen else f'{article.url}#{article.pk}'
+            seen.add(key)
+
+            content_str = f"{article.title}|{article.summary}|{article.content}"
+            article.content_hash = hashlib.md5(content_str.encode('utf-8')).hexdigest()
+
+        Article.objects.bulk_update(batch, ['guid', 'content_hash'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_feed_etag_last_modified'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=32, verbose_name='内容哈希'),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='guid',
+            field=models.CharField(blank=True, max_length=500, verbose_name='唯一标识'),
+        ),
+        migrations.RunPython(backfill_guid_and_content_hash, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='article',
+            constraint=models.UniqueConstraint(fields=('feed', 'guid'), name='unique_article_feed_guid'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:23
+
+from datetime import timedelta
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_next_fetch_at(apps, schema_editor):
+    """根据最后自动刷新时间和抓取间隔计算下次抓取时间，从未抓取的订阅源立即到期"""
+    Feed = apps.get_model('core', 'Feed')
+    now = django.utils.timezone.now()
+    feeds = list(Feed.objects.all())
+    for feed in feeds:
+        if feed.last_auto_fetch_at:
+            feed.next_fetch_at = feed.last_auto_fetch_at + timedelta(minutes=feed.fetch_interval)
+        else:
+            feed.next_fetch_at = now
+    Feed.objects.bulk_update(feeds, ['next_fetch_at'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_article_guid_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feed',
+            name='next_fetch_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='下次抓取时间'),
+        ),
+        migrations.RunPython(backfill_next_fetch_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='feed',
+            index=models.Index(fields=['is_active', 'next_fetch_at'], name='core_feed_is_acti_525a22_idx'),
+        ),
+    ]
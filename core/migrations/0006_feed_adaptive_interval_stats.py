@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_feed_next_fetch_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feed',
+            name='adaptive_interval',
+            field=models.BooleanField(default=False, help_text='根据订阅源的发布频率自动调整抓取间隔', verbose_name='自适应抓取间隔'),
+        ),
+        migrations.AddField(
+            model_name='feed',
+            name='avg_ingest_delay',
+            field=models.FloatField(blank=True, null=True, verbose_name='平均入库延迟（秒）'),
+        ),
+        migrations.AddField(
+            model_name='feed',
+            name='fetch_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='自动抓取次数'),
+        ),
+        migrations.AddField(
+            model_name='feed',
+            name='hit_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='有新文章的抓取次数'),
+        ),
+    ]
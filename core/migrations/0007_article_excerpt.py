@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:26
+
+import html
+import re
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+
+
+def backfill_excerpt(apps, schema_editor):
+    """根据摘要（或正文）生成纯文本摘要预览"""
+    Article = apps.get_model('core', 'Article')
+    last_pk = 0
+
+    # 按主键分批处理，避免边遍历边更新同一张表
+    while True:
+        batch = list(
+            Article.objects.filter(pk__gt=last_pk).order_by('pk').only('id', 'summary', 'content')[:500]
+        )
+        if not batch:
+            break
+
+        for article in batch:
+            plain = re.sub(r'\s+', ' ', html.unescape(strip_tags(article.summary or article.content))).strip()
+            article.excerpt = plain if len(plain) <= 200 else plain[:200].rstrip() + '...'
+
+        Article.objects.bulk_update(batch, ['excerpt'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_feed_adaptive_interval_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='excerpt',
+            field=models.CharField(blank=True, max_length=300, verbose_name='摘要预览'),
+        ),
+        migrations.RunPython(backfill_excerpt, migrations.RunPython.noop),
+    ]
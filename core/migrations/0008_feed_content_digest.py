@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_article_excerpt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feed',
+            name='content_digest',
+            field=models.CharField(blank=True, help_text='上次成功处理的响应内容的 MD5，内容相同时跳过解析', max_length=32, verbose_name='内容摘要'),
+        ),
+        migrations.AddField(
+            model_name='feed',
+            name='unchanged_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='内容未变化次数'),
+        ),
+    ]
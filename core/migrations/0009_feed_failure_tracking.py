@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_feed_content_digest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feed',
+            name='failing_since',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='持续失败开始时间'),
+        ),
+        migrations.AddField(
+            model_name='feed',
+            name='failure_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='连续失败次数'),
+        ),
+        migrations.AddField(
+            model_name='feed',
+            name='last_error',
+            field=models.CharField(blank=True, max_length=100, verbose_name='最后错误类型'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_feed_failure_tracking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feed',
+            name='proxy_mode',
+            field=models.CharField(blank=True, choices=[('', '默认（使用代理池，代理均不可用时直连）'), ('direct', '直连'), ('proxy', '始终使用代理')], default='', help_text='未配置 CloudFlare 代理时始终直连', max_length=10, verbose_name='代理规则'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_feed_proxy_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feed',
+            name='hub_url',
+            field=models.URLField(blank=True, help_text='订阅源声明的推送 Hub', max_length=500, verbose_name='WebSub Hub'),
+        ),
+        migrations.AddField(
+            model_name='feed',
+            name='websub_expires_at',
+            field=models.DateTimeField(blank=True, help_text='已订阅时为租约到期时间，其他状态为下次尝试订阅的时间', null=True, verbose_name='WebSub 到期时间'),
+        ),
+        migrations.AddField(
+            model_name='feed',
+            name='websub_secret',
+            field=models.CharField(blank=True, max_length=64, verbose_name='WebSub 签名密钥'),
+        ),
+        migrations.AddField(
+            model_name='feed',
+            name='websub_state',
+            field=models.CharField(blank=True, choices=[('', '未订阅'), ('pending', '等待验证'), ('subscribed', '已订阅'), ('unsubscribing', '正在退订'), ('unsubscribed', '已退订'), ('denied', 'Hub 拒绝')], default='', max_length=20, verbose_name='WebSub 订阅状态'),
+        ),
+        migrations.AddField(
+            model_name='feed',
+            name='websub_topic',
+            field=models.URLField(blank=True, help_text='订阅源声明的 self 链接', max_length=500, verbose_name='WebSub 主题'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_feed_websub'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='article',
+            name='core_articl_pub_dat_1d31fd_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='article',
+            name='core_articl_feed_id_0d3b6b_idx',
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['pub_date', 'id'], name='core_articl_pub_dat_4a9869_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['feed', 'pub_date', 'id'], name='core_articl_feed_id_9c81a0_idx'),
+        ),
+    ]
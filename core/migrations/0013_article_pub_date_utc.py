@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:10
+
+from datetime import timezone as dt_timezone
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import migrations
+
+
+def _shift_pub_dates(apps, to_utc):
+    """
+    修正历史文章的发布时间
+
+    早期版本把 feedparser 返回的 UTC 时间作为不带时区的 datetime 保存，Django 按 TIME_ZONE 解释，
+    发布时间因此偏移了一个时区差（Asia/Shanghai 为提前 8 小时）；新解析的文章已按 UTC 保存。
+    """
+    if not settings.USE_TZ:
+        return
+    Article = apps.get_model('core', 'Article')
+    local = ZoneInfo(settings.TIME_ZONE)
+    last_pk = 0
+
+    # 按主键分批处理，避免边遍历边更新同一张表
+    while True:
+        batch = list(
+            Article.objects.filter(pk__gt=last_pk, pub_date__isnull=False)
+            .order_by('pk').only('id', 'pub_date')[:500]
+        )
+        if not batch:
+            break
+
+        for article in batch:
+            if to_utc:
+                # 按 TIME_ZONE 读出的墙上时间就是原始的 UTC 时间
+                naive = article.pub_date.astimezone(local).replace(tzinfo=None)
+                article.pub_date = naive.replace(tzinfo=dt_timezone.utc)
+            else:
+                naive = article.pub_date.astimezone(dt_timezone.utc).replace(tzinfo=None)
+                article.pub_date = naive.replace(tzinfo=local)
+
+        Article.objects.bulk_update(batch, ['pub_date'])
+        last_pk = batch[-1].pk
+
+
+def pub_date_to_utc(apps, schema_editor):
+    _shift_pub_dates(apps, to_utc=True)
+
+
+def pub_date_to_local(apps, schema_editor):
+    _shift_pub_dates(apps, to_utc=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_article_pub_date_id_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(pub_date_to_utc, pub_date_to_local),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:30
+
+from django.conf import settings
+from django.db import migrations
+
+from utils.entries import generate_content_hash
+from utils.html_cleaner import clean_html
+
+
+def clean_existing_html(apps, schema_editor):
+    """
+    清理历史文章的摘要和正文
+
+    详情页直接输出摘要和正文 HTML，入库时清理之前保存的文章仍是订阅源的原始 HTML，
+    这里按入库时相同的规则清理一次，并同步更新摘要预览和内容哈希。
+    """
+    Article = apps.get_model('core', 'Article')
+    excerpt_length = getattr(settings, 'ARTICLE_EXCERPT_LENGTH', 200)
+    last_pk = 0
+
+    # 按主键分批处理，避免边遍历边更新同一张表
+    while True:
+        batch = list(
+            Article.objects.filter(pk__gt=last_pk).order_by('pk')
+            .only('id', 'title', 'summary', 'content')[:500]
+        )
+        if not batch:
+            break
+
+        for article in batch:
+            article.summary, summary_excerpt = clean_html(article.summary, excerpt_length)
+            article.content, content_excerpt = clean_html(article.content, excerpt_length)
+            article.excerpt = summary_excerpt or content_excerpt
+            article.content_hash = generate_content_hash(article.title, article.summary, article.content)
+
+        Article.objects.bulk_update(batch, ['summary', 'content', 'excerpt', 'content_hash'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_article_pub_date_utc'),
+    ]
+
+    operations = [
+        migrations.RunPython(clean_existing_html, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,12 @@
 """
 核心数据模型
 """
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 from django.utils.text import slugify
+from datetime import timedelta, timezone as dt_timezone
 import uuid
 
 
@@ -39,6 +42,20 @@ class Category(models.Model):
 
 class Feed(models.Model):
     """RSS订阅源"""
+    PROXY_MODE_CHOICES = [
+        ('', '默认（使用代理池，代理均不可用时直连）'),
+        ('direct', '直连'),
+        ('proxy', '始终使用代理'),
+    ]
+    WEBSUB_STATE_CHOICES = [
+        ('', '未订阅'),
+        ('pending', '等待验证'),
+        ('subscribed', '已订阅'),
+        ('unsubscribing', '正在退订'),
+        ('unsubscribed', '已退订'),
+        ('denied', 'Hub 拒绝'),
+    ]
+
     title = models.CharField('标题', max_length=200)
     url = models.URLField('订阅源地址', unique=True)
     description = models.TextField('描述', blank=True)
@@ -52,9 +69,44 @@ class Feed(models.Model):
     )
     is_active = models.BooleanField('是否启用', default=True)
     fetch_interval = models.IntegerField('抓取间隔（分钟）', default=60)
+    adaptive_interval = models.BooleanField(
+        '自适应抓取间隔', default=False, help_text='根据订阅源的发布频率自动调整抓取间隔'
+    )
+    proxy_mode = models.CharField(
+        '代理规则', max_length=10, choices=PROXY_MODE_CHOICES, blank=True, default='',
+        help_text='未配置 CloudFlare 代理时始终直连',
+    )
     last_fetch_at = models.DateTimeField('最后抓取时间', null=True, blank=True)
     last_auto_fetch_at = models.DateTimeField('最后自动刷新时间', null=True, blank=True)
+    next_fetch_at = models.DateTimeField('下次抓取时间', default=timezone.now)
+    fetch_count = models.PositiveIntegerField('自动抓取次数', default=0)
+    hit_count = models.PositiveIntegerField('有新文章的抓取次数', default=0)
+    avg_ingest_delay = models.FloatField('平均入库延迟（秒）', null=True, blank=True)
     last_fetch_status = models.CharField('最后抓取状态', max_length=50, blank=True)
+    etag = models.CharField('ETag', max_length=255, blank=True)
+    last_modified = models.CharField('Last-Modified', max_length=100, blank=True)
+    content_digest = models.CharField(
+        '内容摘要', max_length=32, blank=True,
+        help_text='上次成功处理的响应内容的 MD5，内容相同时跳过解析',
+    )
+    unchanged_count = models.PositiveIntegerField('内容未变化次数', default=0)
+    hub_url = models.URLField(
+        'WebSub Hub', max_length=500, blank=True, help_text='订阅源声明的推送 Hub',
+    )
+    websub_topic = models.URLField(
+        'WebSub 主题', max_length=500, blank=True, help_text='订阅源声明的 self 链接',
+    )
+    websub_secret = models.CharField('WebSub 签名密钥', max_length=64, blank=True)
+    websub_state = models.CharField(
+        'WebSub 订阅状态', max_length=20, choices=WEBSUB_STATE_CHOICES, blank=True, default='',
+    )
+    websub_expires_at = models.DateTimeField(
+        'WebSub 到期时间', null=True, blank=True,
+        help_text='已订阅时为租约到期时间，其他状态为下次尝试订阅的时间',
+    )
+    failure_count = models.PositiveIntegerField('连续失败次数', default=0)
+    last_error = models.CharField('最后错误类型', max_length=100, blank=True)
+    failing_since = models.DateTimeField('持续失败开始时间', null=True, blank=True)
     created_at = models.DateTimeField('创建时间', auto_now_add=True)
     updated_at = models.DateTimeField('更新时间', auto_now=True)
 
@@ -62,10 +114,94 @@ class Feed(models.Model):
         verbose_name = '订阅源'
         verbose_name_plural = '订阅源'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['is_active', 'next_fetch_at']),
+        ]
 
     def __str__(self):
         return self.title
 
+    @property
+    def hit_rate(self):
+        """命中率：有新文章的自动抓取占比"""
+        if not self.fetch_count:
+            return None
+        return self.hit_count / self.fetch_count
+
+    def schedule_next_fetch(self, now=None):
+        """计算下次抓取时间，启用自适应时根据发布频率估算间隔"""
+        now = now or timezone.now()
+        interval = self.fetch_interval
+        if self.adaptive_interval:
+            from core.utils.schedule_utils import estimate_fetch_interval
+            interval = estimate_fetch_interval(self, now=now)
+        if self.failure_count:
+            from core.utils.schedule_utils import backoff_interval
+            interval = backoff_interval(interval, self.failure_count)
+        if self.websub_active(now):
+            # 新文章由 Hub 推送，轮询只作为兜底
+            interval = max(interval, getattr(settings, 'WEBSUB_POLL_INTERVAL', 24 * 60))
+        self.next_fetch_at = now + timedelta(minutes=interval)
+        return self.next_fetch_at
+
+    def websub_active(self, now=None):
+        """WebSub 订阅是否有效（已验证且租约未到期）"""
+        if self.websub_state != 'subscribed' or self.websub_expires_at is None:
+            return False
+        return self.websub_expires_at > (now or timezone.now())
+
+    def record_failure(self, error, now=None):
+        """
+        记录一次失败的抓取，持续失败超过停用期限时自动停用订阅源
+
+        Args:
+            error: 错误类型（例如 Timeout、HTTP 404）
+            now: 当前时间
+
+        Returns:
+            bool: 是否因持续失败被停用
+        """
+        now = now or timezone.now()
+        self.failure_count += 1
+        self.last_error = error[:100]
+        if self.failing_since is None:
+            self.failing_since = now
+        from core.utils.schedule_utils import should_deactivate
+        if self.is_active and should_deactivate(self, now=now):
+            self.is_active = False
+            return True
+        return False
+
+    def clear_failures(self):
+        """抓取成功后清除失败记录"""
+        self.failure_count = 0
+        self.last_error = ''
+        self.failing_since = None
+
+    def record_fetch(self, new_count, newest_pub_date=None, now=None):
+        """
+        记录一次自动抓取的统计
+
+        Args:
+            new_count: 本次新增文章数
+            newest_pub_date: 本次抓取到的最新文章发布时间，用于估算入库延迟
+            now: 当前时间
+        """
+        now = now or timezone.now()
+        self.fetch_count += 1
+        if new_count > 0:
+            self.hit_count += 1
+            if newest_pub_date and timezone.is_naive(newest_pub_date):
+                # 解析器返回的是 UTC 时间
+                newest_pub_date = timezone.make_aware(newest_pub_date, dt_timezone.utc)
+            if newest_pub_date and newest_pub_date <= now:
+                delay = (now - newest_pub_date).total_seconds()
+                if self.avg_ingest_delay is None:
+                    self.avg_ingest_delay = delay
+                else:
+                    # 指数移动平均，近期的抓取权重更高
+                    self.avg_ingest_delay = 0.8 * self.avg_ingest_delay + 0.2 * delay
+
 
 class Article(models.Model):
     """文章"""
@@ -77,10 +213,13 @@ class Article(models.Model):
     )
     title = models.CharField('标题', max_length=500)
     url = models.URLField('文章链接')
+    guid = models.CharField('唯一标识', max_length=500, blank=True)
     author = models.CharField('作者', max_length=200, blank=True)
     summary = models.TextField('摘要', blank=True)
     content = models.TextField('内容', blank=True)
+    excerpt = models.CharField('摘要预览', max_length=300, blank=True)
     pub_date = models.DateTimeField('发布时间', null=True, blank=True)
+    content_hash = models.CharField('内容哈希', max_length=32, blank=True)
     is_read = models.BooleanField('已读', default=False)
     created_at = models.DateTimeField('创建时间', auto_now_add=True)
     updated_at = models.DateTimeField('更新时间', auto_now=True)
@@ -90,14 +229,40 @@ class Article(models.Model):
         verbose_name_plural = '文章'
         ordering = ['-pub_date']
         indexes = [
-            models.Index(fields=['-pub_date']),
+            # 与游标分页的 (pub_date, id) 排序一致，翻页时沿索引扫描
+            models.Index(fields=['pub_date', 'id']),
             models.Index(fields=['is_read']),
-            models.Index(fields=['feed', '-pub_date']),
+            models.Index(fields=['feed', 'pub_date', 'id']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['feed', 'guid'], name='unique_article_feed_guid'),
         ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        from core.utils.article_utils import generate_content_hash, generate_excerpt
+
+        # 只保存部分字段（如标记已读）时不重新计算派生字段
+        update_fields = kwargs.get('update_fields')
+        changed = set(update_fields) if update_fields is not None else None
+
+        # 没有 guid 时使用文章链接作为唯一标识
+        if not self.guid:
+            self.guid = self.url
+        if changed is None or changed & {'title', 'summary', 'content'}:
+            self.content_hash = generate_content_hash(self.title, self.summary, self.content)
+            if changed is not None:
+                changed.add('content_hash')
+        if changed is None or changed & {'summary', 'content'}:
+            self.excerpt = generate_excerpt(self.summary or self.content)
+            if changed is not None:
+                changed.add('excerpt')
+        if changed is not None:
+            kwargs['update_fields'] = changed
+        super().save(*args, **kwargs)
+
 
 class UserProfile(models.Model):
     """用户配置"""
@@ -0,0 +1,155 @@
+"""
+并发抓取服务
+基于 asyncio 调度多个订阅源的抓取，总耗时接近最慢的单个订阅源
+"""
+import asyncio
+import functools
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List
+from urllib.parse import urlsplit
+from django.conf import settings
+from .fetcher import ERROR_RATE_LIMITED, get_shared_fetcher
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncFetchEngine:
+    """
+    并发抓取引擎
+
+    单个请求仍由 RSSFetcher.fetch 完成（条件请求、代理等逻辑保持一致），
+    引擎负责在线程池中并发执行，并通过信号量限制全局并发数和单主机并发数，
+    通过 asyncio.wait_for 限制单个请求的总耗时。
+
+    抓取器带有限速器（rate_limiter）时，引擎在协程中等待主机限速，
+    等待期间不占用全局并发名额和线程，其他主机的请求照常进行。
+    """
+
+    def __init__(
+        self,
+        fetcher=None,
+        max_concurrency: Optional[int] = None,
+        per_host_concurrency: Optional[int] = None,
+    ):
+        self.fetcher = fetcher or get_shared_fetcher()
+        self.max_concurrency = max_concurrency or getattr(settings, 'FETCH_MAX_CONCURRENCY', 20)
+        self.per_host_concurrency = (
+            per_host_concurrency or getattr(settings, 'FETCH_PER_HOST_CONCURRENCY', 2)
+        )
+
+    def fetch_all(
+        self,
+        urls: List[str],
+        timeout: int = 30,
+        validators: Optional[Dict[str, Dict[str, str]]] = None,
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        并发抓取多个订阅源
+
+        Args:
+            urls: URL列表
+            timeout: 单个请求的超时时间（秒）
+            validators: URL 到条件请求校验值的映射，如 {'url': {'etag': ..., 'last_modified': ...}}
+
+        Returns:
+            URL到响应数据的映射字典，与 RSSFetcher.fetch 的返回格式一致
+        """
+        if not urls:
+            return {}
+
+        coro = self._fetch_all(list(dict.fromkeys(urls)), timeout, validators or {})
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+
+        # 已处于事件循环中（如 ASGI 环境），在独立线程中运行新的事件循环
+        with ThreadPoolExecutor(max_workers=1) as runner:
+            return runner.submit(asyncio.run, coro).result()
+
+    async def _fetch_all(
+        self,
+        urls: List[str],
+        timeout: int,
+        validators: Dict[str, Dict[str, str]],
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        global_limit = asyncio.Semaphore(self.max_concurrency)
+        host_limits = defaultdict(lambda: asyncio.Semaphore(self.per_host_concurrency))
+
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        try:
+            tasks = [
+                self._fetch_one(
+                    url, timeout, validators.get(url, {}),
+                    global_limit, host_limits[self._get_host(url)], executor,
+                )
+                for url in urls
+            ]
+            results = await asyncio.gather(*tasks)
+        finally:
+            # 超时的请求仍在线程中运行，不等待其结束
+            executor.shutdown(wait=False)
+
+        return dict(zip(urls, results))
+
+    async def _fetch_one(
+        self,
+        url: str,
+        timeout: int,
+        validator: Dict[str, str],
+        global_limit: asyncio.Semaphore,
+        host_limit: asyncio.Semaphore,
+        executor: ThreadPoolExecutor,
+    ) -> Optional[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        limiter = getattr(self.fetcher, 'rate_limiter', None)
+        kwargs = {'etag': validator.get('etag'), 'last_modified': validator.get('last_modified')}
+        if limiter is not None:
+            kwargs['throttle'] = False
+        if validator.get('proxy_mode'):
+            kwargs['proxy_mode'] = validator['proxy_mode']
+        call = functools.partial(self.fetcher.fetch, url, timeout, **kwargs)
+
+        # 先获取主机信号量，避免同一主机的请求占满全局并发名额
+        async with host_limit:
+            if limiter is not None and not await self._wait_for_host(limiter, url, loop, executor):
+                self._record_error(url, ERROR_RATE_LIMITED)
+                return None
+            async with global_limit:
+                try:
+                    # requests 的 timeout 只限制单次读写，这里限制整个请求的总耗时
+                    return await asyncio.wait_for(loop.run_in_executor(executor, call), timeout)
+                except asyncio.TimeoutError:
+                    logger.error(f"抓取超时: {url}")
+                    self._record_error(url, 'Timeout')
+                    return None
+                except Exception as e:
+                    logger.exception(f"并发抓取失败 {url}: {e}")
+                    return None
+
+    async def _wait_for_host(self, limiter, url: str, loop, executor: ThreadPoolExecutor) -> bool:
+        """预约主机的请求时间并异步等待，等待时间过长时返回 False"""
+        try:
+            # 共享状态可能在 Redis 中，预约放到线程中执行，不阻塞事件循环
+            wait = await loop.run_in_executor(executor, limiter.reserve, url)
+        except Exception as e:
+            logger.warning(f"主机限速预约失败 {url}: {e}")
+            return True
+        if wait is None:
+            logger.warning(f"主机 {self._get_host(url)} 限速等待时间过长，跳过本次抓取: {url}")
+            return False
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return True
+
+    def _record_error(self, url: str, error: str):
+        """把引擎层面的失败原因记录到抓取器（抓取器支持时）"""
+        record_error = getattr(self.fetcher, 'record_error', None)
+        if record_error is not None:
+            record_error(url, error)
+
+    def _get_host(self, url: str) -> str:
+        """获取订阅源主机名，用于单主机并发限制"""
+        return urlsplit(url).hostname or ''
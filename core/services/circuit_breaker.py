@@ -0,0 +1,119 @@
+"""
+单主机熔断服务
+同一主机连续出现连接失败、超时或 5xx 时打开熔断，熔断期间跳过该主机的所有订阅源；
+熔断到期后只放行一个探测请求，成功则恢复，失败则以翻倍的时长再次熔断。
+
+熔断状态保存在 Django 缓存中，由所有 worker 共享；计数不是严格原子的，
+并发失败时可能多计或少计一次，不影响熔断效果。缓存不可用时不熔断。
+"""
+import logging
+import time
+from typing import Optional, Dict, Any
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'fetch_circuit:'
+# 探测请求的占用时长（秒），探测的 worker 异常退出后由其他 worker 重新探测
+PROBE_TTL = 120
+
+
+class HostCircuitBreaker:
+    """
+    单主机熔断器
+
+    Args:
+        threshold: 打开熔断的连续失败次数，默认读取 FETCH_CIRCUIT_THRESHOLD；0 表示不熔断
+        cooldown: 首次熔断时长（秒），默认读取 FETCH_CIRCUIT_COOLDOWN
+        max_cooldown: 最长熔断时长（秒），默认读取 FETCH_CIRCUIT_MAX_COOLDOWN
+    """
+
+    def __init__(
+        self,
+        threshold: Optional[int] = None,
+        cooldown: Optional[float] = None,
+        max_cooldown: Optional[float] = None,
+    ):
+        if threshold is None:
+            threshold = getattr(settings, 'FETCH_CIRCUIT_THRESHOLD', 5)
+        if cooldown is None:
+            cooldown = getattr(settings, 'FETCH_CIRCUIT_COOLDOWN', 5 * 60)
+        if max_cooldown is None:
+            max_cooldown = getattr(settings, 'FETCH_CIRCUIT_MAX_COOLDOWN', 6 * 60 * 60)
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def allow(self, url: str) -> bool:
+        """订阅源所在主机是否可以发出请求（熔断到期后只有一个探测请求返回 True）"""
+        if not self.enabled:
+            return True
+        host = _host(url)
+        try:
+            state = cache.get(_key(host))
+            if not state or not state.get('open_until'):
+                return True
+            if time.time() < state['open_until']:
+                return False
+            # 半开状态：cache.add 是原子操作，只有一个 worker 能拿到探测名额
+            return cache.add(_probe_key(host), 1, PROBE_TTL)
+        except Exception as e:
+            logger.warning(f"读取熔断状态失败 {host}: {e}")
+            return True
+
+    def record_success(self, url: str):
+        """主机正常响应，清除失败计数并关闭熔断"""
+        if not self.enabled:
+            return
+        host = _host(url)
+        try:
+            state = cache.get(_key(host))
+            if not state:
+                return
+            if state.get('open_until'):
+                logger.info(f"主机 {host} 探测成功，恢复抓取")
+            cache.delete_many([_key(host), _probe_key(host)])
+        except Exception as e:
+            logger.warning(f"更新熔断状态失败 {host}: {e}")
+
+    def record_failure(self, url: str):
+        """主机连接失败、超时或返回 5xx，达到阈值或探测失败时打开熔断"""
+        if not self.enabled:
+            return
+        host = _host(url)
+        try:
+            state: Dict[str, Any] = cache.get(_key(host)) or {
+                'failures': 0, 'opens': 0, 'open_until': None,
+            }
+            state['failures'] += 1
+            # 已熔断过（探测失败）或连续失败达到阈值时（再次）打开熔断
+            if state['open_until'] or state['failures'] >= self.threshold:
+                duration = min(self.cooldown * 2 ** min(state['opens'], 16), self.max_cooldown)
+                state['opens'] += 1
+                state['open_until'] = time.time() + duration
+                cache.delete(_probe_key(host))
+                logger.warning(
+                    f"主机 {host} 连续失败 {state['failures']} 次，暂停抓取 {duration:.0f} 秒"
+                )
+            # 状态保留到熔断结束后一段时间，期间没有请求时自动过期
+            cache.set(_key(host), state, int(self.max_cooldown * 2))
+        except Exception as e:
+            logger.warning(f"更新熔断状态失败 {host}: {e}")
+
+
+def _host(url: str) -> str:
+    return (urlsplit(url).hostname or '').lower()
+
+
+def _key(host: str) -> str:
+    return KEY_PREFIX + host
+
+
+def _probe_key(host: str) -> str:
+    return f'{KEY_PREFIX}{host}:probe'
@@ -1,82 +1,335 @@
 """
 RSS 抓取服务
 """
+import hashlib
 import logging
+import os
+import threading
+import time
 import requests
 from typing import Optional, Dict, Any
 from datetime import datetime
 from django.conf import settings
 from django.utils import timezone
+from utils.cloudflare_proxy import ProxyPool, ProxyEndpoint
+from utils.encoding import charset_from_content_type
+from .circuit_breaker import HostCircuitBreaker
+from .http_session import build_session
+from .rate_limiter import HostRateLimiter, parse_retry_after
 
 logger = logging.getLogger(__name__)
 
+# 可能携带 Retry-After 的限流/过载状态码
+RETRY_AFTER_STATUS = (429, 503)
+
+# 未发出请求时的错误类型：不计入订阅源的连续失败次数
+ERROR_RATE_LIMITED = 'RateLimited'
+ERROR_CIRCUIT_OPEN = 'CircuitOpen'
+SKIPPED_ERRORS = frozenset({ERROR_RATE_LIMITED, ERROR_CIRCUIT_OPEN})
+ERROR_TOO_LARGE = 'TooLarge'
+
+# 订阅源的代理规则（Feed.proxy_mode）：默认使用代理池、代理都不可用时直连；
+# direct 始终直连；proxy 始终使用代理
+PROXY_MODE_DEFAULT = ''
+PROXY_MODE_DIRECT = 'direct'
+PROXY_MODE_PROXY = 'proxy'
+
+# 返回结果中保留的响应头，其余响应头不复制
+KEPT_HEADERS = ('Content-Type', 'Content-Length', 'ETag', 'Last-Modified', 'Link')
+
+
+class ResponseTooLarge(Exception):
+    """响应内容超过 FETCH_MAX_BYTES"""
+
 
 class RSSFetcher:
     """RSS订阅源抓取器"""
 
-    def __init__(self, proxy_domain: Optional[str] = None):
-        self.proxy_domain = proxy_domain or getattr(settings, 'CLOUDFLARE_PROXY_DOMAIN', None)
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+    def __init__(
+        self,
+        proxy_domain: Optional[str] = None,
+        rate_limiter: Optional[HostRateLimiter] = None,
+        circuit_breaker: Optional[HostCircuitBreaker] = None,
+        proxy_pool: Optional[ProxyPool] = None,
+    ):
+        # 传入 proxy_domain 时只使用该代理，否则按配置创建代理池；没有配置代理时为 None
+        self.proxy_pool = proxy_pool or build_proxy_pool([proxy_domain] if proxy_domain else None)
+        # 同一主机的请求按令牌桶均匀放行，多个 worker 通过 Redis 共享
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        # 连续失败的主机暂停抓取，到期后放行一个探测请求
+        self.circuit_breaker = circuit_breaker or HostCircuitBreaker()
+        # 最近一次失败的错误类型，按订阅源 URL 记录（并发抓取时各 URL 互不影响）
+        self.errors: Dict[str, str] = {}
+        # 带连接池的 Session，同一主机的请求复用 TCP/TLS 连接
+        self.session = build_session()
+        self.max_bytes = getattr(settings, 'FETCH_MAX_BYTES', 10 * 1024 * 1024)
+        self.chunk_size = getattr(settings, 'FETCH_CHUNK_SIZE', 64 * 1024)
+
+    def connection_stats(self, since: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        连接复用统计
+
+        Args:
+            since: 之前的统计快照，传入时返回这段时间内的增量
+
+        Returns:
+            {'requests', 'connections', 'reused', 'reuse_rate'}
+        """
+        return self.session.get_adapter('https://').stats.snapshot(since)
+
+    def select_proxy(self, proxy_mode: str = PROXY_MODE_DEFAULT) -> Optional[ProxyEndpoint]:
+        """按订阅源的代理规则选择代理，返回 None 表示直连"""
+        if self.proxy_pool is None or proxy_mode == PROXY_MODE_DIRECT:
+            return None
+        return self.proxy_pool.select(required=proxy_mode == PROXY_MODE_PROXY)
+
+    def record_error(self, feed_url: str, error: str):
+        """记录订阅源抓取失败的错误类型"""
+        self.errors[feed_url] = error
 
-    def get_proxy_url(self, url: str) -> str:
-        """获取代理URL"""
-        if self.proxy_domain:
-            return f"{self.proxy_domain}/{url}"
-        return url
+    def pop_error(self, feed_url: str) -> Optional[str]:
+        """取出订阅源最近一次抓取失败的错误类型"""
+        return self.errors.pop(feed_url, None)
 
-    def fetch(self, feed_url: str, timeout: int = 30) -> Optional[Dict[str, Any]]:
+    def fetch(
+        self,
+        feed_url: str,
+        timeout: int = 30,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        throttle: bool = True,
+        proxy_mode: str = PROXY_MODE_DEFAULT,
+    ) -> Optional[Dict[str, Any]]:
         """
         抓取RSS订阅源
 
         Args:
             feed_url: 订阅源URL
             timeout: 超时时间（秒）
+            etag: 上次响应的 ETag，用于条件请求（If-None-Match）
+            last_modified: 上次响应的 Last-Modified，用于条件请求（If-Modified-Since）
+            throttle: 是否在请求前按主机限速等待（并发抓取引擎已自行等待时传 False）
+            proxy_mode: 订阅源的代理规则（默认 / direct / proxy）
 
         Returns:
-            包含响应数据的字典，或None（失败时）
+            包含响应数据的字典，或None（失败时，错误类型可通过 pop_error 取得）
+            服务器返回 304 时 not_modified 为 True，content 为空；
+            digest 为响应内容的 MD5，下载时顺带计算
         """
+        self.errors.pop(feed_url, None)
+        response = None
         try:
-            url = self.get_proxy_url(feed_url)
-            logger.info(f"正在抓取订阅源: {url}")
+            if not self.circuit_breaker.allow(feed_url):
+                logger.info(f"主机熔断中，跳过抓取: {feed_url}")
+                self.record_error(feed_url, ERROR_CIRCUIT_OPEN)
+                return None
+            if throttle and not self.rate_limiter.wait(feed_url):
+                self.record_error(feed_url, ERROR_RATE_LIMITED)
+                return None
+
+            headers = {}
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+            response = self._send(feed_url, timeout, headers, proxy_mode)
+
+            # 服务器能正常响应（包括 4xx）即说明主机可用，只有 5xx 计入熔断
+            if response.status_code >= 500:
+                self.circuit_breaker.record_failure(feed_url)
+            else:
+                self.circuit_breaker.record_success(feed_url)
+
+            if response.status_code == 304:
+                logger.info(f"订阅源未变化: {feed_url}")
+                return {
+                    'content': b'',
+                    'encoding': charset_from_content_type(response.headers.get('Content-Type')),
+                    'url': response.url,
+                    'status_code': response.status_code,
+                    'headers': _kept_headers(response.headers),
+                    'not_modified': True,
+                    # 304 响应可能不带校验值，此时沿用请求时的值
+                    'etag': response.headers.get('ETag', etag or ''),
+                    'last_modified': response.headers.get('Last-Modified', last_modified or ''),
+                }
+
+            if response.status_code in RETRY_AFTER_STATUS:
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if retry_after:
+                    self.rate_limiter.penalize(feed_url, retry_after)
 
-            response = self.session.get(url, timeout=timeout)
             response.raise_for_status()
+            content, digest = self._read_body(response)
 
             return {
-                'content': response.content,
-                'encoding': response.encoding or 'utf-8',
+                'content': content,
+                # 只保留响应头显式声明的编码，由解析器结合 BOM 和 XML 声明检测
+                'encoding': charset_from_content_type(response.headers.get('Content-Type')),
                 'url': response.url,
                 'status_code': response.status_code,
-                'headers': dict(response.headers),
+                'headers': _kept_headers(response.headers),
+                'not_modified': False,
+                'etag': response.headers.get('ETag', ''),
+                'last_modified': response.headers.get('Last-Modified', ''),
+                'digest': digest,
             }
 
+        except ResponseTooLarge as e:
+            logger.error(f"订阅源内容过大，放弃抓取 {feed_url}: {e}")
+            self.record_error(feed_url, ERROR_TOO_LARGE)
+            return None
+
         except requests.exceptions.Timeout:
             logger.error(f"抓取超时: {feed_url}")
+            self.circuit_breaker.record_failure(feed_url)
+            self.record_error(feed_url, 'Timeout')
+            return None
+
+        except requests.exceptions.HTTPError as e:
+            logger.error(f"抓取失败 {feed_url}: {e}")
+            status = e.response.status_code if e.response is not None else response.status_code
+            self.record_error(feed_url, f'HTTP {status}')
             return None
 
         except requests.exceptions.RequestException as e:
             logger.error(f"抓取失败 {feed_url}: {e}")
+            self.circuit_breaker.record_failure(feed_url)
+            self.record_error(feed_url, type(e).__name__)
             return None
 
         except Exception as e:
             logger.exception(f"未知错误 {feed_url}: {e}")
+            self.record_error(feed_url, type(e).__name__)
             return None
 
-    def fetch_multiple(self, urls: list, timeout: int = 30) -> Dict[str, Optional[Dict[str, Any]]]:
+        finally:
+            # 未读完的响应直接关闭连接，读完的连接已归还连接池
+            if response is not None:
+                response.close()
+
+    def _send(self, feed_url: str, timeout: int, headers: Dict[str, str], proxy_mode: str):
+        """
+        发送流式请求，按代理规则选择代理
+
+        通过代理连接失败（不含超时）时换一个代理或直连重试一次，单个 Worker 故障不影响抓取。
+        代理返回了响应（无论源站状态码）即视为代理可用，延迟按收到响应头的时间计算。
+        """
+        for attempt in range(2):
+            proxy = self.select_proxy(proxy_mode)
+            url = proxy.get_url(feed_url) if proxy else feed_url
+            logger.info(f"正在抓取订阅源: {url}")
+            start = time.monotonic()
+            try:
+                response = self.session.get(url, timeout=timeout, headers=headers, stream=True)
+            except requests.exceptions.RequestException as e:
+                if proxy is None:
+                    raise
+                self.proxy_pool.record_failure(proxy)
+                if attempt or isinstance(e, requests.exceptions.Timeout) \
+                        or not isinstance(e, requests.exceptions.ConnectionError):
+                    raise
+                logger.warning(f"代理 {proxy.domain} 连接失败，换用其他线路重试: {e}")
+                continue
+            if proxy is not None:
+                self.proxy_pool.record_success(proxy, time.monotonic() - start)
+            return response
+
+    def _read_body(self, response) -> tuple:
+        """
+        按块读取响应内容，超过 max_bytes 时提前放弃
+
+        Returns:
+            tuple: (content, digest) - 响应内容和内容的 MD5
+
+        Raises:
+            ResponseTooLarge: Content-Length 或已读取的内容超过 max_bytes
+        """
+        declared = response.headers.get('Content-Length')
+        if declared and declared.isdigit() and int(declared) > self.max_bytes:
+            raise ResponseTooLarge(f'Content-Length {declared} 超过 {self.max_bytes} 字节')
+
+        chunks = []
+        size = 0
+        md5 = hashlib.md5()
+        # iter_content 返回解压后的内容，压缩包炸弹同样受大小限制
+        for chunk in response.iter_content(chunk_size=self.chunk_size):
+            size += len(chunk)
+            if size > self.max_bytes:
+                raise ResponseTooLarge(f'已读取 {size} 字节，超过 {self.max_bytes} 字节')
+            md5.update(chunk)
+            chunks.append(chunk)
+        return b''.join(chunks), md5.hexdigest()
+
+    def fetch_multiple(
+        self,
+        urls: list,
+        timeout: int = 30,
+        validators: Optional[Dict[str, Dict[str, str]]] = None,
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
         """
-        批量抓取多个订阅源
+        批量并发抓取多个订阅源
 
         Args:
             urls: URL列表
             timeout: 超时时间
+            validators: URL 到条件请求校验值的映射（etag / last_modified）
 
         Returns:
             URL到响应数据的映射字典
         """
-        results = {}
-        for url in urls:
-            results[url] = self.fetch(url, timeout)
-        return results
+        from .async_fetcher import AsyncFetchEngine
+
+        engine = AsyncFetchEngine(fetcher=self)
+        return engine.fetch_all(urls, timeout=timeout, validators=validators)
+
+
+def build_proxy_pool(domains: Optional[list] = None) -> Optional[ProxyPool]:
+    """
+    根据配置创建代理池
+
+    Args:
+        domains: Worker 域名列表，为空时读取 CLOUDFLARE_PROXY_DOMAINS，
+            仍为空时使用单个 CLOUDFLARE_PROXY_DOMAIN
+
+    Returns:
+        ProxyPool，没有配置代理时返回 None
+    """
+    if not domains:
+        domains = getattr(settings, 'CLOUDFLARE_PROXY_DOMAINS', None) or [
+            getattr(settings, 'CLOUDFLARE_PROXY_DOMAIN', None)
+        ]
+    return ProxyPool.from_config(
+        [domain for domain in domains if domain],
+        strategy=getattr(settings, 'FETCH_PROXY_STRATEGY', 'weighted'),
+        failure_threshold=getattr(settings, 'FETCH_PROXY_FAILURE_THRESHOLD', 3),
+        cooldown=getattr(settings, 'FETCH_PROXY_COOLDOWN', 60),
+    )
+
+
+def _kept_headers(headers) -> Dict[str, str]:
+    """只复制后续处理需要的响应头"""
+    return {name: headers[name] for name in KEPT_HEADERS if name in headers}
+
+
+_shared_fetcher = None
+_shared_pid = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_fetcher() -> RSSFetcher:
+    """
+    获取当前进程共享的抓取器
+
+    Celery 任务、手动刷新和创建订阅源都使用同一个抓取器，连接池在任务之间复用；
+    fork 出的子进程（如 Celery prefork worker）不继承父进程的连接，首次使用时重新创建。
+    """
+    global _shared_fetcher, _shared_pid
+    pid = os.getpid()
+    if _shared_fetcher is None or _shared_pid != pid:
+        with _shared_lock:
+            if _shared_fetcher is None or _shared_pid != pid:
+                _shared_fetcher = RSSFetcher()
+                _shared_pid = pid
+    return _shared_fetcher
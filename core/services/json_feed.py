@@ -0,0 +1,147 @@
+"""
+JSON Feed 解析服务
+使用标准库 json 解析 JSON Feed 1.0 / 1.1（https://jsonfeed.org/），
+输出与 StreamingFeedParser 相同的 feedparser 风格结构。
+"""
+import json
+import logging
+from typing import Optional, Dict, Any, Callable
+from feedparser.datetimes import _parse_date
+
+logger = logging.getLogger(__name__)
+
+VERSION_PREFIX = 'https://jsonfeed.org/version/'
+
+
+class JSONFeedParser:
+    """JSON Feed 解析器"""
+
+    def parse(
+        self,
+        content: bytes,
+        known=None,
+        encoding: str = 'utf-8',
+        self_described: bool = True,
+        convert: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        解析 JSON Feed
+
+        Args:
+            content: 订阅源内容字节流
+            known: 已知文章集合（KnownEntries），传入时跳过已知文章并提前停止
+            encoding: 检测到的文档编码
+            self_described: 未使用，与 StreamingFeedParser 的接口保持一致
+            convert: 逐条转换文章条目的函数，返回 None 的条目被丢弃
+
+        Returns:
+            {'feed': {...}, 'entries': [...]}，不是 JSON Feed 时返回 None
+        """
+        try:
+            # 按 UTF-8 解码时兼容 BOM
+            data = json.loads(content.decode('utf-8-sig' if encoding == 'utf-8' else encoding))
+        except (ValueError, LookupError) as e:
+            logger.debug(f"JSON Feed 解析失败: {e}")
+            return None
+        if not isinstance(data, dict):
+            return None
+        if not str(data.get('version', '')).startswith(VERSION_PREFIX):
+            return None
+        items = data.get('items')
+        if not isinstance(items, list):
+            return None
+
+        feed_info = {
+            'title': _text(data.get('title')),
+            'description': _text(data.get('description')),
+            'link': _text(data.get('home_page_url')),
+            'links': _feed_links(data),
+        }
+        entries = []
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            if known is not None:
+                if known.stopped:
+                    break
+                if known.check(_item_guid(item)):
+                    continue
+            entry = self._entry(item)
+            if convert is not None:
+                entry = convert(entry)
+                if entry is None:
+                    continue
+            entries.append(entry)
+        return {'feed': feed_info, 'entries': entries}
+
+    def _entry(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        entry = {}
+        if item.get('title'):
+            entry['title'] = _text(item['title'])
+
+        entry_id = _item_id(item)
+        if entry_id:
+            entry['id'] = entry_id
+
+        link = _item_link(item)
+        if link:
+            entry['link'] = link
+        elif 'id' in entry:
+            entry['link'] = entry['id']
+
+        # 1.1 使用 authors 列表，1.0 使用 author 对象
+        authors = item.get('authors') or _as_list(item.get('author'))
+        names = [_text(author.get('name')) for author in authors if isinstance(author, dict)]
+        if any(names):
+            entry['author'] = next(name for name in names if name)
+
+        # summary 和 content_text 是纯文本，由 RSSParser 转义后再清理
+        if item.get('summary'):
+            entry['summary'] = _text(item['summary'])
+            entry['summary_detail'] = {'type': 'text/plain'}
+        if item.get('content_html'):
+            entry['content'] = [{'value': _text(item['content_html']), 'type': 'text/html'}]
+        elif item.get('content_text'):
+            entry['content'] = [{'value': _text(item['content_text']), 'type': 'text/plain'}]
+
+        entry['published_parsed'] = _parse_date(
+            _text(item.get('date_published')) or _text(item.get('date_modified'))
+        )
+        return entry
+
+
+def _feed_links(data: Dict[str, Any]) -> list:
+    """feed_url 和 WebSub 类型的 hubs 转换为 feedparser 风格的 self / hub 链接"""
+    links = []
+    if _text(data.get('feed_url')):
+        links.append({'rel': 'self', 'href': _text(data['feed_url'])})
+    for hub in data.get('hubs') or []:
+        if not isinstance(hub, dict) or str(hub.get('type', '')).lower() != 'websub':
+            continue
+        if _text(hub.get('url')):
+            links.append({'rel': 'hub', 'href': _text(hub['url'])})
+    return links
+
+
+def _item_id(item: Dict[str, Any]) -> str:
+    """JSON Feed 要求 id 为字符串，兼容部分实现输出的数字"""
+    value = item.get('id')
+    return str(value).strip() if value not in (None, '') else ''
+
+
+def _item_link(item: Dict[str, Any]) -> str:
+    return _text(item.get('url')) or _text(item.get('external_url'))
+
+
+def _item_guid(item: Dict[str, Any]) -> str:
+    """与 RSSParser 相同的 guid 取值：id，缺失时使用链接"""
+    return _item_id(item) or _item_link(item)
+
+
+def _as_list(value) -> list:
+    """把单个对象包装为列表"""
+    return [value] if value else []
+
+
+def _text(value) -> str:
+    return value.strip() if isinstance(value, str) else ''
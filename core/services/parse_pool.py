@@ -0,0 +1,153 @@
+"""
+多进程解析服务
+feedparser 和 HTML 清理都是 CPU 密集型操作，受 GIL 限制只能使用一个核心。
+批量刷新时把解析交给进程池：传入原始字节，返回紧凑的元组记录，在主进程还原为 ParsedEntry。
+"""
+import atexit
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, List, Dict, Any, Tuple, Iterable
+from django.conf import settings
+from utils.entries import ParsedEntry
+
+try:
+    import billiard.process
+except ImportError:
+    billiard = None
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_workers = 0
+_daemon_warned = False
+
+
+def is_available() -> bool:
+    """
+    当前进程能否创建解析进程池
+
+    守护进程不能创建子进程：Celery prefork 的 worker 子进程是 billiard 守护进程，
+    在其中创建进程池会抛出 AssertionError，此时在当前进程解析。
+    """
+    if multiprocessing.current_process().daemon:
+        return False
+    if billiard is not None and billiard.process.current_process()._config.get('daemon'):
+        return False
+    return True
+
+
+def get_workers() -> int:
+    """配置的解析进程数，0 表示不使用进程池（当前进程不能创建子进程时也返回 0）"""
+    global _daemon_warned
+    workers = getattr(settings, 'FEED_PARSE_WORKERS', 0)
+    if workers and not is_available():
+        if not _daemon_warned:
+            logger.info("当前进程是守护进程（如 Celery prefork worker），不使用解析进程池")
+            _daemon_warned = True
+        return 0
+    return workers
+
+
+def get_pool(workers: int) -> ProcessPoolExecutor:
+    """获取当前进程共享的解析进程池，进程数变化时重新创建"""
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        shutdown_pool()
+        # 使用 spawn 启动工作进程：抓取阶段已启动线程，fork 多线程进程不安全
+        _pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+        )
+        _pool_workers = workers
+    return _pool
+
+
+def shutdown_pool():
+    """关闭进程池"""
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        _pool_workers = 0
+
+
+atexit.register(shutdown_pool)
+
+
+def parse_in_worker(
+    content: bytes,
+    encoding: str,
+    fast_path: bool,
+    known_guids: Optional[List[str]] = None,
+    stop_after: int = 3,
+    excerpt_length: int = 200,
+) -> Optional[Tuple[str, str, str, str, str, int, List[tuple]]]:
+    """
+    在工作进程中解析订阅源（参数均显式传入，不读取 Django 配置）
+
+    Returns:
+        (title, description, link, hub, self_url, skipped, entries)，
+        entries 为 ParsedEntry.as_tuple() 元组；解析失败时返回 None
+    """
+    from .parser import RSSParser, KnownEntries
+
+    known = KnownEntries(known_guids, stop_after) if known_guids else None
+    parser = RSSParser(fast_path=fast_path, excerpt_length=excerpt_length)
+    feed_data = parser.parse(content, encoding, known=known)
+    if not feed_data:
+        return None
+    entries = [entry.as_tuple() for entry in feed_data['entries']]
+    return (
+        feed_data['title'], feed_data['description'], feed_data['link'],
+        feed_data['hub'], feed_data['self_url'], feed_data['skipped'], entries,
+    )
+
+
+def to_feed_data(record: Optional[tuple]) -> Optional[Dict[str, Any]]:
+    """把工作进程返回的紧凑记录还原为 RSSParser.parse 的返回格式"""
+    if record is None:
+        return None
+    title, description, link, hub, self_url, skipped, entries = record
+    return {
+        'title': title,
+        'description': description,
+        'link': link,
+        'hub': hub,
+        'self_url': self_url,
+        'entries': [ParsedEntry(*row) for row in entries],
+        'skipped': skipped,
+    }
+
+
+def parse_many(
+    jobs: Iterable[Tuple[bytes, str, Optional[List[str]]]],
+    workers: int,
+    fast_path: Optional[bool] = None,
+    stop_after: Optional[int] = None,
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    使用进程池并行解析多个订阅源
+
+    Args:
+        jobs: (content, encoding, known_guids) 列表
+        workers: 进程数
+        fast_path: 是否使用流式解析，默认读取 FEED_FAST_PARSER
+        stop_after: 增量解析的停止阈值，默认读取 FEED_INCREMENTAL_STOP_AFTER
+
+    Returns:
+        与 jobs 顺序一致的解析结果，解析失败为 None
+    """
+    if fast_path is None:
+        fast_path = getattr(settings, 'FEED_FAST_PARSER', True)
+    if stop_after is None:
+        stop_after = getattr(settings, 'FEED_INCREMENTAL_STOP_AFTER', 3)
+    excerpt_length = getattr(settings, 'ARTICLE_EXCERPT_LENGTH', 200)
+
+    pool = get_pool(workers)
+    futures = [
+        pool.submit(
+            parse_in_worker, content, encoding, fast_path, known_guids, stop_after, excerpt_length,
+        )
+        for content, encoding, known_guids in jobs
+    ]
+    return [to_feed_data(future.result()) for future in futures]
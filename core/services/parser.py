@@ -1,56 +1,167 @@
 """
 RSS 解析服务
+按文档开头嗅探出的格式选择专用解析器（RSS / Atom / RDF 使用流式解析，JSON Feed 使用 json），
+专用解析器不支持时回退到 feedparser。
 """
 import logging
-from typing import Optional, List, Dict, Any
+from html import escape
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
+from django.conf import settings
 import feedparser
+from utils.encoding import detect_encoding
+from utils.entries import ParsedEntry, date_from_struct
+from utils.feed_parser import (
+    FORMAT_RSS, FORMAT_ATOM, FORMAT_RDF, FORMAT_JSON, sniff_feed_format,
+)
+from utils.html_cleaner import clean_html
+from .json_feed import JSONFeedParser
+from .stream_parser import StreamingFeedParser
 
 logger = logging.getLogger(__name__)
 
+# 订阅源格式 -> (专用解析器类, feedparser 能否解析该格式)
+FORMAT_PARSERS: Dict[str, Tuple[type, bool]] = {}
+
+
+def register_format_parser(feed_format: str, parser_class: type, feedparser_fallback: bool = True):
+    """
+    注册订阅源格式的专用解析器
+
+    解析器实现 parse(content, known, encoding, self_described, convert)，
+    返回 {'feed': {...}, 'entries': [...]}，不支持该文档时返回 None 以回退到 feedparser。
+
+    Args:
+        feed_format: sniff_feed_format 返回的格式名
+        parser_class: 解析器类（无参数构造）
+        feedparser_fallback: feedparser 能否解析该格式；为 True 时专用解析器只是加速路径，
+            受 FEED_FAST_PARSER 控制
+    """
+    FORMAT_PARSERS[feed_format] = (parser_class, feedparser_fallback)
+
+
+register_format_parser(FORMAT_RSS, StreamingFeedParser)
+register_format_parser(FORMAT_ATOM, StreamingFeedParser)
+register_format_parser(FORMAT_RDF, StreamingFeedParser)
+# feedparser 6.0 不支持 JSON Feed
+register_format_parser(FORMAT_JSON, JSONFeedParser, feedparser_fallback=False)
+
+
+class KnownEntries:
+    """
+    增量解析时的已知文章集合
+
+    订阅源按时间倒序列出文章，遇到已知文章时跳过，
+    连续遇到 stop_after 篇已知文章后认为后面都是旧文章，停止解析。
+    """
+
+    def __init__(self, guids, stop_after: Optional[int] = None):
+        self.guids = set(guids)
+        self.stop_after = stop_after or getattr(settings, 'FEED_INCREMENTAL_STOP_AFTER', 3)
+        self.run = 0
+        self.skipped = 0
+        self.stopped = False
+
+    def check(self, guid: str) -> bool:
+        """检查文章是否已知，已知时返回 True（应跳过）"""
+        if guid not in self.guids:
+            self.run = 0
+            return False
+        self.run += 1
+        self.skipped += 1
+        if self.run >= self.stop_after:
+            self.stopped = True
+        return True
+
 
 class RSSParser:
     """RSS订阅源解析器"""
 
-    def __init__(self):
+    def __init__(self, fast_path: Optional[bool] = None, excerpt_length: Optional[int] = None):
         self.parser = feedparser
-
-    def parse(self, content: bytes, encoding: str = 'utf-8') -> Optional[Dict[str, Any]]:
+        # 格式良好的 RSS 2.0 / Atom / RDF 优先使用流式解析，其他情况回退到 feedparser
+        if fast_path is None:
+            fast_path = getattr(settings, 'FEED_FAST_PARSER', True)
+        self.format_parsers = {}
+        instances = {}
+        for feed_format, (parser_class, feedparser_fallback) in FORMAT_PARSERS.items():
+            if fast_path or not feedparser_fallback:
+                if parser_class not in instances:
+                    instances[parser_class] = parser_class()
+                self.format_parsers[feed_format] = instances[parser_class]
+        self.excerpt_length = excerpt_length or getattr(settings, 'ARTICLE_EXCERPT_LENGTH', 200)
+
+    def parse(
+        self,
+        content: bytes,
+        encoding: Optional[str] = None,
+        known: Optional[KnownEntries] = None,
+    ) -> Optional[Dict[str, Any]]:
         """
         解析RSS内容
 
         Args:
-            content: RSS内容字节流
-            encoding: 内容编码
+            content: RSS内容字节流（不需要预先解码）
+            encoding: HTTP 响应头声明的编码，文档没有 BOM 和 XML 声明时使用
+            known: 已知文章集合，传入时只返回新文章，并在连续遇到已知文章后提前停止
 
         Returns:
             解析后的数据字典，或None（失败时）
         """
         try:
-            # 解码内容
+            feed_data = None
+            self_described = False
             if isinstance(content, bytes):
-                content_str = content.decode(encoding, errors='ignore')
+                # 只检测一次编码，专用解析器和 feedparser 共用
+                encoding, self_described = detect_encoding(content, encoding)
+                format_parser = self.format_parsers.get(sniff_feed_format(content, encoding))
+                if format_parser is not None:
+                    # 每读到一篇文章立即转换，原始条目不在内存中与转换结果同时保留
+                    feed_data = format_parser.parse(
+                        content, known=known, encoding=encoding, self_described=self_described,
+                        convert=self._parse_entry,
+                    )
+
+            if feed_data is None:
+                if known is not None:
+                    # 流式解析失败时可能已经统计过部分条目，重新开始计数
+                    known = KnownEntries(known.guids, known.stop_after)
+                feed_data = self._parse_with_feedparser(content, encoding)
+                entries = self._parse_entries(feed_data, known)
             else:
-                content_str = content
-
-            # 解析RSS
-            feed_data = self.parser.parse(content_str)
-
-            # 检查解析是否成功
-            if feed_data.get('bozo') and feed_data.get('bozo_exception'):
-                logger.warning(f"RSS解析警告: {feed_data['bozo_exception']}")
+                # 专用解析器已经跳过了已知文章并完成了转换
+                entries = feed_data['entries']
 
             return {
                 'title': self._get_feed_title(feed_data),
                 'description': self._get_feed_description(feed_data),
                 'link': self._get_feed_link(feed_data),
-                'entries': self._parse_entries(feed_data),
+                'hub': self._get_feed_rel_link(feed_data, 'hub'),
+                'self_url': self._get_feed_rel_link(feed_data, 'self'),
+                'entries': entries,
+                'skipped': known.skipped if known is not None else 0,
             }
 
         except Exception as e:
             logger.exception(f"RSS解析失败: {e}")
             return None
 
+    def _parse_with_feedparser(self, content, encoding: Optional[str]) -> Dict[str, Any]:
+        """使用 feedparser 解析（支持格式不规范的订阅源），HTML 统一由 _clean_html 清理"""
+        if isinstance(content, bytes):
+            # 直接传入字节，通过 charset 告知检测到的编码，解码失败时 feedparser 会尝试其他编码
+            feed_data = self.parser.parse(
+                content, response_headers={'content-type': f'application/xml; charset={encoding}'},
+                sanitize_html=False,
+            )
+        else:
+            feed_data = self.parser.parse(content, sanitize_html=False)
+
+        # 检查解析是否成功
+        if feed_data.get('bozo') and feed_data.get('bozo_exception'):
+            logger.warning(f"RSS解析警告: {feed_data['bozo_exception']}")
+        return feed_data
+
     def _get_feed_title(self, feed_data: Dict) -> str:
         """获取订阅源标题"""
         return feed_data.get('feed', {}).get('title', '未知订阅源')
@@ -63,48 +174,82 @@ class RSSParser:
         """获取订阅源链接"""
         return feed_data.get('feed', {}).get('link', '')
 
-    def _parse_entries(self, feed_data: Dict) -> List[Dict[str, Any]]:
+    def _get_feed_rel_link(self, feed_data: Dict, rel: str) -> str:
+        """获取订阅源的 hub / self 链接（WebSub 发现），没有时返回空字符串"""
+        for link in feed_data.get('feed', {}).get('links', []) or []:
+            if link.get('rel') == rel and link.get('href'):
+                return link['href'].strip()
+        return ''
+
+    def _parse_entries(
+        self, feed_data: Dict, known: Optional[KnownEntries] = None,
+    ) -> List[ParsedEntry]:
         """解析文章列表"""
         entries = []
         for entry in feed_data.get('entries', []):
-            try:
-                entries.append({
-                    'title': entry.get('title', '无标题'),
-                    'link': entry.get('link', ''),
-                    'author': entry.get('author', ''),
-                    'summary': self._clean_html(entry.get('summary', entry.get('description', ''))),
-                    'content': self._extract_content(entry),
-                    'pub_date': self._parse_date(entry.get('published_parsed')),
-                    'guid': entry.get('id', entry.get('link', '')),
-                })
-            except Exception as e:
-                logger.warning(f"解析文章失败: {e}")
-                continue
+            if known is not None:
+                if known.stopped:
+                    break
+                if known.check(entry.get('id', entry.get('link', ''))):
+                    continue
+            parsed = self._parse_entry(entry)
+            if parsed is not None:
+                entries.append(parsed)
 
         return entries
 
-    def _extract_content(self, entry: Dict) -> str:
-        """提取文章内容"""
+    def _parse_entry(self, entry: Dict) -> Optional[ParsedEntry]:
+        """解析单篇文章，失败时返回 None"""
+        try:
+            summary = self._clean_html(self._html_value(
+                entry.get('summary', entry.get('description', '')), entry.get('summary_detail'),
+            ))
+            content = self._extract_content(entry, summary)
+            date_tuple = entry.get('published_parsed') or entry.get('updated_parsed')
+            return ParsedEntry(
+                title=entry.get('title', ''),
+                link=entry.get('link', ''),
+                guid=entry.get('id', entry.get('link', '')),
+                author=entry.get('author', ''),
+                summary=summary[0],
+                content=content[0],
+                pub_date=self._parse_date(date_tuple),
+                excerpt=summary[1] or content[1],
+            )
+        except Exception as e:
+            logger.warning(f"解析文章失败: {e}")
+            return None
+
+    def _extract_content(self, entry: Dict, summary: Tuple[str, str]) -> Tuple[str, str]:
+        """提取文章内容，返回 (safe_html, excerpt)"""
         if 'content' in entry:
             # 优先使用content字段
             content_list = entry.get('content', [])
             if content_list and isinstance(content_list[0], dict):
-                return self._clean_html(content_list[0].get('value', ''))
+                value = self._html_value(content_list[0].get('value', ''), content_list[0])
+                return self._clean_html(value)
 
-        # 回退到summary或description
-        return self._clean_html(entry.get('summary', entry.get('description', '')))
+        # 回退到已清理过的summary或description
+        return summary
 
-    def _clean_html(self, html: str) -> str:
-        """清理HTML内容"""
-        # 可以添加更复杂的HTML清理逻辑
-        # 这里只做简单处理
-        return html.strip() if html else ''
+    def _html_value(self, value: str, detail: Optional[Dict]) -> str:
+        """feedparser 标记为纯文本的内容先转义为 HTML，避免其中的尖括号被当作标签"""
+        if value and detail and detail.get('type') == 'text/plain':
+            return escape(value, quote=False)
+        return value
+
+    def _clean_html(self, html: str) -> Tuple[str, str]:
+        """
+        清理HTML内容
+
+        单遍解析移除脚本、样式和不安全的标签属性，合并空白字符，
+        同时生成纯文本摘要预览，列表页渲染时不再处理 HTML。
+
+        Returns:
+            tuple: (safe_html, excerpt)
+        """
+        return clean_html(html, self.excerpt_length)
 
     def _parse_date(self, date_tuple) -> Optional[datetime]:
-        """解析日期"""
-        if date_tuple:
-            try:
-                return datetime(*date_tuple[:6])
-            except (TypeError, ValueError):
-                pass
-        return None
+        """解析日期（feedparser 的时间元组均为 UTC）"""
+        return date_from_struct(date_tuple)
@@ -0,0 +1,473 @@
+"""
+订阅源抓取流水线
+抓取 → 内容比对 → 解析 → 保存 的统一处理流程，Celery 任务、手动刷新、创建订阅源和管理命令共用
+
+流水线由若干阶段组成，每个阶段处理一个 FeedContext；阶段可以替换或插入，
+每个阶段的耗时记录在 context.timings 中，并通知注册的计时钩子。
+"""
+import hashlib
+import logging
+import time
+from typing import Optional, List, Dict, Any, Callable, Iterable
+from django.conf import settings
+from django.utils import timezone
+from core.models import Feed, Article
+from core.utils.article_utils import save_articles_bulk
+from .fetcher import get_shared_fetcher, SKIPPED_ERRORS
+from . import parse_pool, websub
+from .parser import RSSParser, KnownEntries
+
+logger = logging.getLogger(__name__)
+
+# 订阅源抓取状态
+STATUS_SUCCESS = '成功'
+STATUS_NOT_MODIFIED = '未变化'
+STATUS_UNCHANGED = '内容未变化'
+STATUS_FETCH_FAILED = '抓取失败'
+STATUS_PARSE_FAILED = '解析失败'
+STATUS_ERROR = '处理失败'
+# 主机限速或熔断，本次没有发出请求
+STATUS_DEFERRED = '已推迟'
+
+# 计入订阅源连续失败次数的状态
+FAILURE_STATUSES = frozenset({STATUS_FETCH_FAILED, STATUS_PARSE_FAILED, STATUS_ERROR})
+
+
+class FeedContext:
+    """单个订阅源在流水线中的处理状态"""
+
+    def __init__(
+        self, feed: Feed, response: Optional[Dict[str, Any]] = None, fetched: bool = False,
+    ):
+        self.feed = feed
+        self.response = response
+        self.fetched = fetched
+        self.feed_data = None
+        # 响应内容的摘要，保存文章后写入 Feed.content_digest
+        self.digest = ''
+        self.created = 0
+        self.updated = 0
+        self.fetch_status = ''
+        self.status = ''
+        self.message = ''
+        self.error = None
+        # 失败时的错误类型，写入 Feed.last_error
+        self.error_type = ''
+        self.done = False
+        # 需要随抓取结果一起保存的订阅源字段
+        self.update_fields = set()
+        self.timings = {}
+
+    def finish(self, fetch_status: str, status: str, message: str):
+        """
+        结束处理，后续阶段不再执行
+
+        Args:
+            fetch_status: 写入 Feed.last_fetch_status 的状态
+            status: 刷新结果状态（success / error）
+            message: 刷新结果说明
+        """
+        self.fetch_status = fetch_status
+        self.status = status
+        self.message = message
+        self.done = True
+
+    def result(self) -> Dict[str, Any]:
+        """单个订阅源的刷新结果（feed_id / feed_title / status / message）"""
+        return {
+            'feed_id': self.feed.pk,
+            'feed_title': self.feed.title,
+            'status': self.status,
+            'message': self.message,
+        }
+
+
+class Stage:
+    """流水线阶段基类"""
+    name = ''
+
+    def prepare(self, contexts: List[FeedContext]):
+        """批量处理前的准备（例如并发抓取），默认不做处理"""
+
+    def process(self, context: FeedContext):
+        """处理单个订阅源"""
+        raise NotImplementedError
+
+
+class FetchStage(Stage):
+    """抓取订阅源内容，支持条件请求；304 时直接结束"""
+    name = 'fetch'
+
+    def __init__(self, fetcher=None, timeout: int = 30, force: bool = False):
+        # 默认使用进程共享的抓取器，连接池在多次刷新之间复用
+        self.fetcher = fetcher or get_shared_fetcher()
+        self.timeout = timeout
+        self.force = force
+
+    def _validators(self, feed: Feed) -> Dict[str, str]:
+        """条件请求校验值和订阅源的代理规则，作为抓取参数传给抓取器"""
+        options = {} if self.force else {'etag': feed.etag, 'last_modified': feed.last_modified}
+        if feed.proxy_mode:
+            options['proxy_mode'] = feed.proxy_mode
+        return options
+
+    def prepare(self, contexts: List[FeedContext]):
+        pending = [context for context in contexts if not context.fetched]
+        if len(pending) < 2:
+            return
+        responses = self.fetcher.fetch_multiple(
+            [context.feed.url for context in pending],
+            timeout=self.timeout,
+            validators={context.feed.url: self._validators(context.feed) for context in pending},
+        )
+        for context in pending:
+            context.response = responses.get(context.feed.url)
+            context.fetched = True
+
+    def process(self, context: FeedContext):
+        if not context.fetched:
+            context.response = self.fetcher.fetch(
+                context.feed.url, timeout=self.timeout, **self._validators(context.feed)
+            )
+            context.fetched = True
+
+        response = context.response
+        if not response:
+            pop_error = getattr(self.fetcher, 'pop_error', None)
+            error = pop_error(context.feed.url) if pop_error else None
+            context.error_type = error or 'FetchFailed'
+            if context.error_type in SKIPPED_ERRORS:
+                context.finish(STATUS_DEFERRED, 'error', '主机暂停抓取，稍后重试')
+            else:
+                context.finish(STATUS_FETCH_FAILED, 'error', f'抓取失败（{context.error_type}）')
+        elif response['not_modified']:
+            logger.info(f"订阅源 {context.feed.title} 未变化，跳过解析")
+            context.finish(STATUS_NOT_MODIFIED, 'success', '未变化')
+
+
+class DigestStage(Stage):
+    """
+    比对响应内容摘要
+
+    很多服务器不支持条件请求，每次都返回相同的内容；
+    内容与上次成功处理时相同时跳过解析和保存，并计入 Feed.unchanged_count。
+    """
+    name = 'digest'
+
+    def __init__(self, force: bool = False):
+        self.force = force
+
+    def process(self, context: FeedContext):
+        feed = context.feed
+        response = context.response
+        # 抓取器下载时已计算摘要，其他来源的响应在这里计算
+        context.digest = response.get('digest') or hashlib.md5(response['content']).hexdigest()
+        if self.force or context.digest != feed.content_digest:
+            return
+
+        # 内容相同时服务器仍可能返回新的校验值
+        feed.etag = response['etag']
+        feed.last_modified = response['last_modified']
+        feed.unchanged_count += 1
+        context.update_fields.update(['etag', 'last_modified', 'unchanged_count'])
+        logger.info(f"订阅源 {feed.title} 内容与上次相同，跳过解析")
+        context.finish(STATUS_UNCHANGED, 'success', '内容未变化')
+
+
+class ParseStage(Stage):
+    """
+    解析订阅源内容
+
+    增量模式下只解析新文章：加载订阅源最近文章的 guid，
+    解析时跳过已知文章，并在连续遇到已知文章后提前停止。
+    """
+    name = 'parse'
+
+    def __init__(self, parser=None, incremental: Optional[bool] = None):
+        self.parser = parser or RSSParser()
+        if incremental is None:
+            incremental = getattr(settings, 'FEED_INCREMENTAL_PARSE', True)
+        self.incremental = incremental
+
+    def process(self, context: FeedContext):
+        if context.feed_data is None:
+            response = context.response
+            guids = self._known_guids(context.feed) if self.incremental else None
+            known = KnownEntries(guids) if guids else None
+            context.feed_data = self.parser.parse(
+                response['content'], response['encoding'], known=known,
+            )
+
+        if not context.feed_data:
+            context.error_type = 'ParseError'
+            context.finish(STATUS_PARSE_FAILED, 'error', '解析失败')
+        elif context.feed_data.get('skipped'):
+            skipped = context.feed_data['skipped']
+            logger.debug(f"订阅源 {context.feed.title} 增量解析跳过 {skipped} 篇已知文章")
+
+    def _known_guids(self, feed: Feed) -> List[str]:
+        """订阅源最近文章的 guid"""
+        limit = getattr(settings, 'FEED_KNOWN_GUIDS_LIMIT', 200)
+        return list(
+            Article.objects.filter(feed=feed).order_by('-id').values_list('guid', flat=True)[:limit]
+        )
+
+
+class PooledParseStage(ParseStage):
+    """
+    使用进程池并行解析一批订阅源
+
+    批量准备阶段把原始字节提交给进程池；进程池不可用时由 process 在当前进程解析。
+    """
+
+    def __init__(self, workers: int, incremental: Optional[bool] = None):
+        super().__init__(incremental=incremental)
+        self.workers = workers
+
+    def prepare(self, contexts: List[FeedContext]):
+        if len(contexts) < 2 or not parse_pool.is_available():
+            return
+        jobs = [
+            (
+                context.response['content'],
+                context.response['encoding'],
+                self._known_guids(context.feed) if self.incremental else None,
+            )
+            for context in contexts
+        ]
+        try:
+            results = parse_pool.parse_many(jobs, self.workers)
+        except Exception:
+            # 工作进程异常退出后进程池不可再用，下次重新创建
+            parse_pool.shutdown_pool()
+            raise
+
+        for context, feed_data in zip(contexts, results):
+            if feed_data is None:
+                context.error_type = 'ParseError'
+                context.finish(STATUS_PARSE_FAILED, 'error', '解析失败')
+            else:
+                context.feed_data = feed_data
+
+
+class PersistStage(Stage):
+    """更新订阅源信息并批量保存文章"""
+    name = 'persist'
+
+    def process(self, context: FeedContext):
+        feed = context.feed
+        feed_data = context.feed_data
+
+        if feed_data['title'] and feed_data['title'] != feed.title:
+            feed.title = feed_data['title']
+            context.update_fields.add('title')
+        if feed_data['description'] and not feed.description:
+            feed.description = feed_data['description']
+            context.update_fields.add('description')
+        self._record_hub(context)
+
+        context.created, context.updated = save_articles_bulk(feed, feed_data['entries'])
+
+        # 文章保存完成后再记录校验值和内容摘要，避免中途失败导致下次跳过时漏掉文章
+        feed.etag = context.response['etag']
+        feed.last_modified = context.response['last_modified']
+        context.update_fields.update(['etag', 'last_modified'])
+        if context.digest:
+            feed.content_digest = context.digest
+            context.update_fields.add('content_digest')
+
+        context.finish(
+            STATUS_SUCCESS, 'success',
+            f'成功，新增 {context.created} 篇文章，更新 {context.updated} 篇文章',
+        )
+
+    def _record_hub(self, context: FeedContext):
+        """记录订阅源声明的 WebSub Hub，轮询时发现不再声明则清除；推送内容只用于发现新 Hub"""
+        hub, topic = websub.discover_hub(context.response.get('headers'), context.feed_data)
+        if not hub and context.response.get('pushed'):
+            return
+        context.update_fields.update(websub.update_hub(context.feed, hub, topic))
+
+
+class FeedPipeline:
+    """
+    订阅源抓取流水线
+
+    Args:
+        stages: 自定义阶段列表，为空时使用 抓取 → 内容比对 → 解析 → 保存
+        fetcher: 默认抓取阶段使用的抓取器
+        parser: 默认解析阶段使用的解析器
+        timeout: 抓取超时时间（秒）
+        force: 是否忽略 ETag/Last-Modified 和内容摘要，强制完整抓取并解析
+        auto: 是否为自动抓取；自动抓取会记录命中率统计并安排下次抓取时间
+        parse_workers: 解析进程数，大于 0 时批量解析使用进程池（自定义 parser 时不生效）
+        hooks: 阶段计时钩子列表，签名为 hook(stage_name, context, elapsed)
+    """
+
+    def __init__(
+        self,
+        stages: Optional[List[Stage]] = None,
+        fetcher=None,
+        parser=None,
+        timeout: int = 30,
+        force: bool = False,
+        auto: bool = True,
+        hooks: Optional[List[Callable]] = None,
+        parse_workers: int = 0,
+    ):
+        if stages is None:
+            # 强制抓取时完整解析，用于补上已知文章的内容更新
+            incremental = False if force else None
+            if parse_workers > 0 and parser is None:
+                parse_stage = PooledParseStage(parse_workers, incremental=incremental)
+            else:
+                parse_stage = ParseStage(parser=parser, incremental=incremental)
+            stages = [
+                FetchStage(fetcher=fetcher, timeout=timeout, force=force),
+                DigestStage(force=force),
+                parse_stage,
+                PersistStage(),
+            ]
+        self.stages = stages
+        self.auto = auto
+        self.hooks = list(hooks or [])
+
+    def run(
+        self, feed: Feed, response: Optional[Dict[str, Any]] = None, fetched: bool = False,
+    ) -> FeedContext:
+        """
+        处理单个订阅源
+
+        Args:
+            feed: 订阅源
+            response: 已抓取的响应，fetched 为 True 时跳过抓取
+            fetched: response 是否为已完成的抓取结果
+
+        Returns:
+            FeedContext
+        """
+        return self.run_many([feed], responses={feed.url: response} if fetched else None)[0]
+
+    def run_many(
+        self,
+        feeds: Iterable[Feed],
+        responses: Optional[Dict[str, Any]] = None,
+        on_done: Optional[Callable[[FeedContext], None]] = None,
+    ) -> List[FeedContext]:
+        """
+        按阶段批量处理多个订阅源，抓取阶段会并发抓取
+
+        Args:
+            feeds: 订阅源列表
+            responses: 已抓取的响应，按订阅源 URL 映射
+            on_done: 每个订阅源处理完成后的回调
+
+        Returns:
+            FeedContext 列表，顺序与 feeds 一致
+        """
+        contexts = []
+        for feed in feeds:
+            if responses is not None and feed.url in responses:
+                contexts.append(FeedContext(feed, responses[feed.url], fetched=True))
+            else:
+                contexts.append(FeedContext(feed))
+
+        for stage in self.stages:
+            pending = [context for context in contexts if not context.done]
+            if not pending:
+                break
+            self._prepare(stage, pending)
+            for context in pending:
+                # 批量准备阶段可能已经给出结果
+                if not context.done:
+                    self._run_stage(stage, context)
+                if context.done:
+                    self._complete(context, on_done)
+
+        for context in contexts:
+            if not context.done:
+                # 自定义阶段没有给出结果时按成功处理
+                context.finish(STATUS_SUCCESS, 'success', '成功')
+                self._complete(context, on_done)
+        return contexts
+
+    def _prepare(self, stage: Stage, contexts: List[FeedContext]):
+        start = time.perf_counter()
+        try:
+            stage.prepare(contexts)
+        except Exception as e:
+            # 批量准备失败时由 process 逐个处理
+            logger.exception(f"流水线阶段 {stage.name} 批量准备失败: {e}")
+        elapsed = time.perf_counter() - start
+        for context in contexts:
+            context.timings[f'{stage.name}.prepare'] = elapsed
+
+    def _run_stage(self, stage: Stage, context: FeedContext):
+        start = time.perf_counter()
+        try:
+            stage.process(context)
+        except Exception as e:
+            logger.exception(f"处理订阅源失败 {context.feed.title}（阶段 {stage.name}）: {e}")
+            context.error = e
+            context.error_type = type(e).__name__
+            # 失败阶段可能只修改了部分字段，不随状态一起保存
+            context.update_fields.clear()
+            context.finish(STATUS_ERROR, 'error', str(e)[:100])
+        elapsed = time.perf_counter() - start
+        context.timings[stage.name] = elapsed
+        for hook in self.hooks:
+            try:
+                hook(stage.name, context, elapsed)
+            except Exception as e:
+                logger.warning(f"流水线计时钩子执行失败: {e}")
+
+    def _complete(self, context: FeedContext, on_done: Optional[Callable]):
+        try:
+            self._record(context)
+        except Exception as e:
+            logger.exception(f"保存订阅源状态失败 {context.feed.title}: {e}")
+        if on_done:
+            on_done(context)
+
+    def _record(self, context: FeedContext):
+        """保存订阅源的抓取状态、统计和下次抓取时间"""
+        feed = context.feed
+        now = timezone.now()
+        feed.last_fetch_status = context.fetch_status
+        feed.last_fetch_at = now
+        fields = context.update_fields | {'last_fetch_status', 'last_fetch_at'}
+        fields |= self._record_failures(context, now)
+
+        if self.auto:
+            if context.status == 'success':
+                feed.last_auto_fetch_at = now
+                newest = None
+                if context.feed_data:
+                    pub_dates = [e.pub_date for e in context.feed_data['entries'] if e.pub_date]
+                    newest = max(pub_dates) if pub_dates else None
+                feed.record_fetch(context.created, newest, now=now)
+                fields.update([
+                    'last_auto_fetch_at', 'fetch_count', 'hit_count', 'avg_ingest_delay',
+                ])
+            # 下次抓取时间在保存文章后计算，使自适应间隔能用上本次的新文章
+            feed.schedule_next_fetch(now=now)
+            fields.add('next_fetch_at')
+
+        feed.save(update_fields=sorted(fields))
+        logger.info(f"订阅源 {feed.title} 处理完成: {context.message}")
+
+    def _record_failures(self, context: FeedContext, now) -> set:
+        """更新订阅源的连续失败记录，返回需要保存的字段"""
+        feed = context.feed
+        if context.fetch_status in FAILURE_STATUSES:
+            if feed.record_failure(context.error_type or context.fetch_status, now=now):
+                logger.warning(
+                    f"订阅源 {feed.title} 自 {feed.failing_since:%Y-%m-%d} 起持续失败 "
+                    f"{feed.failure_count} 次，已自动停用"
+                )
+                context.message += '，已自动停用'
+            return {'failure_count', 'last_error', 'failing_since', 'is_active'}
+        if context.fetch_status != STATUS_DEFERRED and feed.failure_count:
+            feed.clear_failures()
+            return {'failure_count', 'last_error', 'failing_since'}
+        return set()
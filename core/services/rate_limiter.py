@@ -0,0 +1,212 @@
+"""
+单主机抓取限速服务
+同一主机上的订阅源共享一个令牌桶（GCRA 算法）：允许 burst 个请求连续发出，
+之后按 rate 均匀间隔放行；服务器返回 Retry-After 时，在此之前暂停该主机的所有请求。
+
+配置 FETCH_RATE_LIMIT_REDIS_URL 后桶状态保存在 Redis 中，由所有 Celery worker 共享；
+未配置或 Redis 不可用时退回到进程内存。
+"""
+import logging
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict
+from urllib.parse import urlsplit
+from django.conf import settings
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'fetch_rate:'
+# Redis 出错后改用进程内存的时长（秒），之后重新尝试 Redis
+REDIS_RETRY_AFTER = 60
+
+# 预约一个请求时间：返回需要等待的秒数，超过最长等待时间时返回 -1 且不占用名额
+RESERVE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local tolerance = tonumber(ARGV[3])
+local max_wait = tonumber(ARGV[4])
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tat < now then tat = now end
+local wait = tat - tolerance - now
+if wait < 0 then wait = 0 end
+if wait > max_wait then return '-1' end
+local new_tat = tat + interval
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000) + 1000)
+return tostring(wait)
+"""
+
+# 把理论到达时间推迟到 until 之后（只会推迟，不会提前）
+PENALIZE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local until_tat = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+if until_tat > tat then
+    local ttl = math.ceil((until_tat - now) * 1000) + 1000
+    redis.call('SET', KEYS[1], tostring(until_tat), 'PX', ttl)
+end
+return 1
+"""
+
+
+class MemoryRateStore:
+    """进程内存中的令牌桶状态（线程安全）"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tats: Dict[str, float] = {}
+
+    def reserve(
+        self, key: str, now: float, interval: float, tolerance: float, max_wait: float,
+    ) -> float:
+        with self.lock:
+            tat = max(self.tats.get(key, 0.0), now)
+            wait = max(tat - tolerance - now, 0.0)
+            if wait > max_wait:
+                return -1.0
+            self.tats[key] = tat + interval
+            return wait
+
+    def penalize(self, key: str, now: float, until_tat: float):
+        with self.lock:
+            if until_tat > self.tats.get(key, 0.0):
+                self.tats[key] = until_tat
+
+
+class RedisRateStore:
+    """保存在 Redis 中的令牌桶状态，预约和推迟都在 Lua 脚本中原子执行"""
+
+    def __init__(self, url: str):
+        self.client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+        self.reserve_script = self.client.register_script(RESERVE_SCRIPT)
+        self.penalize_script = self.client.register_script(PENALIZE_SCRIPT)
+
+    def reserve(
+        self, key: str, now: float, interval: float, tolerance: float, max_wait: float,
+    ) -> float:
+        return float(self.reserve_script(keys=[key], args=[now, interval, tolerance, max_wait]))
+
+    def penalize(self, key: str, now: float, until_tat: float):
+        self.penalize_script(keys=[key], args=[now, until_tat])
+
+
+_memory_store = MemoryRateStore()
+_redis_stores: Dict[str, RedisRateStore] = {}
+_redis_failed_at: Dict[str, float] = {}
+
+
+def get_store():
+    """当前配置对应的共享状态存储，Redis 不可用时返回进程内存存储"""
+    url = getattr(settings, 'FETCH_RATE_LIMIT_REDIS_URL', None)
+    if not url or redis is None:
+        return _memory_store
+    if time.time() - _redis_failed_at.get(url, 0) < REDIS_RETRY_AFTER:
+        return _memory_store
+    if url not in _redis_stores:
+        _redis_stores[url] = RedisRateStore(url)
+    return _redis_stores[url]
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 响应头（秒数或 HTTP 日期），返回需要等待的秒数"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+class HostRateLimiter:
+    """
+    单主机限速器
+
+    Args:
+        rate: 每个主机每秒放行的请求数，默认读取 FETCH_HOST_RATE；0 表示不限速
+        burst: 允许连续发出的请求数，默认读取 FETCH_HOST_BURST
+        max_wait: 单个请求最长等待时间（秒），默认读取 FETCH_HOST_MAX_WAIT
+        store: 状态存储，默认按 FETCH_RATE_LIMIT_REDIS_URL 选择 Redis 或进程内存
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        max_wait: Optional[float] = None,
+        store=None,
+    ):
+        self.rate = rate if rate is not None else getattr(settings, 'FETCH_HOST_RATE', 1.0)
+        self.burst = max(burst or getattr(settings, 'FETCH_HOST_BURST', 3), 1)
+        if max_wait is None:
+            max_wait = getattr(settings, 'FETCH_HOST_MAX_WAIT', 60)
+        self.max_wait = max_wait
+        self.store = store
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def reserve(self, url: str) -> Optional[float]:
+        """
+        为订阅源所在主机预约一个请求时间
+
+        Returns:
+            需要等待的秒数；等待时间超过 max_wait 时返回 None（不占用名额）
+        """
+        if not self.enabled:
+            return 0.0
+        interval = 1.0 / self.rate
+        tolerance = (self.burst - 1) * interval
+        wait = self._call(
+            'reserve', _host_key(url), time.time(), interval, tolerance, self.max_wait,
+        )
+        return None if wait < 0 else wait
+
+    def wait(self, url: str) -> bool:
+        """预约并等待到可以发出请求，等待时间过长时返回 False"""
+        wait = self.reserve(url)
+        if wait is None:
+            logger.warning(f"主机 {_host(url)} 限速等待超过 {self.max_wait} 秒，跳过本次抓取")
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def penalize(self, url: str, seconds: float):
+        """服务器要求稍后重试时，在 seconds 秒内暂停该主机的请求"""
+        if not self.enabled or seconds <= 0:
+            return
+        logger.warning(f"主机 {_host(url)} 要求 {seconds:.0f} 秒后重试，暂停该主机的抓取")
+        now = time.time()
+        # 理论到达时间减去突发容量才是下一个请求的放行时间
+        until_tat = now + seconds + (self.burst - 1) / self.rate
+        self._call('penalize', _host_key(url), now, until_tat)
+
+    def _call(self, method: str, *args):
+        store = self.store or get_store()
+        try:
+            return getattr(store, method)(*args)
+        except Exception as e:
+            if store is _memory_store or self.store is not None:
+                raise
+            # Redis 不可用时暂时改用进程内存，抓取不受影响
+            logger.warning(f"限速状态存储不可用，暂时改用进程内存: {e}")
+            _redis_failed_at[getattr(settings, 'FETCH_RATE_LIMIT_REDIS_URL', '')] = time.time()
+            return getattr(_memory_store, method)(*args)
+
+
+def _host(url: str) -> str:
+    return (urlsplit(url).hostname or '').lower()
+
+
+def _host_key(url: str) -> str:
+    return KEY_PREFIX + _host(url)
@@ -0,0 +1,107 @@
+"""
+刷新任务进度服务
+手动刷新所有订阅源在后台执行，任务状态和逐个订阅源的结果保存在缓存中，供页面轮询
+"""
+import logging
+import uuid
+from typing import Optional, Dict, Any, Tuple
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CURRENT_JOB_KEY = 'refresh_job:current'
+
+
+def _job_key(job_id: str) -> str:
+    return f'refresh_job:{job_id}'
+
+
+def _result_key(job_id: str, index: int) -> str:
+    return f'refresh_job:{job_id}:result:{index}'
+
+
+def _ttl() -> int:
+    return getattr(settings, 'FEED_REFRESH_JOB_TTL', 30 * 60)
+
+
+def create_or_join_job() -> Tuple[str, bool]:
+    """
+    创建刷新任务，已有任务在运行时加入该任务
+
+    Returns:
+        tuple: (job_id, created) - created 为 False 表示加入了正在运行的任务
+    """
+    job_id = uuid.uuid4().hex
+    # 先写入任务状态再占用当前任务，其他请求看到的当前任务一定已有状态记录
+    cache.set(_job_key(job_id), {
+        'id': job_id,
+        'status': 'pending',
+        'total': None,
+        'done': 0,
+        'created_at': timezone.now().isoformat(),
+    }, _ttl())
+
+    while True:
+        # cache.add 是原子操作，并发请求中只有一个能创建任务
+        if cache.add(CURRENT_JOB_KEY, job_id, _ttl()):
+            return (job_id, True)
+        current = cache.get(CURRENT_JOB_KEY)
+        if current and cache.get(_job_key(current)):
+            cache.delete(_job_key(job_id))
+            return (current, False)
+        # 当前任务记录已过期：仍指向该任务时才清除，再重新争抢，不覆盖其他请求刚创建的任务
+        if current and cache.get(CURRENT_JOB_KEY) == current:
+            cache.delete(CURRENT_JOB_KEY)
+
+
+def start_job(job_id: str, total: int):
+    """标记任务开始执行，记录订阅源总数"""
+    state = cache.get(_job_key(job_id)) or {'id': job_id, 'done': 0}
+    state.update({'status': 'running', 'total': total})
+    cache.set(_job_key(job_id), state, _ttl())
+
+
+def add_result(job_id: str, result: Dict[str, Any]):
+    """追加一个订阅源的刷新结果（每个任务只有一个写入者）"""
+    state = cache.get(_job_key(job_id))
+    if not state:
+        logger.warning(f"刷新任务不存在或已过期: {job_id}")
+        return
+    # 每条结果单独存储，避免每次重写整个结果列表
+    cache.set(_result_key(job_id, state['done']), result, _ttl())
+    state['done'] += 1
+    cache.set(_job_key(job_id), state, _ttl())
+
+
+def finish_job(job_id: str, status: str = 'done'):
+    """标记任务结束，并释放当前任务占用"""
+    state = cache.get(_job_key(job_id)) or {'id': job_id, 'done': 0, 'total': None}
+    state['status'] = status
+    cache.set(_job_key(job_id), state, _ttl())
+    if cache.get(CURRENT_JOB_KEY) == job_id:
+        cache.delete(CURRENT_JOB_KEY)
+
+
+def get_job(job_id: str, since: int = 0) -> Optional[Dict[str, Any]]:
+    """
+    获取任务进度
+
+    Args:
+        job_id: 任务 ID
+        since: 只返回该序号之后的结果
+
+    Returns:
+        任务状态字典（包含 results 列表），任务不存在时返回 None
+    """
+    state = cache.get(_job_key(job_id))
+    if not state:
+        return None
+
+    since = max(0, since)
+    keys = [_result_key(job_id, i) for i in range(since, state['done'])]
+    stored = cache.get_many(keys) if keys else {}
+    state['results'] = [stored[key] for key in keys if key in stored]
+    state['since'] = since
+    return state
@@ -0,0 +1,384 @@
+"""
+流式 RSS/Atom/RDF 解析服务
+使用增量 XML 解析（iterparse）逐条处理文章，处理完的节点立即释放，
+避免 feedparser 为大体积订阅源构建完整的字典树。
+
+只处理格式良好的 RSS 2.0、Atom 和 RDF（RSS 1.0）文档；其他格式或格式错误时返回 None，
+由调用方回退到 feedparser。
+"""
+import codecs
+import io
+import logging
+import re
+from html import escape
+from typing import Optional, Dict, Any, Iterator, List, Callable
+from feedparser.datetimes import _parse_date
+
+try:
+    from lxml import etree
+    ParseError = etree.XMLSyntaxError
+    HAS_LXML = True
+except ImportError:
+    from xml.etree import ElementTree as etree
+    ParseError = etree.ParseError
+    HAS_LXML = False
+
+logger = logging.getLogger(__name__)
+
+ATOM_NS = '{http://www.w3.org/2005/Atom}'
+CONTENT_NS = '{http://purl.org/rss/1.0/modules/content/}'
+DC_NS = '{http://purl.org/dc/elements/1.1/}'
+RDF_NS = '{http://www.w3.org/1999/02/22-rdf-syntax-ns#}'
+RSS1_NS = '{http://purl.org/rss/1.0/}'
+
+
+# expat 可以直接解析的编码（不支持 GBK 等多字节编码）
+EXPAT_ENCODINGS = {'utf-8', 'utf-16-le', 'utf-16-be', 'ascii', 'iso8859-1'}
+CHUNK_SIZE = 64 * 1024
+# RSS 2.0 频道中作为订阅源信息的字段
+RSS_CHANNEL_FIELDS = ('title', 'link', 'description')
+RSS1_CHANNEL = RSS1_NS + 'channel'
+# RDF 频道字段对应的订阅源信息字段
+RDF_CHANNEL_FIELDS = {
+    RSS1_NS + 'title': 'title',
+    RSS1_NS + 'link': 'link',
+    RSS1_NS + 'description': 'description',
+}
+_NS_RE = re.compile(r'^\{[^}]*\}')
+
+
+class UnsupportedFeed(Exception):
+    """文档不是流式解析器支持的格式"""
+
+
+class StreamingFeedParser:
+    """
+    流式订阅源解析器
+
+    输出与 feedparser 结构一致的字典（feed / entries），
+    文章条目只包含 RSSParser._parse_entry 用到的字段；HTML 保持原样，由 RSSParser 统一清理。
+    """
+
+    def parse(
+        self,
+        content: bytes,
+        known=None,
+        encoding: str = 'utf-8',
+        self_described: bool = True,
+        convert: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        解析订阅源
+
+        Args:
+            content: 订阅源内容字节流
+            known: 已知文章集合（KnownEntries），传入时跳过已知文章并提前停止
+            encoding: 检测到的文档编码
+            self_described: 文档本身（BOM / XML 声明 / 默认 UTF-8）是否能确定该编码
+            convert: 逐条转换文章条目的函数，返回 None 的条目被丢弃
+
+        Returns:
+            {'feed': {...}, 'entries': [...]}，格式不支持或格式错误时返回 None
+        """
+        feed_info = {}
+        try:
+            events = self._iterparse(content, encoding, self_described)
+            entries = self.iter_entries(events, feed_info, known)
+            if convert is not None:
+                entries = (item for item in map(convert, entries) if item is not None)
+            entries = list(entries)
+        except UnsupportedFeed:
+            return None
+        except (ParseError, ValueError, LookupError) as e:
+            logger.debug(f"流式解析失败，回退到 feedparser: {e}")
+            return None
+        return {'feed': feed_info, 'entries': entries}
+
+    def iter_entries(
+        self, events, feed_info: Dict[str, Any], known=None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        根据 (event, element) 解析事件逐条产出文章条目，订阅源信息写入 feed_info
+
+        已知文章只读取 guid 后直接丢弃；连续遇到足够多的已知文章后停止读取文档
+        （订阅源标题尚未读到时继续扫描，但不再转换文章）。
+
+        Raises:
+            UnsupportedFeed: 根节点不是 RSS 2.0、Atom 或 RSS 1.0 的 RDF
+            ParseError: XML 格式错误
+        """
+        stack = []
+        kind = None
+
+        for event, elem in events:
+            if event == 'start':
+                if kind is None:
+                    kind = self._detect(elem)
+                elif kind == 'rdf' and len(stack) == 1:
+                    self._check_rdf_child(elem)
+                stack.append(elem)
+                continue
+
+            stack.pop()
+            parent = stack[-1] if stack else None
+            tag = elem.tag
+
+            if kind == 'rss':
+                if tag == 'item':
+                    if not self._skip(known, self._rss_guid, elem):
+                        yield self._rss_entry(elem)
+                    self._release(elem, parent)
+                elif parent is not None and parent.tag == 'channel' and tag in RSS_CHANNEL_FIELDS:
+                    feed_info.setdefault(tag, (elem.text or '').strip())
+                elif parent is not None and parent.tag == 'channel' and tag == ATOM_NS + 'link':
+                    _add_feed_link(elem, feed_info)
+            elif kind == 'rdf':
+                if tag == RSS1_NS + 'item':
+                    if not self._skip(known, self._rdf_guid, elem):
+                        yield self._rdf_entry(elem)
+                    self._release(elem, parent)
+                elif (parent is not None and parent.tag == RSS1_CHANNEL
+                      and tag in RDF_CHANNEL_FIELDS):
+                    feed_info.setdefault(RDF_CHANNEL_FIELDS[tag], (elem.text or '').strip())
+                elif parent is not None and parent.tag == RSS1_CHANNEL and tag == ATOM_NS + 'link':
+                    _add_feed_link(elem, feed_info)
+            else:
+                if tag == ATOM_NS + 'entry':
+                    if not self._skip(known, self._atom_guid, elem):
+                        yield self._atom_entry(elem)
+                    self._release(elem, parent)
+                elif parent is not None and parent.tag == ATOM_NS + 'feed':
+                    self._atom_feed_field(elem, feed_info)
+
+            if known is not None and known.stopped and 'title' in feed_info:
+                return
+
+    def _iterparse(self, content: bytes, encoding: str, self_described: bool):
+        """
+        产生解析事件
+
+        XML 解析器能直接处理该编码时解析原始字节（BytesIO 不复制数据）；
+        否则按块增量解码后送入解析器，不生成整篇文档的字符串副本。
+        """
+        if HAS_LXML:
+            # libxml2 支持大多数编码，显式指定编码以覆盖文档声明（如 gb2312 → gb18030）
+            return etree.iterparse(
+                io.BytesIO(content), events=('start', 'end'), encoding=encoding,
+                resolve_entities=False, no_network=True,
+            )
+        if self_described and encoding in EXPAT_ENCODINGS:
+            return etree.iterparse(io.BytesIO(content), events=('start', 'end'))
+        return self._transcode_events(content, encoding)
+
+    def _transcode_events(self, content: bytes, encoding: str):
+        decoder = codecs.getincrementaldecoder(encoding)()
+        parser = etree.XMLPullParser(events=('start', 'end'))
+        view = memoryview(content)
+        for offset in range(0, len(view), CHUNK_SIZE):
+            parser.feed(decoder.decode(view[offset:offset + CHUNK_SIZE]))
+            yield from parser.read_events()
+        parser.feed(decoder.decode(b'', final=True))
+        parser.close()
+        yield from parser.read_events()
+
+    def _detect(self, root) -> str:
+        if root.tag == 'rss':
+            return 'rss'
+        if root.tag == ATOM_NS + 'feed':
+            return 'atom'
+        if root.tag == RDF_NS + 'RDF':
+            return 'rdf'
+        raise UnsupportedFeed(root.tag)
+
+    def _check_rdf_child(self, elem):
+        """只支持 RSS 1.0 命名空间的 RDF 文档（RSS 0.90 等交给 feedparser）"""
+        local = _NS_RE.sub('', elem.tag)
+        if local in ('channel', 'item') and not elem.tag.startswith(RSS1_NS):
+            raise UnsupportedFeed(elem.tag)
+
+    def _release(self, elem, parent):
+        """释放已处理的条目节点"""
+        elem.clear()
+        if parent is not None:
+            parent.remove(elem)
+
+    def _skip(self, known, get_guid, elem) -> bool:
+        """增量解析时判断条目是否应跳过"""
+        if known is None:
+            return False
+        return known.stopped or known.check(get_guid(elem))
+
+    def _rss_guid(self, item) -> str:
+        """与 RSSParser 相同的 guid 取值：guid，缺失时使用 link"""
+        guid = (item.findtext('guid') or '').strip()
+        return guid or (item.findtext('link') or '').strip()
+
+    def _rdf_guid(self, item) -> str:
+        about = (item.get(RDF_NS + 'about') or '').strip()
+        return about or (item.findtext(RSS1_NS + 'link') or '').strip()
+
+    def _atom_guid(self, elem) -> str:
+        entry_id = (elem.findtext(ATOM_NS + 'id') or '').strip()
+        return entry_id or _atom_link(elem)
+
+    def _rss_entry(self, item) -> Dict[str, Any]:
+        entry = {}
+        title = item.find('title')
+        if title is not None:
+            entry['title'] = (title.text or '').strip()
+
+        guid = item.find('guid')
+        if guid is not None and guid.text:
+            entry['id'] = guid.text.strip()
+
+        link = item.findtext('link')
+        if link and link.strip():
+            entry['link'] = link.strip()
+        elif 'id' in entry and guid.get('isPermaLink', 'true').lower() != 'false':
+            # 与 feedparser 一致：guid 默认是永久链接
+            entry['link'] = entry['id']
+
+        author = item.findtext(DC_NS + 'creator') or item.findtext('author')
+        if author:
+            entry['author'] = author.strip()
+
+        description = item.findtext('description')
+        if description is not None:
+            entry['summary'] = description
+
+        encoded = item.findtext(CONTENT_NS + 'encoded')
+        if encoded is not None:
+            entry['content'] = [{'value': encoded}]
+
+        entry['published_parsed'] = _parse_date(
+            item.findtext('pubDate') or item.findtext(DC_NS + 'date') or ''
+        )
+        return entry
+
+    def _rdf_entry(self, item) -> Dict[str, Any]:
+        entry = {}
+        title = item.findtext(RSS1_NS + 'title')
+        if title is not None:
+            entry['title'] = title.strip()
+
+        about = (item.get(RDF_NS + 'about') or '').strip()
+        if about:
+            entry['id'] = about
+
+        link = (item.findtext(RSS1_NS + 'link') or '').strip()
+        if link:
+            entry['link'] = link
+
+        author = item.findtext(DC_NS + 'creator')
+        if author:
+            entry['author'] = author.strip()
+
+        description = item.findtext(RSS1_NS + 'description')
+        if description is not None:
+            entry['summary'] = description
+
+        encoded = item.findtext(CONTENT_NS + 'encoded')
+        if encoded is not None:
+            entry['content'] = [{'value': encoded}]
+
+        entry['published_parsed'] = _parse_date(item.findtext(DC_NS + 'date') or '')
+        return entry
+
+    def _atom_entry(self, elem) -> Dict[str, Any]:
+        entry = {}
+        title = elem.find(ATOM_NS + 'title')
+        if title is not None:
+            entry['title'] = _atom_text(title)
+
+        entry_id = elem.findtext(ATOM_NS + 'id')
+        if entry_id:
+            entry['id'] = entry_id.strip()
+
+        link = _atom_link(elem)
+        if link:
+            entry['link'] = link
+        elif 'id' in entry:
+            entry['link'] = entry['id']
+
+        author = elem.findtext(f'{ATOM_NS}author/{ATOM_NS}name')
+        if author:
+            entry['author'] = author.strip()
+
+        summary = elem.find(ATOM_NS + 'summary')
+        content = elem.find(ATOM_NS + 'content')
+        if content is not None:
+            entry['content'] = [{'value': _atom_html(content)}]
+        if summary is not None:
+            entry['summary'] = _atom_html(summary)
+        elif content is not None:
+            # 与 feedparser 一致：没有 summary 时使用 content
+            entry['summary'] = entry['content'][0]['value']
+
+        entry['published_parsed'] = _parse_date(
+            elem.findtext(ATOM_NS + 'published') or elem.findtext(ATOM_NS + 'updated') or ''
+        )
+        return entry
+
+    def _atom_feed_field(self, elem, feed_info: Dict[str, Any]):
+        tag = elem.tag
+        if tag == ATOM_NS + 'title':
+            feed_info.setdefault('title', _atom_text(elem))
+        elif tag == ATOM_NS + 'subtitle':
+            feed_info.setdefault('description', _atom_text(elem))
+        elif tag == ATOM_NS + 'link':
+            if elem.get('rel', 'alternate') == 'alternate':
+                feed_info.setdefault('link', elem.get('href', ''))
+            else:
+                _add_feed_link(elem, feed_info)
+
+
+def _add_feed_link(elem, feed_info: Dict[str, Any]):
+    """记录订阅源级别的 hub / self 链接（WebSub 发现），结构与 feedparser 的 feed.links 一致"""
+    rel = elem.get('rel', '')
+    href = (elem.get('href') or '').strip()
+    if rel in ('hub', 'self') and href:
+        feed_info.setdefault('links', []).append({'rel': rel, 'href': href})
+
+
+def _atom_link(elem) -> str:
+    for link in elem.findall(ATOM_NS + 'link'):
+        if link.get('rel', 'alternate') == 'alternate' and link.get('href'):
+            return link.get('href').strip()
+    return ''
+
+
+def _atom_text(elem) -> str:
+    """读取 Atom 文本结构（text / html / xhtml）"""
+    content_type = elem.get('type', 'text')
+    if content_type == 'xhtml':
+        # xhtml 内容包在一个 div 中，只保留 div 内部的标记
+        div = elem[0] if len(elem) else elem
+        return _serialize_children(div).strip()
+    return (elem.text or '').strip()
+
+
+def _atom_html(elem) -> str:
+    """读取 Atom 文本结构并统一为 HTML（纯文本需要转义，与 RSSParser 处理 feedparser 结果一致）"""
+    if elem.get('type', 'text') == 'text':
+        return escape(_atom_text(elem), quote=False)
+    return _atom_text(elem)
+
+
+def _serialize_children(elem) -> str:
+    """把节点的子内容序列化为不带命名空间前缀的 HTML"""
+    parts: List[str] = [escape(elem.text or '', quote=False)]
+    for child in elem:
+        parts.append(_serialize(child))
+    return ''.join(parts)
+
+
+def _serialize(elem) -> str:
+    tag = _NS_RE.sub('', elem.tag) if isinstance(elem.tag, str) else ''
+    tail = escape(elem.tail or '', quote=False)
+    if not tag:
+        # 注释和处理指令
+        return tail
+    attrs = ''.join(
+        f' {_NS_RE.sub("", name)}="{escape(value)}"' for name, value in elem.attrib.items()
+    )
+    return f'<{tag}{attrs}>{_serialize_children(elem)}</{tag}>{tail}'
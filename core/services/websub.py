@@ -0,0 +1,282 @@
+"""
+WebSub（PubSubHubbub）推送订阅服务
+解析时发现订阅源声明的 hub / self 链接，向 Hub 订阅后由 Hub 把更新推送到回调地址，
+推送内容校验签名后直接交给解析 → 保存流水线；订阅在租约到期前自动续订。
+
+需要配置外部可访问的 WEBSUB_CALLBACK_BASE_URL，未配置时只记录发现的 Hub，不发起订阅。
+"""
+import hashlib
+import hmac
+import logging
+import secrets
+from datetime import timedelta
+from typing import Optional, Dict, Any, Tuple
+import requests
+from django.conf import settings
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+from requests.utils import parse_header_links
+from core.models import Feed
+
+logger = logging.getLogger(__name__)
+
+MODE_SUBSCRIBE = 'subscribe'
+MODE_UNSUBSCRIBE = 'unsubscribe'
+MODE_DENIED = 'denied'
+
+STATE_NONE = ''
+STATE_PENDING = 'pending'
+STATE_SUBSCRIBED = 'subscribed'
+STATE_UNSUBSCRIBING = 'unsubscribing'
+STATE_UNSUBSCRIBED = 'unsubscribed'
+STATE_DENIED = 'denied'
+
+# X-Hub-Signature 支持的签名算法
+SIGNATURE_ALGORITHMS = ('sha1', 'sha256', 'sha384', 'sha512')
+
+WEBSUB_FIELDS = ['hub_url', 'websub_topic', 'websub_secret', 'websub_state', 'websub_expires_at']
+
+
+def discover_hub(headers: Optional[Dict[str, str]], feed_data: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    发现订阅源的 Hub 和主题地址，HTTP Link 响应头优先于文档中的链接
+
+    Args:
+        headers: 抓取结果中保留的响应头
+        feed_data: RSSParser.parse 的返回值
+
+    Returns:
+        tuple: (hub, topic) - 没有声明 Hub 时均为空字符串
+    """
+    hub = topic = ''
+    link_header = (headers or {}).get('Link')
+    if link_header:
+        for link in parse_header_links(link_header):
+            rels = link.get('rel', '').split()
+            if 'hub' in rels and not hub:
+                hub = link.get('url', '')
+            if 'self' in rels and not topic:
+                topic = link.get('url', '')
+    hub = hub or feed_data.get('hub', '')
+    topic = topic or feed_data.get('self_url', '')
+    return (hub, topic) if hub else ('', '')
+
+
+def update_hub(feed: Feed, hub: str, topic: str) -> set:
+    """
+    记录发现的 Hub，Hub 或主题变化时重新订阅
+
+    Returns:
+        需要保存的字段
+    """
+    topic = topic or feed.url
+    if hub == feed.hub_url and (not hub or topic == feed.websub_topic):
+        return set()
+    if hub:
+        logger.info(f"订阅源 {feed.title} 声明了 WebSub Hub: {hub}")
+    feed.hub_url = hub
+    feed.websub_topic = topic if hub else ''
+    feed.websub_state = STATE_NONE
+    feed.websub_expires_at = None
+    return {'hub_url', 'websub_topic', 'websub_state', 'websub_expires_at'}
+
+
+def is_enabled() -> bool:
+    return bool(getattr(settings, 'WEBSUB_CALLBACK_BASE_URL', None))
+
+
+def callback_url(feed: Feed) -> str:
+    """订阅源的推送回调地址"""
+    base = getattr(settings, 'WEBSUB_CALLBACK_BASE_URL', '').rstrip('/')
+    return base + reverse('core:websub_callback', args=[feed.pk])
+
+
+def request_subscription(feed: Feed, mode: str = MODE_SUBSCRIBE, session=None) -> bool:
+    """
+    向 Hub 发送订阅（或退订）请求，Hub 随后会请求回调地址验证意图
+
+    新订阅先记为等待验证再发送请求，避免同步验证的 Hub 在请求返回前回调时找不到订阅；
+    续订期间保持已订阅状态。
+
+    Args:
+        feed: 订阅源
+        mode: subscribe 或 unsubscribe
+        session: 发送请求使用的 Session，默认使用进程共享抓取器的连接池
+
+    Returns:
+        bool: Hub 是否接受了请求
+    """
+    if not feed.hub_url or not is_enabled():
+        return False
+    now = timezone.now()
+    retry_at = now + timedelta(seconds=getattr(settings, 'WEBSUB_RETRY_DELAY', 60 * 60))
+    if not feed.websub_secret:
+        feed.websub_secret = secrets.token_hex(20)
+    previous_state = feed.websub_state
+    if mode == MODE_UNSUBSCRIBE:
+        feed.websub_state = STATE_UNSUBSCRIBING
+    elif feed.websub_state != STATE_SUBSCRIBED:
+        # 等待验证期间 websub_expires_at 为验证截止时间，超时后重新订阅
+        feed.websub_state = STATE_PENDING
+        feed.websub_expires_at = retry_at
+    feed.save(update_fields=WEBSUB_FIELDS)
+
+    if session is None:
+        from .fetcher import get_shared_fetcher
+        session = get_shared_fetcher().session
+    data = {
+        'hub.mode': mode,
+        'hub.topic': feed.websub_topic or feed.url,
+        'hub.callback': callback_url(feed),
+        'hub.secret': feed.websub_secret,
+        'hub.lease_seconds': getattr(settings, 'WEBSUB_LEASE_SECONDS', 7 * 24 * 60 * 60),
+    }
+    try:
+        timeout = getattr(settings, 'WEBSUB_TIMEOUT', 15)
+        response = session.post(feed.hub_url, data=data, timeout=timeout)
+        accepted = 200 <= response.status_code < 300
+        if not accepted:
+            logger.warning(
+                f"Hub 拒绝{mode}请求 {feed.hub_url}（{feed.title}）: HTTP {response.status_code}"
+            )
+    except requests.exceptions.RequestException as e:
+        logger.warning(f"向 Hub 发送{mode}请求失败 {feed.hub_url}（{feed.title}）: {e}")
+        accepted = False
+
+    if not accepted and mode == MODE_SUBSCRIBE and previous_state != STATE_SUBSCRIBED:
+        # 稍后由续订任务重试
+        Feed.objects.filter(pk=feed.pk, websub_state=STATE_PENDING).update(
+            websub_state=STATE_NONE, websub_expires_at=retry_at,
+        )
+        feed.websub_state = STATE_NONE
+    return accepted
+
+
+def verify_intent(feed: Feed, params: Dict[str, str]) -> Optional[str]:
+    """
+    处理 Hub 的意图验证请求
+
+    Args:
+        feed: 订阅源
+        params: 回调 GET 请求参数
+            （hub.mode / hub.topic / hub.challenge / hub.lease_seconds / hub.reason）
+
+    Returns:
+        需要原样返回的 challenge；不认可该请求时返回 None（回调返回 404）
+    """
+    mode = params.get('hub.mode')
+    topic = params.get('hub.topic')
+    expected_topic = feed.websub_topic or feed.url
+
+    if topic != expected_topic:
+        return None
+
+    now = timezone.now()
+    if mode == MODE_DENIED:
+        # 只认可针对正在订阅或已订阅主题的拒绝，避免伪造的回调取消订阅
+        if feed.websub_state not in (STATE_PENDING, STATE_SUBSCRIBED):
+            return None
+        logger.warning(f"Hub 拒绝了订阅源 {feed.title} 的订阅: {params.get('hub.reason', '')}")
+        # websub_expires_at 为重试时间，稍后由续订任务重新订阅
+        retry_delay = getattr(settings, 'WEBSUB_RETRY_DELAY', 60 * 60)
+        feed.websub_state = STATE_DENIED
+        feed.websub_expires_at = now + timedelta(seconds=retry_delay)
+        feed.save(update_fields=['websub_state', 'websub_expires_at'])
+        return params.get('hub.challenge', '')
+
+    challenge = params.get('hub.challenge')
+    if not challenge:
+        return None
+
+    if mode == MODE_SUBSCRIBE and feed.websub_state in (STATE_PENDING, STATE_SUBSCRIBED):
+        try:
+            lease = int(params.get('hub.lease_seconds') or 0)
+        except ValueError:
+            lease = 0
+        lease = lease or getattr(settings, 'WEBSUB_LEASE_SECONDS', 7 * 24 * 60 * 60)
+        feed.websub_state = STATE_SUBSCRIBED
+        feed.websub_expires_at = now + timedelta(seconds=lease)
+        # 已订阅的订阅源轮询间隔放宽为兜底间隔
+        feed.schedule_next_fetch(now=now)
+        feed.save(update_fields=['websub_state', 'websub_expires_at', 'next_fetch_at'])
+        logger.info(f"订阅源 {feed.title} WebSub 订阅成功，租约 {lease} 秒")
+        return challenge
+
+    if mode == MODE_UNSUBSCRIBE and feed.websub_state == STATE_UNSUBSCRIBING:
+        feed.websub_state = STATE_UNSUBSCRIBED
+        feed.websub_expires_at = None
+        feed.save(update_fields=['websub_state', 'websub_expires_at'])
+        logger.info(f"订阅源 {feed.title} 已退订 WebSub")
+        return challenge
+
+    return None
+
+
+def accepts_push(feed: Feed) -> bool:
+    """订阅源是否接收推送：已停用或未处于订阅中的订阅源忽略推送（退订验证前仍接收）"""
+    return feed.is_active and feed.websub_state in (STATE_SUBSCRIBED, STATE_UNSUBSCRIBING)
+
+
+def verify_signature(feed: Feed, body: bytes, signature: Optional[str]) -> bool:
+    """
+    校验推送内容的 X-Hub-Signature（method=hexdigest，使用订阅时提供的密钥计算 HMAC）
+    """
+    if not feed.websub_secret or not signature or '=' not in signature:
+        return False
+    method, digest = signature.split('=', 1)
+    method = method.strip().lower()
+    if method not in SIGNATURE_ALGORITHMS:
+        return False
+    key = feed.websub_secret.encode('utf-8')
+    expected = hmac.new(key, body, getattr(hashlib, method)).hexdigest()
+    return hmac.compare_digest(expected, digest.strip().lower())
+
+
+def pushed_response(feed: Feed, body: bytes, content_type: Optional[str] = None) -> Dict[str, Any]:
+    """
+    把推送内容包装为与 RSSFetcher.fetch 相同格式的抓取结果
+
+    推送内容不带校验值，沿用订阅源现有的 ETag/Last-Modified，不影响下一次条件请求。
+    """
+    from utils.encoding import charset_from_content_type
+
+    return {
+        'content': body,
+        'encoding': charset_from_content_type(content_type),
+        'url': feed.websub_topic or feed.url,
+        'status_code': 200,
+        'headers': {'Content-Type': content_type} if content_type else {},
+        'not_modified': False,
+        'etag': feed.etag,
+        'last_modified': feed.last_modified,
+        'pushed': True,
+    }
+
+
+def ingest(feed: Feed, body: bytes, content_type: Optional[str] = None):
+    """把推送内容交给解析 → 保存流水线处理"""
+    from .pipeline import FeedPipeline
+
+    # 推送不是自动抓取，不计入命中率统计，也不改变下次轮询时间
+    response = pushed_response(feed, body, content_type)
+    context = FeedPipeline(auto=False).run(feed, response=response, fetched=True)
+    logger.info(f"订阅源 {feed.title} 收到 WebSub 推送: {context.message}")
+    return context
+
+
+def due_subscriptions(now=None):
+    """需要订阅或续订的订阅源：新发现 Hub、验证超时、订阅失败或被拒绝待重试、租约即将到期"""
+    now = now or timezone.now()
+    renew_before = now + timedelta(seconds=getattr(settings, 'WEBSUB_RENEW_MARGIN', 6 * 60 * 60))
+    retry_states = [STATE_NONE, STATE_PENDING, STATE_UNSUBSCRIBED, STATE_DENIED]
+    return Feed.objects.filter(is_active=True).exclude(hub_url='').filter(
+        Q(websub_state__in=retry_states, websub_expires_at__isnull=True)
+        | Q(websub_state__in=retry_states, websub_expires_at__lte=now)
+        | Q(websub_state=STATE_SUBSCRIBED, websub_expires_at__lte=renew_before)
+    )
+
+
+def stale_subscriptions():
+    """已停用但仍在订阅中的订阅源，需要退订"""
+    return Feed.objects.filter(is_active=False, websub_state=STATE_SUBSCRIBED)
@@ -1,6 +1,7 @@
 """
 Core 应用模型测试
 """
+from unittest import mock
 from django.test import TestCase
 from core.models import Category, Feed, Article
 from django.contrib.auth.models import User
@@ -35,6 +36,17 @@ class FeedModelTest(TestCase):
         self.assertEqual(feed.title, '测试订阅源')
         self.assertEqual(str(feed), '测试订阅源')
 
+    def test_record_fetch_hit_rate(self):
+        """测试记录抓取统计和命中率"""
+        feed = Feed.objects.create(title='测试订阅源', url='https://example.com/rss.xml')
+        self.assertIsNone(feed.hit_rate)
+
+        feed.record_fetch(0)
+        feed.record_fetch(3)
+        self.assertEqual(feed.fetch_count, 2)
+        self.assertEqual(feed.hit_count, 1)
+        self.assertEqual(feed.hit_rate, 0.5)
+
 
 class ArticleModelTest(TestCase):
     """Article 模型测试"""
@@ -59,3 +71,22 @@ class ArticleModelTest(TestCase):
         self.assertEqual(article.title, '测试文章')
         self.assertEqual(str(article), '测试文章')
         self.assertFalse(article.is_read)
+        # 没有 guid 时使用文章链接
+        self.assertEqual(article.guid, 'https://example.com/article/1')
+        self.assertEqual(len(article.content_hash), 32)
+
+    def test_partial_save_skips_derived_fields(self):
+        """测试只保存部分字段时不重新计算内容哈希和摘要预览"""
+        article = Article.objects.create(
+            feed=self.feed, title='测试文章', url='https://example.com/article/2', summary='旧摘要',
+        )
+        article.is_read = True
+        with mock.patch('core.utils.article_utils.generate_excerpt') as generate_excerpt:
+            article.save(update_fields=['is_read'])
+        generate_excerpt.assert_not_called()
+
+        article.summary = '新摘要'
+        article.save(update_fields=['summary'])
+        article.refresh_from_db()
+        self.assertEqual(article.excerpt, '新摘要')
+        self.assertTrue(article.is_read)
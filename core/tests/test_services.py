@@ -0,0 +1,1053 @@
+"""
+Core 应用服务测试
+"""
+import hashlib
+import json
+import threading
+import time
+import requests
+from datetime import timedelta
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from core.models import Feed, Article
+from core.services.fetcher import RSSFetcher, get_shared_fetcher
+from core.services import parse_pool, websub
+from core.services.async_fetcher import AsyncFetchEngine
+from core.services.circuit_breaker import HostCircuitBreaker
+from core.services.parser import RSSParser, KnownEntries
+from core.services.pipeline import FeedPipeline, Stage
+from core.services.rate_limiter import HostRateLimiter, MemoryRateStore, parse_retry_after
+from utils.cloudflare_proxy import ProxyPool, STRATEGY_LEAST_LATENCY
+from core.services.stream_parser import StreamingFeedParser
+
+
+RSS_CONTENT = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0">
+<channel>
+    <title>测试订阅源</title>
+    <link>https://example.com/</link>
+    <description>测试描述</description>
+    <item>
+        <title>第一篇文章</title>
+        <link>https://example.com/article/1</link>
+        <guid>https://example.com/article/1</guid>
+        <description>第一篇摘要</description>
+        <pubDate>Mon, 06 Jan 2025 08:00:00 GMT</pubDate>
+    </item>
+    <item>
+        <title>第二篇文章</title>
+        <link>https://example.com/article/2</link>
+        <guid>https://example.com/article/2</guid>
+        <description>第二篇摘要</description>
+        <pubDate>Sun, 05 Jan 2025 08:00:00 GMT</pubDate>
+    </item>
+</channel>
+</rss>
+""".encode('utf-8')
+
+
+def make_response(status_code=200, content=b'', headers=None):
+    """构造模拟的 requests 响应"""
+    response = mock.Mock()
+    response.status_code = status_code
+    response.content = content
+    response.iter_content.side_effect = lambda chunk_size=1: (
+        content[i:i + chunk_size] for i in range(0, len(content), chunk_size)
+    )
+    response.encoding = 'utf-8'
+    response.url = 'https://example.com/rss.xml'
+    response.headers = headers or {}
+    return response
+
+
+class RSSFetcherTest(TestCase):
+    """RSSFetcher 测试"""
+
+    def setUp(self):
+        self.fetcher = RSSFetcher(
+            proxy_domain='',
+            rate_limiter=HostRateLimiter(rate=0),
+            circuit_breaker=HostCircuitBreaker(threshold=0),
+        )
+
+    def test_fetch_sends_conditional_headers(self):
+        """测试携带 ETag/Last-Modified 发起条件请求"""
+        with mock.patch.object(self.fetcher.session, 'get', return_value=make_response(304)) as get:
+            self.fetcher.fetch(
+                'https://example.com/rss.xml',
+                etag='"abc"',
+                last_modified='Mon, 06 Jan 2025 08:00:00 GMT',
+            )
+        headers = get.call_args.kwargs['headers']
+        self.assertEqual(headers['If-None-Match'], '"abc"')
+        self.assertEqual(headers['If-Modified-Since'], 'Mon, 06 Jan 2025 08:00:00 GMT')
+
+    def test_fetch_not_modified(self):
+        """测试 304 响应返回未变化结果"""
+        with mock.patch.object(self.fetcher.session, 'get', return_value=make_response(304)):
+            result = self.fetcher.fetch('https://example.com/rss.xml', etag='"abc"')
+        self.assertTrue(result['not_modified'])
+        self.assertEqual(result['content'], b'')
+        self.assertEqual(result['etag'], '"abc"')
+
+    def test_fetch_returns_validators(self):
+        """测试 200 响应返回新的校验值"""
+        response = make_response(200, RSS_CONTENT, {
+            'ETag': '"v2"',
+            'Last-Modified': 'Tue, 07 Jan 2025 08:00:00 GMT',
+            'Content-Type': 'application/rss+xml; charset=gbk',
+        })
+        with mock.patch.object(self.fetcher.session, 'get', return_value=response):
+            result = self.fetcher.fetch('https://example.com/rss.xml')
+        self.assertFalse(result['not_modified'])
+        self.assertEqual(result['encoding'], 'gbk')
+        self.assertEqual(result['etag'], '"v2"')
+        self.assertEqual(result['last_modified'], 'Tue, 07 Jan 2025 08:00:00 GMT')
+
+    def test_retry_after_pauses_host(self):
+        """测试 429 响应的 Retry-After 暂停该主机的后续请求"""
+        limiter = HostRateLimiter(rate=1, burst=1, max_wait=5, store=MemoryRateStore())
+        fetcher = RSSFetcher(
+            proxy_domain='', rate_limiter=limiter, circuit_breaker=HostCircuitBreaker(threshold=0),
+        )
+        response = make_response(429, headers={'Retry-After': '120'})
+        response.raise_for_status.side_effect = requests.HTTPError('429 Too Many Requests')
+        with mock.patch.object(fetcher.session, 'get', return_value=response):
+            self.assertIsNone(fetcher.fetch('https://example.com/rss.xml'))
+        with mock.patch.object(fetcher.session, 'get') as get:
+            self.assertIsNone(fetcher.fetch('https://example.com/other.xml'))
+        get.assert_not_called()
+        self.assertEqual(limiter.reserve('https://other.example.com/rss.xml'), 0)
+
+
+    def test_fetch_streams_with_size_cap(self):
+        """测试按块读取并在超过大小上限时放弃"""
+        self.fetcher.chunk_size = 100
+        headers = {'Content-Type': 'application/rss+xml', 'Server': 'x'}
+        response = make_response(200, RSS_CONTENT, headers)
+        with mock.patch.object(self.fetcher.session, 'get', return_value=response) as get:
+            result = self.fetcher.fetch('https://example.com/rss.xml')
+        self.assertTrue(get.call_args.kwargs['stream'])
+        self.assertEqual(result['content'], RSS_CONTENT)
+        self.assertEqual(result['headers'], {'Content-Type': 'application/rss+xml'})
+        self.assertEqual(result['digest'], hashlib.md5(RSS_CONTENT).hexdigest())
+
+        self.fetcher.max_bytes = 500
+        response = make_response(200, RSS_CONTENT)
+        with mock.patch.object(self.fetcher.session, 'get', return_value=response):
+            self.assertIsNone(self.fetcher.fetch('https://example.com/rss.xml'))
+        self.assertEqual(self.fetcher.pop_error('https://example.com/rss.xml'), 'TooLarge')
+        response.close.assert_called_once()
+
+        # 声明的长度超过上限时不读取内容
+        response = make_response(200, RSS_CONTENT, {'Content-Length': '100000000'})
+        with mock.patch.object(self.fetcher.session, 'get', return_value=response):
+            self.assertIsNone(self.fetcher.fetch('https://example.com/rss.xml'))
+        response.iter_content.assert_not_called()
+
+    def test_fetch_records_error_type(self):
+        """测试失败时记录错误类型"""
+        timeout = requests.Timeout('timed out')
+        with mock.patch.object(self.fetcher.session, 'get', side_effect=timeout):
+            self.assertIsNone(self.fetcher.fetch('https://example.com/rss.xml'))
+        self.assertEqual(self.fetcher.pop_error('https://example.com/rss.xml'), 'Timeout')
+        self.assertIsNone(self.fetcher.pop_error('https://example.com/rss.xml'))
+
+
+def start_feed_server():
+    """
+    启动本地 HTTP/1.1 服务器，对任意路径返回 RSS_CONTENT，并记录请求路径
+
+    也用作本地代理 Worker。
+    """
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    paths = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            paths.append(self.path)
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(RSS_CONTENT)))
+            self.end_headers()
+            self.wfile.write(RSS_CONTENT)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.paths = paths
+    server.base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    return server
+
+
+def stop_server(server):
+    server.shutdown()
+    server.server_close()
+
+
+def plain_fetcher(**kwargs):
+    """关闭限速和熔断的抓取器"""
+    return RSSFetcher(
+        rate_limiter=HostRateLimiter(rate=0),
+        circuit_breaker=HostCircuitBreaker(threshold=0),
+        **kwargs,
+    )
+
+
+class PooledSessionTest(TestCase):
+    """连接池与连接复用统计测试"""
+
+    def setUp(self):
+        self.server = start_feed_server()
+        self.base_url = self.server.base_url
+
+    def tearDown(self):
+        stop_server(self.server)
+
+    def test_connections_are_reused(self):
+        """测试同一主机的多次抓取复用连接并统计复用率"""
+        fetcher = plain_fetcher()
+        for i in range(3):
+            self.assertEqual(fetcher.fetch(f'{self.base_url}/{i}.xml')['content'], RSS_CONTENT)
+        stats = fetcher.connection_stats()
+        self.assertEqual((stats['requests'], stats['connections'], stats['reused']), (3, 1, 2))
+
+        fetcher.fetch(f'{self.base_url}/3.xml')
+        self.assertEqual(fetcher.connection_stats(since=stats)['reuse_rate'], 1.0)
+
+    def test_shared_fetcher_per_process(self):
+        """测试同一进程内共享同一个抓取器"""
+        self.assertIs(get_shared_fetcher(), get_shared_fetcher())
+
+
+@override_settings(FETCH_CONNECT_RETRIES=0)
+class ProxyPoolFetchTest(TestCase):
+    """通过本地代理 Worker 抓取的测试"""
+
+    def setUp(self):
+        self.origin = start_feed_server()
+        self.worker = start_feed_server()
+        # 获取一个空闲端口后立即关闭，模拟不可用的 Worker
+        dead = start_feed_server()
+        self.dead_url = dead.base_url
+        stop_server(dead)
+        self.feed_url = f'{self.origin.base_url}/rss.xml'
+
+    def tearDown(self):
+        stop_server(self.origin)
+        stop_server(self.worker)
+
+    def make_fetcher(self, domains):
+        return plain_fetcher(proxy_pool=ProxyPool.from_config(
+            domains, strategy=STRATEGY_LEAST_LATENCY, failure_threshold=1, cooldown=60,
+        ))
+
+    def test_failover_to_healthy_worker(self):
+        """测试代理连接失败时换用其他代理，并暂停失败的代理"""
+        fetcher = self.make_fetcher([self.dead_url, self.worker.base_url])
+        result = fetcher.fetch(self.feed_url)
+
+        self.assertEqual(result['content'], RSS_CONTENT)
+        self.assertEqual(self.worker.paths, [f'/{self.feed_url}'])
+        self.assertEqual([item['healthy'] for item in fetcher.proxy_pool.stats()], [False, True])
+        self.assertIsNotNone(fetcher.proxy_pool.endpoints[1].latency)
+
+        fetcher.fetch(self.feed_url)
+        self.assertEqual(len(self.worker.paths), 2)
+        self.assertEqual(self.origin.paths, [])
+
+    def test_proxy_modes(self):
+        """测试订阅源的直连规则，以及代理均不可用时默认规则退回直连"""
+        fetcher = self.make_fetcher([self.dead_url])
+        self.assertIsNotNone(fetcher.fetch(self.feed_url, proxy_mode='direct'))
+        self.assertEqual(self.origin.paths, ['/rss.xml'])
+
+        # 始终使用代理时不直连
+        self.assertIsNone(fetcher.fetch(self.feed_url, proxy_mode='proxy'))
+        self.assertEqual(len(self.origin.paths), 1)
+
+        # 默认规则：代理已暂停，直接请求源站
+        self.assertIsNotNone(fetcher.fetch(self.feed_url))
+        self.assertEqual(len(self.origin.paths), 2)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class HostCircuitBreakerTest(TestCase):
+    """HostCircuitBreaker 测试"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.breaker = HostCircuitBreaker(threshold=2, cooldown=60, max_cooldown=600)
+        self.url = 'https://dead.example.com/rss.xml'
+
+    def test_opens_after_threshold_and_probes(self):
+        """测试连续失败后熔断，到期后只放行一个探测请求"""
+        self.breaker.record_failure(self.url)
+        self.assertTrue(self.breaker.allow(self.url))
+        self.breaker.record_failure(self.url)
+        self.assertFalse(self.breaker.allow(self.url))
+        self.assertTrue(self.breaker.allow('https://example.com/rss.xml'))
+
+        later = time.time() + 61
+        with mock.patch('core.services.circuit_breaker.time.time', return_value=later):
+            self.assertTrue(self.breaker.allow(self.url))
+            self.assertFalse(self.breaker.allow(self.url))
+            self.breaker.record_success(self.url)
+            self.assertTrue(self.breaker.allow(self.url))
+            self.assertTrue(self.breaker.allow(self.url))
+
+    def test_failed_probe_doubles_cooldown(self):
+        """测试探测失败时以翻倍的时长再次熔断"""
+        self.breaker.record_failure(self.url)
+        self.breaker.record_failure(self.url)
+        later = time.time() + 61
+        with mock.patch('core.services.circuit_breaker.time.time', return_value=later):
+            self.assertTrue(self.breaker.allow(self.url))
+            self.breaker.record_failure(self.url)
+        with mock.patch('core.services.circuit_breaker.time.time', return_value=later + 100):
+            self.assertFalse(self.breaker.allow(self.url))
+        with mock.patch('core.services.circuit_breaker.time.time', return_value=later + 121):
+            self.assertTrue(self.breaker.allow(self.url))
+
+    def test_fetcher_skips_open_host(self):
+        """测试抓取器跳过熔断中的主机"""
+        fetcher = RSSFetcher(
+            proxy_domain='', rate_limiter=HostRateLimiter(rate=0), circuit_breaker=self.breaker,
+        )
+        refused = requests.ConnectionError('refused')
+        with mock.patch.object(fetcher.session, 'get', side_effect=refused) as get:
+            for _ in range(3):
+                self.assertIsNone(fetcher.fetch(self.url))
+        self.assertEqual(get.call_count, 2)
+        self.assertEqual(fetcher.pop_error(self.url), 'CircuitOpen')
+
+
+class HostRateLimiterTest(TestCase):
+    """HostRateLimiter 测试"""
+
+    def test_burst_then_spacing(self):
+        """测试连续放行 burst 个请求后按速率间隔"""
+        limiter = HostRateLimiter(rate=2, burst=3, max_wait=10, store=MemoryRateStore())
+        waits = [limiter.reserve('https://example.com/rss.xml') for _ in range(5)]
+        self.assertEqual(waits[:3], [0, 0, 0])
+        self.assertAlmostEqual(waits[3], 0.5, places=1)
+        self.assertAlmostEqual(waits[4], 1.0, places=1)
+        self.assertEqual(limiter.reserve('https://other.example.com/rss.xml'), 0)
+
+    def test_max_wait_denies_without_reserving(self):
+        """测试等待时间超过上限时拒绝且不占用名额"""
+        limiter = HostRateLimiter(rate=1, burst=1, max_wait=1.5, store=MemoryRateStore())
+        waits = [limiter.reserve('https://example.com/rss.xml') for _ in range(4)]
+        self.assertEqual(waits[0], 0)
+        self.assertIsNone(waits[3])
+        self.assertFalse(limiter.wait('https://example.com/rss.xml'))
+
+    def test_disabled(self):
+        """测试 rate 为 0 时不限速"""
+        limiter = HostRateLimiter(rate=0, store=MemoryRateStore())
+        self.assertEqual([limiter.reserve('https://example.com/') for _ in range(10)], [0.0] * 10)
+
+    def test_falls_back_to_memory_when_redis_fails(self):
+        """测试共享存储出错时改用进程内存"""
+        from core.services import rate_limiter
+
+        broken = mock.Mock()
+        broken.reserve.side_effect = ConnectionError('refused')
+        with mock.patch.object(rate_limiter, 'get_store', return_value=broken), \
+                mock.patch.object(rate_limiter, '_memory_store', MemoryRateStore()):
+            self.assertEqual(HostRateLimiter(rate=1, burst=1).reserve('https://example.com/'), 0)
+
+    def test_parse_retry_after(self):
+        """测试解析秒数和 HTTP 日期格式的 Retry-After"""
+        self.assertEqual(parse_retry_after('30'), 30)
+        self.assertIsNone(parse_retry_after('soon'))
+        self.assertIsNone(parse_retry_after(None))
+        self.assertEqual(parse_retry_after('Mon, 06 Jan 2025 08:00:00 GMT'), 0)
+
+
+ATOM_CONTENT = """<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+    <title>Atom 订阅源</title>
+    <subtitle>测试描述</subtitle>
+    <link href="https://example.com/"/>
+    <link rel="self" href="https://example.com/atom.xml"/>
+    <entry>
+        <title>第一篇文章</title>
+        <id>tag:example.com,2025:1</id>
+        <link rel="alternate" href="https://example.com/article/1"/>
+        <published>2025-01-06T08:00:00Z</published>
+        <author><name>作者</name></author>
+        <content type="xhtml"><div xmlns="http://www.w3.org/1999/xhtml">
+            <p>正文 <b>加粗</b></p>
+        </div></content>
+    </entry>
+    <entry>
+        <title type="html">&lt;i&gt;第二篇&lt;/i&gt;</title>
+        <id>tag:example.com,2025:2</id>
+        <summary>纯文本 &lt; 摘要</summary>
+        <content type="html">&lt;p onclick="x()"&gt;正文&lt;/p&gt;
+            &lt;script&gt;alert(1)&lt;/script&gt;</content>
+    </entry>
+</feed>
+""".encode('utf-8')
+
+
+RDF_CONTENT = """<?xml version="1.0" encoding="UTF-8"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" xmlns="http://purl.org/rss/1.0/"
+         xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:content="http://purl.org/rss/1.0/modules/content/">
+    <channel rdf:about="https://example.com/">
+        <title>RDF 订阅源</title>
+        <link>https://example.com/</link>
+        <description>测试描述</description>
+    </channel>
+    <item rdf:about="https://example.com/article/1">
+        <title>第一篇文章</title>
+        <link>https://example.com/article/1</link>
+        <description>&lt;p&gt;摘要&lt;/p&gt;</description>
+        <dc:creator>作者</dc:creator>
+        <dc:date>2025-01-06T08:00:00Z</dc:date>
+        <content:encoded><![CDATA[<p>正文</p>]]></content:encoded>
+    </item>
+    <item rdf:about="https://example.com/article/2">
+        <title>第二篇文章</title>
+    </item>
+</rdf:RDF>
+""".encode('utf-8')
+
+JSON_FEED = {
+    'version': 'https://jsonfeed.org/version/1.1',
+    'title': 'JSON 订阅源',
+    'home_page_url': 'https://example.com/',
+    'items': [
+        {
+            'id': '2', 'url': 'https://example.com/article/2', 'title': '第二篇',
+            'content_html': '<p>正文</p><script>alert(1)</script>', 'summary': '纯文本 <摘要>',
+            'date_published': '2025-01-06T16:00:00+08:00', 'authors': [{'name': '作者'}],
+        },
+        {'id': 1, 'external_url': 'https://example.org/1', 'content_text': '纯文本正文'},
+    ],
+}
+
+
+class StreamingFeedParserTest(TestCase):
+    """流式解析测试"""
+
+    def assert_same_as_feedparser(self, content):
+        fast = RSSParser(fast_path=True).parse(content)
+        slow = RSSParser(fast_path=False).parse(content)
+        self.assertEqual(fast, slow)
+        return fast
+
+    def test_rss_matches_feedparser(self):
+        """测试 RSS 2.0 解析结果与 feedparser 一致"""
+        result = self.assert_same_as_feedparser(RSS_CONTENT)
+        self.assertEqual(len(result['entries']), 2)
+
+    def test_atom_matches_feedparser(self):
+        """测试 Atom 解析结果（含 xhtml 内容和 HTML 清理）与 feedparser 一致"""
+        result = self.assert_same_as_feedparser(ATOM_CONTENT)
+        self.assertNotIn('<script>', result['entries'][1].content)
+        self.assertEqual(result['entries'][0].excerpt, '正文 加粗')
+
+    def test_rdf_matches_feedparser(self):
+        """测试 RDF（RSS 1.0）解析结果与 feedparser 一致"""
+        result = self.assert_same_as_feedparser(RDF_CONTENT)
+        self.assertEqual(result['title'], 'RDF 订阅源')
+        self.assertEqual(result['entries'][0].author, '作者')
+        self.assertIsNotNone(result['entries'][0].pub_date)
+
+    def test_gbk_feed_without_loss(self):
+        """测试 GBK 订阅源（XML 声明或仅 HTTP 声明）不丢失字符"""
+        body = RSS_CONTENT.decode('utf-8').replace('第一篇文章', '第一篇文章 镕䶮')
+        undeclared = body.replace('<?xml version="1.0" encoding="UTF-8"?>', '')
+        declared = body.replace('encoding="UTF-8"', 'encoding="gb2312"')
+
+        cases = ((declared.encode('gb18030'), None), (undeclared.encode('gb18030'), 'GBK'))
+        for content, http_charset in cases:
+            for fast_path in (True, False):
+                result = RSSParser(fast_path=fast_path).parse(content, http_charset)
+                self.assertEqual(result['title'], '测试订阅源')
+                self.assertEqual(result['entries'][0].title, '第一篇文章 镕䶮')
+
+    def test_unsupported_or_malformed_returns_none(self):
+        """测试不支持的格式和格式错误的文档返回 None"""
+        parser = StreamingFeedParser()
+        # RSS 0.90 的 RDF 文档交给 feedparser
+        rdf = (
+            b'<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" '
+            b'xmlns="http://my.netscape.com/rdf/simple/0.9/"><channel><title>t</title></channel></rdf:RDF>'
+        )
+        self.assertIsNone(parser.parse(rdf))
+        self.assertIsNone(parser.parse(b'<opml version="2.0"></opml>'))
+        self.assertIsNone(parser.parse(RSS_CONTENT.replace(b'</channel>', b'')))
+
+    def test_malformed_falls_back_to_feedparser(self):
+        """测试格式错误时回退到 feedparser"""
+        content = RSS_CONTENT.replace(b'</channel>', b'')
+        result = RSSParser(fast_path=True).parse(content)
+        self.assertEqual(len(result['entries']), 2)
+
+
+class FormatRegistryTest(TestCase):
+    """按格式选择解析器的测试"""
+
+    def test_json_feed(self):
+        """测试 JSON Feed 使用 json 解析，纯文本内容被转义"""
+        result = RSSParser(fast_path=False).parse(json.dumps(JSON_FEED).encode('utf-8'))
+
+        self.assertEqual(result['title'], 'JSON 订阅源')
+        self.assertEqual(result['link'], 'https://example.com/')
+        first, second = result['entries']
+        self.assertEqual(
+            (first.guid, first.link, first.author), ('2', 'https://example.com/article/2', '作者'),
+        )
+        self.assertEqual(first.summary, '纯文本 &lt;摘要&gt;')
+        self.assertEqual(first.content, '<p>正文</p>')
+        self.assertEqual(first.pub_date.hour, 8)
+        self.assertEqual(
+            (second.guid, second.link, second.content),
+            ('1', 'https://example.org/1', '纯文本正文'),
+        )
+
+    def test_json_feed_incremental(self):
+        """测试 JSON Feed 跳过已知文章"""
+        known = KnownEntries(['1'], stop_after=3)
+        result = RSSParser().parse(json.dumps(JSON_FEED).encode('utf-8'), known=known)
+        self.assertEqual([e.guid for e in result['entries']], ['2'])
+        self.assertEqual(result['skipped'], 1)
+
+    def test_dispatch_by_sniffed_format(self):
+        """测试只把嗅探出的格式交给对应的专用解析器"""
+        with mock.patch('core.services.json_feed.JSONFeedParser.parse') as json_parse:
+            RSSParser().parse(RSS_CONTENT)
+        json_parse.assert_not_called()
+
+
+def build_rss(count):
+    """构造按时间倒序排列的 RSS 文档，文章编号从大到小"""
+    items = ''.join(
+        f'<item><title>文章 {i}</title><link>https://example.com/article/{i}</link>'
+        f'<guid>https://example.com/article/{i}</guid><description>摘要 {i}</description></item>'
+        for i in range(count, 0, -1)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        f'<title>测试订阅源</title><link>https://example.com/</link>{items}</channel></rss>'
+    ).encode('utf-8')
+
+
+class IncrementalParseTest(TestCase):
+    """增量解析测试"""
+
+    def known(self, *numbers):
+        return KnownEntries([f'https://example.com/article/{i}' for i in numbers], stop_after=3)
+
+    def test_stop_after_consecutive_known_entries(self):
+        """测试只返回新文章，连续遇到已知文章后停止"""
+        for fast_path in (True, False):
+            known = self.known(*range(1, 9))
+            result = RSSParser(fast_path=fast_path).parse(build_rss(10), known=known)
+
+            self.assertEqual([e.guid for e in result['entries']], [
+                'https://example.com/article/10', 'https://example.com/article/9',
+            ])
+            self.assertEqual(result['skipped'], 3)
+            self.assertEqual(result['title'], '测试订阅源')
+
+    def test_isolated_known_entry_does_not_stop(self):
+        """测试零散的已知文章只跳过自身，不会提前停止"""
+        known = self.known(9, 7)
+        result = RSSParser().parse(build_rss(10), known=known)
+        self.assertEqual(len(result['entries']), 8)
+        self.assertFalse(known.stopped)
+
+    def test_pipeline_parses_only_new_entries(self):
+        """测试流水线在稳定状态下只处理新文章"""
+        feed = Feed.objects.create(title='测试订阅源', url='https://example.com/rss.xml')
+        FeedPipeline(fetcher=StubFetcher({feed.url: fetched(build_rss(10))})).run(feed)
+
+        with mock.patch('core.services.stream_parser.StreamingFeedParser._rss_entry',
+                        autospec=True, side_effect=StreamingFeedParser._rss_entry) as convert:
+            fetcher = StubFetcher({feed.url: fetched(build_rss(11))})
+            context = FeedPipeline(fetcher=fetcher).run(feed)
+
+        self.assertEqual((context.created, context.updated), (1, 0))
+        self.assertEqual(convert.call_count, 1)
+        self.assertEqual(Article.objects.filter(feed=feed).count(), 11)
+
+
+class SlowFetcher:
+    """模拟抓取器，记录同一主机的最大并发数"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active = {}
+        self.max_active = {}
+        self.throttle = set()
+
+    def fetch(self, url, timeout=30, etag=None, last_modified=None, throttle=True):
+        host = url.split('/')[2]
+        self.throttle.add(throttle)
+        with self.lock:
+            self.active[host] = self.active.get(host, 0) + 1
+            self.max_active[host] = max(self.max_active.get(host, 0), self.active[host])
+        time.sleep(self.delay)
+        with self.lock:
+            self.active[host] -= 1
+        return {'url': url, 'etag': etag}
+
+
+class AsyncFetchEngineTest(TestCase):
+    """AsyncFetchEngine 测试"""
+
+    def test_fetch_all_respects_per_host_limit(self):
+        """测试单主机并发上限并保持结果映射"""
+        fetcher = SlowFetcher()
+        engine = AsyncFetchEngine(fetcher=fetcher, max_concurrency=10, per_host_concurrency=2)
+        urls = [f'https://a.example.com/{i}' for i in range(6)]
+        urls += [f'https://b.example.com/{i}' for i in range(6)]
+
+        results = engine.fetch_all(urls, validators={urls[0]: {'etag': '"x"'}})
+
+        self.assertEqual(set(results), set(urls))
+        self.assertEqual(results[urls[0]]['etag'], '"x"')
+        self.assertLessEqual(fetcher.max_active['a.example.com'], 2)
+        self.assertLessEqual(fetcher.max_active['b.example.com'], 2)
+
+    def test_fetch_all_timeout(self):
+        """测试超过单请求超时时返回 None"""
+        engine = AsyncFetchEngine(fetcher=SlowFetcher(delay=2))
+        results = engine.fetch_all(['https://slow.example.com/rss'], timeout=0.1)
+        self.assertIsNone(results['https://slow.example.com/rss'])
+
+    def test_fetch_all_waits_for_host_rate(self):
+        """测试引擎按主机限速等待，等待过长的请求被跳过"""
+        fetcher = SlowFetcher(delay=0)
+        fetcher.rate_limiter = HostRateLimiter(
+            rate=10, burst=1, max_wait=0.25, store=MemoryRateStore(),
+        )
+        engine = AsyncFetchEngine(fetcher=fetcher, per_host_concurrency=5)
+        urls = [f'https://a.example.com/{i}' for i in range(5)]
+
+        started = time.monotonic()
+        results = engine.fetch_all(urls)
+
+        self.assertEqual(sum(result is not None for result in results.values()), 3)
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+        self.assertEqual(fetcher.throttle, {False})
+
+
+class FetchFeedTaskTest(TestCase):
+    """fetch_feed 任务测试"""
+
+    def setUp(self):
+        self.feed = Feed.objects.create(
+            title='测试订阅源',
+            url='https://example.com/rss.xml',
+            etag='"abc"',
+        )
+
+    def test_not_modified_skips_parse(self):
+        """测试 304 时跳过解析和保存"""
+        from celery_tasks.tasks import fetch_feed
+
+        response = make_response(304)
+        with mock.patch('core.services.fetcher.requests.Session.get', return_value=response), \
+                mock.patch('core.services.parser.RSSParser.parse') as parse:
+            fetch_feed(self.feed.pk)
+
+        parse.assert_not_called()
+        self.feed.refresh_from_db()
+        self.assertEqual(self.feed.last_fetch_status, '未变化')
+        self.assertEqual(Article.objects.count(), 0)
+
+    def test_success_stores_validators(self):
+        """测试成功抓取后保存校验值"""
+        from celery_tasks.tasks import fetch_feed
+
+        response = make_response(200, RSS_CONTENT, {'ETag': '"v2"'})
+        with mock.patch('core.services.fetcher.requests.Session.get', return_value=response):
+            fetch_feed(self.feed.pk)
+
+        self.feed.refresh_from_db()
+        self.assertEqual(self.feed.etag, '"v2"')
+        self.assertEqual(Article.objects.filter(feed=self.feed).count(), 2)
+
+
+class StubFetcher:
+    """按 URL 返回预设响应的抓取器"""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.multiple_calls = 0
+
+    def fetch(self, url, timeout=30, etag=None, last_modified=None):
+        return self.responses.get(url)
+
+    def fetch_multiple(self, urls, timeout=30, validators=None):
+        self.multiple_calls += 1
+        return {url: self.responses.get(url) for url in urls}
+
+
+def fetched(content=RSS_CONTENT, etag='"v2"'):
+    """构造 RSSFetcher.fetch 的返回值"""
+    return {
+        'content': content,
+        'encoding': 'utf-8',
+        'url': 'https://example.com/rss.xml',
+        'status_code': 200,
+        'headers': {},
+        'not_modified': False,
+        'etag': etag,
+        'last_modified': '',
+    }
+
+
+class FeedPipelineTest(TestCase):
+    """FeedPipeline 测试"""
+
+    def setUp(self):
+        self.feed = Feed.objects.create(title='旧标题', url='https://example.com/rss.xml')
+        self.broken = Feed.objects.create(title='失效', url='https://broken.example.com/rss.xml')
+
+    def test_run_saves_articles_and_records_stats(self):
+        """测试完整流程保存文章、更新订阅源信息和抓取统计"""
+        fetcher = StubFetcher({self.feed.url: fetched()})
+        context = FeedPipeline(fetcher=fetcher).run(self.feed)
+
+        self.assertEqual(context.result()['status'], 'success')
+        self.assertEqual((context.created, context.updated), (2, 0))
+        self.feed.refresh_from_db()
+        self.assertEqual(self.feed.title, '测试订阅源')
+        self.assertEqual(self.feed.last_fetch_status, '成功')
+        self.assertEqual(self.feed.etag, '"v2"')
+        self.assertEqual(self.feed.fetch_count, 1)
+        self.assertTrue(timezone.is_aware(self.feed.last_fetch_at))
+
+    def test_run_many_fetches_concurrently(self):
+        """测试批量处理时只调用一次并发抓取，失败的订阅源单独记录"""
+        fetcher = StubFetcher({self.feed.url: fetched()})
+        done = []
+        contexts = FeedPipeline(fetcher=fetcher).run_many(
+            [self.feed, self.broken], on_done=done.append,
+        )
+
+        self.assertEqual(fetcher.multiple_calls, 1)
+        self.assertEqual(len(done), 2)
+        self.assertEqual([c.status for c in contexts], ['success', 'error'])
+        self.broken.refresh_from_db()
+        self.assertEqual(self.broken.last_fetch_status, '抓取失败')
+        self.assertGreater(self.broken.next_fetch_at, timezone.now())
+
+    def test_failures_back_off_and_deactivate(self):
+        """测试连续失败时指数退避，持续失败超过期限后自动停用，成功后清除失败记录"""
+        pipeline = FeedPipeline(fetcher=StubFetcher({}))
+        pipeline.run(self.broken)
+        context = pipeline.run(self.broken)
+
+        self.broken.refresh_from_db()
+        self.assertEqual((self.broken.failure_count, self.broken.last_error), (2, 'FetchFailed'))
+        self.assertEqual(context.message, '抓取失败（FetchFailed）')
+        delay = self.broken.next_fetch_at - timezone.now()
+        self.assertGreater(delay, timedelta(minutes=239))
+        self.assertLessEqual(delay, timedelta(minutes=240))
+
+        self.broken.failing_since = timezone.now() - timedelta(days=15)
+        self.broken.save()
+        pipeline.run(self.broken)
+        self.broken.refresh_from_db()
+        self.assertFalse(self.broken.is_active)
+
+        FeedPipeline(fetcher=StubFetcher({self.broken.url: fetched()})).run(self.broken)
+        self.broken.refresh_from_db()
+        self.assertEqual((self.broken.failure_count, self.broken.last_error), (0, ''))
+        self.assertIsNone(self.broken.failing_since)
+
+    def test_deferred_fetch_does_not_count_as_failure(self):
+        """测试主机熔断或限速跳过的抓取不计入连续失败"""
+        fetcher = StubFetcher({})
+        fetcher.pop_error = lambda url: 'CircuitOpen'
+        context = FeedPipeline(fetcher=fetcher).run(self.broken)
+
+        self.assertEqual(context.fetch_status, '已推迟')
+        self.broken.refresh_from_db()
+        self.assertEqual(self.broken.failure_count, 0)
+
+    def test_unchanged_content_skips_parse(self):
+        """测试响应内容与上次相同时跳过解析和保存，并计入未变化次数"""
+        FeedPipeline(fetcher=StubFetcher({self.feed.url: fetched()})).run(self.feed)
+
+        with mock.patch('core.services.parser.RSSParser.parse', autospec=True,
+                        side_effect=RSSParser.parse) as parse:
+            fetcher = StubFetcher({self.feed.url: fetched(etag='"v3"')})
+            context = FeedPipeline(fetcher=fetcher).run(self.feed)
+            self.assertEqual(context.fetch_status, '内容未变化')
+            parse.assert_not_called()
+            self.feed.refresh_from_db()
+            self.assertEqual((self.feed.unchanged_count, self.feed.etag), (1, '"v3"'))
+
+            # 强制抓取时忽略内容摘要
+            FeedPipeline(fetcher=StubFetcher({self.feed.url: fetched()}), force=True).run(self.feed)
+            parse.assert_called_once()
+
+        self.feed.refresh_from_db()
+        self.assertEqual(self.feed.fetch_count, 3)
+
+        fetcher = StubFetcher({self.feed.url: fetched(build_rss(3))})
+        context = FeedPipeline(fetcher=fetcher).run(self.feed)
+        self.assertEqual((context.created, context.fetch_status), (1, '成功'))
+
+    def test_timing_hooks_and_custom_stage(self):
+        """测试自定义阶段和阶段计时钩子"""
+        class FailingStage(Stage):
+            name = 'failing'
+
+            def process(self, context):
+                raise RuntimeError('boom')
+
+        calls = []
+        pipeline = FeedPipeline(
+            fetcher=StubFetcher({self.feed.url: fetched()}),
+            hooks=[lambda name, context, elapsed: calls.append(name)],
+        )
+        pipeline.stages.insert(1, FailingStage())
+
+        context = pipeline.run(self.feed)
+
+        self.assertEqual(calls, ['fetch', 'failing'])
+        self.assertIn('fetch', context.timings)
+        self.assertEqual(context.status, 'error')
+        self.assertEqual(Article.objects.count(), 0)
+        self.feed.refresh_from_db()
+        self.assertEqual(self.feed.last_fetch_status, '处理失败')
+        self.assertEqual(self.feed.title, '旧标题')
+
+    def test_manual_run_skips_auto_stats(self):
+        """测试手动抓取不计入自动抓取统计"""
+        fetcher = StubFetcher({self.feed.url: fetched()})
+        FeedPipeline(fetcher=fetcher, auto=False).run(self.feed)
+
+        self.feed.refresh_from_db()
+        self.assertEqual(self.feed.fetch_count, 0)
+        self.assertIsNone(self.feed.last_auto_fetch_at)
+
+
+class PooledParseTest(TestCase):
+    """进程池解析测试"""
+
+    @classmethod
+    def tearDownClass(cls):
+        parse_pool.shutdown_pool()
+        super().tearDownClass()
+
+    def test_parse_many_matches_in_process(self):
+        """测试进程池解析结果与当前进程解析一致"""
+        jobs = [
+            (RSS_CONTENT, 'utf-8', None),
+            (ATOM_CONTENT, 'utf-8', None),
+            (b'<broken', 'utf-8', None),
+        ]
+        results = parse_pool.parse_many(jobs, workers=2)
+
+        self.assertEqual(results[0], RSSParser().parse(RSS_CONTENT))
+        self.assertEqual(results[1], RSSParser().parse(ATOM_CONTENT))
+        self.assertEqual(results[2]['entries'], [])
+
+    def test_pipeline_uses_pool_for_batches(self):
+        """测试批量处理时使用进程池解析，进程池不可用时回退到当前进程"""
+        feeds = [
+            Feed.objects.create(title=f'订阅源 {i}', url=f'https://example{i}.com/rss.xml')
+            for i in range(2)
+        ]
+        fetcher = StubFetcher({feed.url: fetched() for feed in feeds})
+
+        with mock.patch.object(parse_pool, 'parse_many', wraps=parse_pool.parse_many) as parse_many:
+            contexts = FeedPipeline(fetcher=fetcher, parse_workers=2).run_many(feeds)
+        parse_many.assert_called_once()
+        self.assertEqual([c.created for c in contexts], [2, 2])
+
+        with mock.patch.object(parse_pool, 'parse_many', side_effect=RuntimeError('pool broken')):
+            contexts = FeedPipeline(fetcher=fetcher, parse_workers=2, force=True).run_many(feeds)
+        self.assertEqual([c.status for c in contexts], ['success', 'success'])
+
+    @override_settings(FEED_PARSE_WORKERS=2)
+    def test_daemon_process_parses_in_process(self):
+        """测试在守护进程（Celery prefork worker）中不创建进程池，直接在当前进程解析"""
+        feeds = [
+            Feed.objects.create(title=f'订阅源 {i}', url=f'https://example{i}.com/rss.xml')
+            for i in range(2)
+        ]
+        fetcher = StubFetcher({feed.url: fetched() for feed in feeds})
+        self.assertEqual(parse_pool.get_workers(), 2)
+
+        daemon = mock.Mock(daemon=True)
+        with mock.patch('multiprocessing.current_process', return_value=daemon), \
+                mock.patch.object(parse_pool, 'get_pool') as get_pool, \
+                mock.patch('core.services.pipeline.logger') as pipeline_logger:
+            self.assertEqual(parse_pool.get_workers(), 0)
+            contexts = FeedPipeline(fetcher=fetcher, parse_workers=2).run_many(feeds)
+
+        get_pool.assert_not_called()
+        pipeline_logger.exception.assert_not_called()
+        self.assertEqual([c.created for c in contexts], [2, 2])
+
+
+WEBSUB_RSS = RSS_CONTENT.replace(
+    b'<rss version="2.0">', b'<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom">'
+).replace(
+    b'<channel>',
+    b'<channel>\n    <atom:link rel="hub" href="https://hub.example.com/"/>'
+    b'\n    <atom:link rel="self" href="https://example.com/feed"/>',
+)
+
+
+def start_hub_server(status=202):
+    """启动本地 WebSub Hub，记录收到的订阅请求表单"""
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+    from urllib.parse import parse_qs
+
+    forms = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            forms.append({k: v[0] for k, v in parse_qs(body.decode()).items()})
+            self.send_response(status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.forms = forms
+    server.base_url = f'http://127.0.0.1:{server.server_address[1]}/'
+    return server
+
+
+@override_settings(WEBSUB_CALLBACK_BASE_URL='https://reader.example.com')
+class WebSubTest(TestCase):
+    """WebSub 订阅测试"""
+
+    def setUp(self):
+        self.feed = Feed.objects.create(title='推送', url='https://example.com/rss.xml')
+
+    def test_discover_hub(self):
+        """测试从文档和 Link 响应头发现 Hub，流式解析与 feedparser 结果一致"""
+        fast = RSSParser(fast_path=True).parse(WEBSUB_RSS)
+        slow = RSSParser(fast_path=False).parse(WEBSUB_RSS)
+        self.assertEqual(fast, slow)
+        self.assertEqual((fast['hub'], fast['self_url']), ('https://hub.example.com/', 'https://example.com/feed'))
+        self.assertEqual(websub.discover_hub({}, fast), ('https://hub.example.com/', 'https://example.com/feed'))
+
+        headers = {
+            'Link': '<https://push.example.com/>; rel="hub", '
+                    '<https://example.com/rss.xml>; rel="self"',
+        }
+        self.assertEqual(
+            websub.discover_hub(headers, fast), ('https://push.example.com/', 'https://example.com/rss.xml'),
+        )
+        self.assertEqual(websub.discover_hub({}, RSSParser().parse(RSS_CONTENT)), ('', ''))
+
+    def test_pipeline_records_hub(self):
+        """测试抓取时记录 Hub，不再声明时清除"""
+        FeedPipeline(fetcher=StubFetcher({self.feed.url: fetched(WEBSUB_RSS)})).run(self.feed)
+        self.feed.refresh_from_db()
+        self.assertEqual(self.feed.hub_url, 'https://hub.example.com/')
+        self.assertEqual(self.feed.websub_topic, 'https://example.com/feed')
+        self.assertIn(self.feed, websub.due_subscriptions())
+
+        FeedPipeline(fetcher=StubFetcher({self.feed.url: fetched()}), force=True).run(self.feed)
+        self.feed.refresh_from_db()
+        self.assertEqual((self.feed.hub_url, self.feed.websub_topic), ('', ''))
+
+    def test_subscribe_verify_and_renew(self):
+        """测试向 Hub 订阅、验证意图后放宽轮询间隔，租约到期前续订"""
+        hub = start_hub_server()
+        self.addCleanup(stop_server, hub)
+        self.feed.hub_url = hub.base_url
+        self.feed.websub_topic = 'https://example.com/feed'
+        self.feed.save()
+
+        self.assertTrue(websub.request_subscription(self.feed, session=requests.Session()))
+        form = hub.forms[0]
+        self.assertEqual(form['hub.mode'], 'subscribe')
+        self.assertEqual(form['hub.topic'], 'https://example.com/feed')
+        self.assertEqual(form['hub.callback'], f'https://reader.example.com/websub/{self.feed.pk}/')
+        self.assertEqual(form['hub.secret'], self.feed.websub_secret)
+        self.assertEqual(self.feed.websub_state, websub.STATE_PENDING)
+        self.assertNotIn(self.feed, websub.due_subscriptions())
+
+        # 主题不匹配的验证请求不予认可
+        params = {
+            'hub.mode': 'subscribe', 'hub.topic': 'https://evil.example.com/', 'hub.challenge': 'x',
+        }
+        self.assertIsNone(websub.verify_intent(self.feed, params))
+        params.update({'hub.topic': 'https://example.com/feed', 'hub.lease_seconds': '86400'})
+        self.assertEqual(websub.verify_intent(self.feed, params), 'x')
+
+        self.feed.refresh_from_db()
+        self.assertTrue(self.feed.websub_active())
+        self.assertGreaterEqual(self.feed.next_fetch_at, timezone.now() + timedelta(hours=23))
+        self.assertNotIn(self.feed, websub.due_subscriptions())
+        self.assertIn(self.feed, websub.due_subscriptions(now=timezone.now() + timedelta(hours=20)))
+
+    def test_rejected_subscription_retries_later(self):
+        """测试 Hub 拒绝订阅请求时稍后重试"""
+        hub = start_hub_server(status=500)
+        self.addCleanup(stop_server, hub)
+        self.feed.hub_url = hub.base_url
+        self.feed.save()
+
+        self.assertFalse(websub.request_subscription(self.feed, session=requests.Session()))
+        self.feed.refresh_from_db()
+        self.assertEqual(self.feed.websub_state, websub.STATE_NONE)
+        self.assertNotIn(self.feed, websub.due_subscriptions())
+        self.assertIn(self.feed, websub.due_subscriptions(now=timezone.now() + timedelta(hours=2)))
+
+
+class ScheduleDueFeedsTest(TestCase):
+    """schedule_due_feeds 任务测试"""
+
+    def setUp(self):
+        now = timezone.now()
+        self.due = Feed.objects.create(
+            title='到期', url='https://example.com/due.xml',
+            next_fetch_at=now - timedelta(minutes=5),
+        )
+        self.not_due = Feed.objects.create(
+            title='未到期', url='https://example.com/not-due.xml',
+            next_fetch_at=now + timedelta(minutes=30),
+        )
+        self.inactive = Feed.objects.create(
+            title='已禁用', url='https://example.com/inactive.xml',
+            is_active=False, next_fetch_at=now - timedelta(minutes=5),
+        )
+
+    def test_dispatch_only_due_feeds(self):
+        """测试只分发到期的启用订阅源，并推后下次抓取时间"""
+        from celery_tasks.tasks import schedule_due_feeds, fetch_feeds_batch
+
+        with mock.patch.object(fetch_feeds_batch, 'apply_async') as apply_async:
+            count = schedule_due_feeds()
+
+        self.assertEqual(count, 1)
+        apply_async.assert_called_once()
+        self.assertEqual(apply_async.call_args.args[0], ([self.due.pk],))
+        self.due.refresh_from_db()
+        self.assertGreater(self.due.next_fetch_at, timezone.now())
+
+        # 下一轮调度不会重复分发
+        with mock.patch.object(fetch_feeds_batch, 'apply_async') as apply_async:
+            self.assertEqual(schedule_due_feeds(), 0)
+        apply_async.assert_not_called()
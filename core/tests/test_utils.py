@@ -0,0 +1,355 @@
+"""
+Core 应用工具函数测试
+"""
+import time
+from unittest import mock
+from datetime import timedelta, timezone as dt_timezone
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from core.models import Feed, Article
+from core.utils.article_utils import generate_content_hash, generate_excerpt, save_articles_bulk
+from core.utils.pagination import KeysetPaginator
+from core.utils.schedule_utils import estimate_fetch_interval
+from utils.cloudflare_proxy import ProxyPool, STRATEGY_LEAST_LATENCY
+from utils.encoding import charset_from_content_type, detect_encoding
+from utils.entries import ParsedEntry, date_from_struct
+from utils.feed_parser import detect_feed_type
+from utils.html_cleaner import clean_html
+
+
+def make_entry(index, **kwargs):
+    """构造解析后的文章条目"""
+    entry = {
+        'title': f'文章 {index}',
+        'link': f'https://example.com/article/{index}',
+        'guid': f'https://example.com/article/{index}',
+        'author': '',
+        'summary': f'摘要 {index}',
+        'content': f'内容 {index}',
+        'pub_date': None,
+    }
+    entry.update(kwargs)
+    return ParsedEntry(**entry)
+
+
+class SaveArticlesBulkTest(TestCase):
+    """save_articles_bulk 测试"""
+
+    def setUp(self):
+        self.feed = Feed.objects.create(title='测试订阅源', url='https://example.com/rss.xml')
+
+    def test_create_new_articles(self):
+        """测试批量创建新文章"""
+        created, updated = save_articles_bulk(self.feed, [make_entry(i) for i in range(5)])
+        self.assertEqual((created, updated), (5, 0))
+        self.assertEqual(Article.objects.filter(feed=self.feed).count(), 5)
+
+    def test_update_only_changed_articles(self):
+        """测试只更新内容有变化的文章"""
+        save_articles_bulk(self.feed, [make_entry(i) for i in range(3)])
+        entries = [make_entry(0), make_entry(1, title='新标题'), make_entry(2)]
+
+        created, updated = save_articles_bulk(self.feed, entries)
+
+        self.assertEqual((created, updated), (0, 1))
+        self.assertTrue(Article.objects.filter(feed=self.feed, title='新标题').exists())
+        self.assertEqual(Article.objects.filter(feed=self.feed).count(), 3)
+
+    def test_concurrent_insert_skipped(self):
+        """测试比对后被并发写入的文章不会导致唯一约束冲突"""
+        Article.objects.create(feed=self.feed, title='文章 0', url='https://example.com/article/0')
+        entries = [make_entry(0), make_entry(1)]
+
+        # 模拟另一个抓取在比对之后才写入文章 0
+        real_filter = Article.objects.filter
+        lookups = [Article.objects.none()]
+
+        def stale_filter(*args, **kwargs):
+            return lookups.pop() if lookups else real_filter(*args, **kwargs)
+
+        with mock.patch.object(Article.objects, 'filter', side_effect=stale_filter):
+            created, updated = save_articles_bulk(self.feed, entries)
+
+        self.assertEqual((created, updated), (1, 0))
+        self.assertEqual(Article.objects.filter(feed=self.feed).count(), 2)
+
+    def test_match_by_link_when_guid_differs(self):
+        """测试 guid 与 link 不同时按 link 匹配历史文章，并回写真实 guid"""
+        Article.objects.create(feed=self.feed, title='文章 0', url='https://example.com/article/0')
+        entry = make_entry(0, guid='tag:example.com,2025:0')
+
+        created, updated = save_articles_bulk(self.feed, [entry])
+
+        self.assertEqual((created, updated), (0, 1))
+        article = Article.objects.get(feed=self.feed)
+        self.assertEqual(article.guid, 'tag:example.com,2025:0')
+
+        # 再次保存时直接按 guid 命中，内容哈希相同则不更新
+        self.assertEqual(save_articles_bulk(self.feed, [entry]), (0, 0))
+
+    def test_content_hash_stored(self):
+        """测试保存文章时记录内容哈希"""
+        save_articles_bulk(self.feed, [make_entry(0)])
+        article = Article.objects.get(feed=self.feed)
+        self.assertEqual(
+            article.content_hash,
+            generate_content_hash(article.title, article.summary, article.content),
+        )
+
+    def test_query_count_independent_of_entries(self):
+        """测试查询次数不随文章数量增长"""
+        save_articles_bulk(self.feed, [make_entry(i) for i in range(50)])
+        entries = [make_entry(i, title=f'新标题 {i}') for i in range(50)]
+        entries += [make_entry(i) for i in range(50, 100)]
+
+        # 事务开始/锁定订阅源/查询已有文章/统计/批量创建/统计/批量更新/事务提交
+        with self.assertNumQueries(8):
+            created, updated = save_articles_bulk(self.feed, entries)
+
+        self.assertEqual((created, updated), (50, 50))
+
+
+class KeysetPaginatorTest(TestCase):
+    """游标分页测试"""
+
+    def setUp(self):
+        feed = Feed.objects.create(title='测试订阅源', url='https://example.com/rss.xml')
+        now = timezone.now()
+        for i in range(7):
+            pub_date = None if i % 3 == 0 else now - timedelta(hours=i // 2)
+            Article.objects.create(
+                feed=feed, title=f'文章 {i}', url=f'https://example.com/{i}', pub_date=pub_date,
+            )
+        self.paginator = KeysetPaginator(Article.objects.all(), 2)
+        dated = Article.objects.filter(pub_date__isnull=False).order_by('-pub_date', '-id')
+        undated = Article.objects.filter(pub_date__isnull=True).order_by('-id')
+        self.expected = [a.pk for a in dated] + [a.pk for a in undated]
+
+    def test_pages_across_undated_rows(self):
+        """测试有发布时间和没有发布时间的文章连续翻页，前后翻页结果一致"""
+        pages = [self.paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(self.paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual([a.pk for page in pages for a in page], self.expected)
+
+        for i in range(len(pages) - 1, 0, -1):
+            previous = self.paginator.get_page(pages[i].previous_cursor, 'prev')
+            self.assertEqual([a.pk for a in previous], [a.pk for a in pages[i - 1]])
+            self.assertEqual(previous.has_previous(), i > 1)
+
+    def test_pages_follow_index_order(self):
+        """测试翻页查询沿索引顺序读取，不需要临时排序"""
+        last = self.paginator.get_page().object_list[-1]
+        queries = [
+            self.paginator._dated().filter(pub_date__lte=last.pub_date).exclude(
+                pub_date=last.pub_date, id__gte=last.pk,
+            ),
+            self.paginator._dated(reverse=True).filter(pub_date__gte=last.pub_date),
+            self.paginator._undated().filter(id__lt=last.pk),
+        ]
+        for queryset in queries:
+            sql, params = queryset[:3].query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+            self.assertNotIn('TEMP B-TREE', plan)
+            self.assertIn('USING INDEX', plan)
+
+
+class ParsedEntryTest(TestCase):
+    """ParsedEntry 测试"""
+
+    def test_defaults_computed_once(self):
+        """测试 guid、标题和内容哈希在构造时规范化"""
+        entry = ParsedEntry(title='', link='https://example.com/a', summary='摘要')
+        self.assertEqual(entry.guid, 'https://example.com/a')
+        self.assertEqual(entry.title, '无标题')
+        self.assertEqual(entry.content_hash, generate_content_hash('无标题', '摘要', ''))
+        self.assertFalse(hasattr(entry, '__dict__'))
+        self.assertEqual(ParsedEntry(*entry.as_tuple()), entry)
+
+    def test_date_from_struct_is_utc(self):
+        """测试时间元组转换为带时区的 UTC 时间"""
+        value = date_from_struct(time.strptime('2025-01-06 08:00:00', '%Y-%m-%d %H:%M:%S'))
+        self.assertEqual(value.tzinfo, dt_timezone.utc)
+        self.assertEqual(value.hour, 8)
+        self.assertIsNone(date_from_struct(None))
+
+
+class CleanHtmlTest(TestCase):
+    """clean_html 测试"""
+
+    def test_remove_unsafe_content(self):
+        """测试移除脚本、样式、事件属性和危险链接，保留安全标记"""
+        safe, excerpt = clean_html(
+            '<p onclick="x()" style="color:red">正文</p><script>alert(1)</script>'
+            '<style>p {}</style><a href="javascript:alert(1)">链接</a><img src="a.png" alt="图">'
+        )
+        self.assertEqual(safe, '<p>正文</p><a>链接</a><img src="a.png" alt="图">')
+        self.assertEqual(excerpt, '正文 链接')
+
+    def test_normalize_whitespace_and_unclosed_tags(self):
+        """测试合并空白字符（pre 除外）并补全未闭合的标签"""
+        safe, excerpt = clean_html('  <div>\n a  &amp;\tb <pre>x\n  y</pre><b>未闭合 ')
+        self.assertEqual(safe, '<div> a &amp; b <pre>x\n  y</pre><b>未闭合 </b></div>')
+        self.assertEqual(excerpt, 'a & b x y 未闭合')
+
+    def test_excerpt_truncated(self):
+        """测试摘要预览按字符数截断"""
+        self.assertEqual(clean_html('<p>' + '文' * 20 + '</p>', 10)[1], '文' * 10 + '...')
+
+
+class GenerateExcerptTest(TestCase):
+    """generate_excerpt 测试"""
+
+    def test_strip_html_and_whitespace(self):
+        """测试去除 HTML 标签、实体和多余空白"""
+        self.assertEqual(generate_excerpt('<p>Hello&nbsp;\n  <b>世界</b></p>'), 'Hello 世界')
+
+    def test_truncate(self):
+        """测试按字符数截断"""
+        self.assertEqual(generate_excerpt('文' * 20, length=10), '文' * 10 + '...')
+
+
+class EstimateFetchIntervalTest(TestCase):
+    """estimate_fetch_interval 测试"""
+
+    def setUp(self):
+        self.feed = Feed.objects.create(
+            title='测试订阅源', url='https://example.com/rss.xml',
+            fetch_interval=60, adaptive_interval=True,
+        )
+        self.now = timezone.now()
+
+    def create_articles(self, count, gap, offset=timedelta(0)):
+        for i in range(count):
+            Article.objects.create(
+                feed=self.feed,
+                title=f'文章 {i}',
+                url=f'https://example.com/article/{i}',
+                pub_date=self.now - offset - gap * i,
+            )
+
+    def test_fallback_without_history(self):
+        """测试历史文章不足时使用配置的抓取间隔"""
+        self.assertEqual(estimate_fetch_interval(self.feed, now=self.now), 60)
+
+    def test_busy_feed(self):
+        """测试高频订阅源缩短抓取间隔"""
+        self.create_articles(10, timedelta(hours=1))
+        self.assertEqual(estimate_fetch_interval(self.feed, now=self.now), 30)
+
+    def test_undated_articles_not_sampled(self):
+        """测试缺失发布时间的文章不挤占发布时间样本，只在没有发布时间时使用入库时间"""
+        for i in range(25):
+            Article.objects.create(
+                feed=self.feed, title=f'无日期 {i}', url=f'https://example.com/undated/{i}',
+            )
+        now = self.now + timedelta(minutes=1)
+        self.assertEqual(estimate_fetch_interval(self.feed, now=now), 15)
+
+        self.create_articles(10, timedelta(hours=1))
+        self.assertEqual(estimate_fetch_interval(self.feed, now=self.now), 30)
+
+    @override_settings(FETCH_ADAPTIVE_MAX_INTERVAL=720)
+    def test_quiet_feed_clamped_to_max(self):
+        """测试沉寂的订阅源不超过最大间隔"""
+        self.create_articles(5, timedelta(days=30), offset=timedelta(days=60))
+        self.assertEqual(estimate_fetch_interval(self.feed, now=self.now), 720)
+
+    def test_schedule_next_fetch_uses_estimate(self):
+        """测试启用自适应时按估算间隔安排下次抓取"""
+        self.create_articles(10, timedelta(hours=1))
+        self.feed.schedule_next_fetch(now=self.now)
+        self.assertEqual(self.feed.next_fetch_at, self.now + timedelta(minutes=30))
+
+
+class DetectEncodingTest(TestCase):
+    """订阅源编码检测测试"""
+
+    def test_bom_and_declaration(self):
+        """测试 BOM 和 XML 声明优先于 HTTP 编码"""
+        self.assertEqual(detect_encoding(b'\xef\xbb\xbf<rss/>', 'gbk'), ('utf-8', True))
+        self.assertEqual(
+            detect_encoding(b'<?xml version="1.0" encoding="GB2312"?><rss/>', 'utf-8'),
+            ('gb18030', True),
+        )
+
+    def test_http_charset(self):
+        """测试文档未声明时使用 HTTP 编码"""
+        self.assertEqual(detect_encoding(b'<rss/>', 'GBK'), ('gb18030', False))
+        self.assertEqual(detect_encoding(b'<rss/>', 'unknown-charset'), ('utf-8', True))
+        self.assertEqual(charset_from_content_type('text/xml; charset="gbk"'), 'gbk')
+        self.assertIsNone(charset_from_content_type('text/xml'))
+
+    def test_undeclared_non_utf8(self):
+        """测试没有任何声明且不是 UTF-8 时按 GB18030 处理"""
+        self.assertEqual(detect_encoding('<rss>中文</rss>'.encode('gbk')), ('gb18030', False))
+        self.assertEqual(detect_encoding('<rss>中文</rss>'.encode('utf-8')), ('utf-8', True))
+
+
+class DetectFeedTypeTest(TestCase):
+    """detect_feed_type 测试"""
+
+    def test_sniff_root_element(self):
+        """测试根据根元素判断格式，忽略 XML 声明、注释和 DOCTYPE"""
+        cases = {
+            b'<?xml version="1.0"?><!-- <feed> --><!DOCTYPE rss><rss version="2.0">': 'rss',
+            b'\xef\xbb\xbf<feed xmlns="http://www.w3.org/2005/Atom">': 'atom',
+            b'<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">': 'rdf',
+            b' {"version": "https://jsonfeed.org/version/1.1"}': 'json',
+            '<?xml version="1.0" encoding="utf-16"?><rss>'.encode('utf-16'): 'rss',
+            b'<html><body><rss></rss></body></html>': 'unknown',
+        }
+        for content, expected in cases.items():
+            self.assertEqual(detect_feed_type(content), expected)
+
+
+class ProxyPoolTest(TestCase):
+    """ProxyPool 测试"""
+
+    def test_from_config(self):
+        """测试从域名字符串或字典创建代理池"""
+        pool = ProxyPool.from_config([
+            'https://a.workers.dev/', {'domain': 'https://b.workers.dev', 'weight': 3},
+        ])
+        self.assertEqual([e.domain for e in pool.endpoints], ['https://a.workers.dev', 'https://b.workers.dev'])
+        self.assertEqual(pool.endpoints[1].weight, 3.0)
+        self.assertEqual(pool.endpoints[0].get_url('https://example.com/rss'), 'https://a.workers.dev/https://example.com/rss')
+        self.assertIsNone(ProxyPool.from_config([]))
+
+    def test_weighted_selection(self):
+        """测试按权重随机选择"""
+        pool = ProxyPool.from_config([{'domain': 'a', 'weight': 1}, {'domain': 'b', 'weight': 0}])
+        self.assertEqual({pool.select().domain for _ in range(20)}, {'a'})
+
+    def test_least_latency_selection(self):
+        """测试优先选择延迟低且空闲的代理"""
+        pool = ProxyPool.from_config(['a', 'b'], strategy=STRATEGY_LEAST_LATENCY)
+        a, b = pool.endpoints
+        pool.record_success(pool.select(), 0.5)
+        pool.record_success(pool.select(), 0.1)
+        self.assertEqual((a.latency, b.latency), (0.5, 0.1))
+        self.assertIs(pool.select(), b)
+        # b 有 4 个进行中的请求后预计耗时与 a 相同，选择空闲的 a
+        for _ in range(3):
+            self.assertIs(pool.select(), b)
+        self.assertIs(pool.select(), a)
+
+    def test_failing_endpoint_is_paused(self):
+        """测试连续失败的代理暂停使用，全部暂停时按需返回最早恢复的代理"""
+        pool = ProxyPool.from_config(['a', 'b'], failure_threshold=2, cooldown=60)
+        a, b = pool.endpoints
+        pool.record_failure(a)
+        pool.record_failure(a)
+        self.assertEqual({pool.select().domain for _ in range(10)}, {'b'})
+
+        pool.record_failure(b)
+        pool.record_failure(b)
+        self.assertIsNone(pool.select())
+        self.assertIs(pool.select(required=True), a)
+        self.assertEqual([item['healthy'] for item in pool.stats()], [False, False])
+
+        with mock.patch('utils.cloudflare_proxy.time.time', return_value=time.time() + 61):
+            self.assertIsNotNone(pool.select())
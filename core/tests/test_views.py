@@ -1,8 +1,15 @@
 """
 Core 应用视图测试
 """
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from core.models import Category, Feed, Article
 
 
@@ -58,6 +65,55 @@ class FeedCreateViewTest(TestCase):
         self.assertEqual(Feed.objects.count(), feed_count + 1)
         self.assertTrue(Feed.objects.filter(title='新订阅源').exists())
 
+    @mock.patch('core.views.fetch_feed.delay')
+    def test_feed_create_dispatches_background_fetch(self, mock_delay):
+        """测试创建订阅源后在事务提交时分发后台抓取，不同步抓取"""
+        with mock.patch('core.services.fetcher.RSSFetcher.fetch') as mock_fetch:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('core:feed_create'), {
+                    'title': '新订阅源',
+                    'url': 'https://example.com/new-rss.xml',
+                    'category': self.category.pk,
+                    'is_active': True,
+                    'fetch_interval': 60,
+                })
+
+        feed = Feed.objects.get(title='新订阅源')
+        self.assertRedirects(response, reverse('core:feed_detail', args=[feed.pk]))
+        self.assertEqual(feed.last_fetch_status, '等待抓取')
+        mock_delay.assert_called_once_with(feed.pk)
+        mock_fetch.assert_not_called()
+        # 首次抓取期间不会被定时调度重复分发
+        self.assertGreater(feed.next_fetch_at, timezone.now() + timedelta(minutes=55))
+
+    @mock.patch('core.views.fetch_feed.delay', side_effect=ConnectionError('broker down'))
+    def test_feed_create_dispatch_failure(self, mock_delay):
+        """测试任务分发失败时订阅源仍然创建成功"""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('core:feed_create'), {
+                'title': '新订阅源',
+                'url': 'https://example.com/new-rss.xml',
+                'is_active': True,
+                'fetch_interval': 60,
+            })
+
+        self.assertEqual(response.status_code, 302)
+        feed = Feed.objects.get(title='新订阅源')
+        self.assertLessEqual(feed.next_fetch_at, timezone.now())
+
+    def test_feed_status(self):
+        """测试查询订阅源抓取状态"""
+        feed = Feed.objects.create(
+            title='测试订阅源', url='https://example.com/rss.xml', last_fetch_status='抓取中',
+        )
+        Article.objects.create(feed=feed, title='测试文章', url='https://example.com/article/1')
+
+        data = self.client.get(reverse('core:feed_status', args=[feed.pk])).json()
+
+        self.assertTrue(data['in_progress'])
+        self.assertEqual(data['article_count'], 1)
+        self.assertIsNone(data['last_fetch_at'])
+
     def test_feed_create_post_invalid(self):
         """测试创建订阅源 POST 请求（无效数据）"""
         feed_count = Feed.objects.count()
@@ -91,6 +147,66 @@ class ArticleListViewTest(TestCase):
         response = self.client.get(reverse('core:article_list'))
         self.assertEqual(response.status_code, 200)
 
+    def test_cursor_pagination(self):
+        """测试游标分页前后翻页覆盖所有文章且顺序一致"""
+        now = timezone.now()
+        for i in range(44):
+            Article.objects.create(
+                feed=self.feed,
+                title=f'文章 {i}',
+                url=f'https://example.com/article/page-{i}',
+                # 部分文章发布时间相同，用于验证 id 作为第二排序键
+                pub_date=now - timedelta(hours=i // 2),
+            )
+
+        pages = []
+        url = reverse('core:article_list')
+        response = self.client.get(url)
+        while True:
+            page = response.context['page_obj']
+            pages.append([article.pk for article in page])
+            if not page.has_next():
+                break
+            response = self.client.get(url, {'cursor': page.next_cursor})
+
+        seen = [pk for page in pages for pk in page]
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(len(seen), 45)
+        self.assertEqual(len(set(seen)), 45)
+        # 没有发布时间的文章排在最后
+        self.assertEqual(seen[-1], self.article.pk)
+
+        # 从最后一页向前翻回第二页
+        last_page = response.context['page_obj']
+        response = self.client.get(url, {'cursor': last_page.previous_cursor, 'direction': 'prev'})
+        self.assertEqual([article.pk for article in response.context['page_obj']], pages[1])
+
+    def test_cursor_pagination_without_count(self):
+        """测试翻页不执行 COUNT 查询"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('core:article_list'))
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+
+    def test_article_list_defers_body(self):
+        """测试文章列表不加载正文和原始摘要，只展示摘要预览"""
+        self.article.summary = '<p>这是<b>摘要</b></p>'
+        self.article.content = '<p>很长的正文</p>'
+        self.article.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('core:article_list'))
+
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertNotIn('"core_article"."content"', sql)
+        self.assertNotIn('"core_article"."summary"', sql)
+        self.assertContains(response, '这是摘要')
+
+    def test_invalid_cursor_returns_first_page(self):
+        """测试无效游标返回第一页"""
+        response = self.client.get(reverse('core:article_list'), {'cursor': '!!invalid'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), 1)
+
 
 class IndexViewTest(TestCase):
     """首页视图测试"""
@@ -99,3 +215,221 @@ class IndexViewTest(TestCase):
         """测试首页状态码"""
         response = self.client.get(reverse('core:index'))
         self.assertEqual(response.status_code, 200)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class RefreshFeedsViewTest(TestCase):
+    """手动刷新视图测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        cache.clear()
+        self.feed = Feed.objects.create(title='测试订阅源', url='https://example.com/rss.xml')
+
+    def test_refresh_starts_job_and_joins_running_job(self):
+        """测试刷新立即返回任务 ID，并发请求加入同一任务"""
+        with mock.patch('core.views.refresh_feeds_job.delay') as delay:
+            first = self.client.post(reverse('core:refresh_feeds')).json()
+            second = self.client.post(reverse('core:refresh_feeds')).json()
+
+        delay.assert_called_once_with(first['job_id'])
+        self.assertFalse(first['joined'])
+        self.assertTrue(second['joined'])
+        self.assertEqual(first['job_id'], second['job_id'])
+
+    def test_interleaved_requests_share_one_job(self):
+        """测试两个请求交错执行时只创建一个任务，当前任务记录过期时也不会重复创建"""
+        from core.services import refresh_jobs
+
+        add = cache.add
+        for current in (None, 'expired'):
+            with self.subTest(current=current):
+                cache.clear()
+                if current:
+                    cache.set(refresh_jobs.CURRENT_JOB_KEY, current)
+                second = []
+
+                def interleaved_add(*args, **kwargs):
+                    # 第一个请求尝试占用当前任务后，第二个请求紧接着完整执行
+                    added = add(*args, **kwargs)
+                    if not second:
+                        second.append(None)
+                        second.append(refresh_jobs.create_or_join_job())
+                    return added
+
+                with mock.patch.object(cache, 'add', side_effect=interleaved_add):
+                    first = refresh_jobs.create_or_join_job()
+
+                job_ids = {first[0], second[1][0]}
+                self.assertEqual(len(job_ids), 1)
+                self.assertEqual(sorted([first[1], second[1][1]]), [False, True])
+                self.assertEqual(cache.get(refresh_jobs.CURRENT_JOB_KEY), first[0])
+                self.assertEqual(refresh_jobs.get_job(first[0])['status'], 'pending')
+
+    def test_refresh_status_streams_results(self):
+        """测试任务执行过程中逐条返回结果"""
+        from celery_tasks.tasks import refresh_feeds_job
+
+        with mock.patch('core.views.refresh_feeds_job.delay'):
+            data = self.client.post(reverse('core:refresh_feeds')).json()
+
+        with mock.patch('core.services.fetcher.RSSFetcher.fetch', return_value=None):
+            refresh_feeds_job(data['job_id'])
+
+        status = self.client.get(data['status_url']).json()
+        self.assertEqual(status['status'], 'done')
+        self.assertEqual(status['total'], 1)
+        self.assertEqual(status['results'][0]['feed_id'], self.feed.pk)
+        self.assertEqual(status['results'][0]['status'], 'error')
+
+        # since 之后没有新结果
+        status = self.client.get(data['status_url'], {'since': 1}).json()
+        self.assertEqual(status['results'], [])
+
+        # 任务结束后再次刷新会启动新任务
+        with mock.patch('core.views.refresh_feeds_job.delay'):
+            again = self.client.post(reverse('core:refresh_feeds')).json()
+        self.assertNotEqual(again['job_id'], data['job_id'])
+
+    def test_refresh_job_is_manual(self):
+        """测试手动刷新不计入自动抓取统计，也不改变下次抓取时间"""
+        from celery_tasks.tasks import refresh_feeds_job
+
+        next_fetch_at = self.feed.next_fetch_at
+        response = {
+            'content': b'<rss version="2.0"><channel><title>t</title><item><guid>1</guid>'
+                       b'<link>https://example.com/1</link></item></channel></rss>',
+            'encoding': 'utf-8', 'url': self.feed.url, 'status_code': 200, 'headers': {},
+            'not_modified': False, 'etag': '', 'last_modified': '',
+        }
+        with mock.patch('core.views.refresh_feeds_job.delay'):
+            data = self.client.post(reverse('core:refresh_feeds')).json()
+        with mock.patch('core.services.fetcher.RSSFetcher.fetch', return_value=response):
+            refresh_feeds_job(data['job_id'])
+
+        self.feed.refresh_from_db()
+        self.assertEqual(self.feed.last_fetch_status, '成功')
+        self.assertEqual(self.feed.fetch_count, 0)
+        self.assertIsNone(self.feed.last_auto_fetch_at)
+        self.assertEqual(self.feed.next_fetch_at, next_fetch_at)
+
+    def test_refresh_status_unknown_job(self):
+        """测试查询不存在的任务"""
+        response = self.client.get(reverse('core:refresh_status', args=['missing']))
+        self.assertEqual(response.status_code, 404)
+
+
+class WebSubCallbackViewTest(TestCase):
+    """WebSub 回调视图测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        self.feed = Feed.objects.create(
+            title='推送订阅源', url='https://example.com/rss.xml',
+            hub_url='https://hub.example.com/', websub_topic='https://example.com/feed',
+            websub_secret='s3cret', websub_state='pending',
+        )
+        self.url = reverse('core:websub_callback', args=[self.feed.pk])
+
+    def test_verify_intent(self):
+        """测试返回 Hub 的 challenge，不认可的验证请求返回 404"""
+        params = {
+            'hub.mode': 'subscribe',
+            'hub.topic': 'https://example.com/feed',
+            'hub.challenge': 'abc',
+        }
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'abc')
+        self.feed.refresh_from_db()
+        self.assertEqual(self.feed.websub_state, 'subscribed')
+
+        params['hub.mode'] = 'unsubscribe'
+        self.assertEqual(self.client.get(self.url, params).status_code, 404)
+
+    def test_denied_intent(self):
+        """测试只认可针对当前主题的拒绝通知，被拒绝的订阅稍后重试"""
+        from core.services import websub
+
+        params = {'hub.mode': 'denied', 'hub.topic': 'https://evil.example.com/', 'hub.reason': 'x'}
+        self.assertEqual(self.client.get(self.url, params).status_code, 404)
+        self.feed.refresh_from_db()
+        self.assertEqual(self.feed.websub_state, 'pending')
+
+        params['hub.topic'] = 'https://example.com/feed'
+        self.assertEqual(self.client.get(self.url, params).status_code, 200)
+        self.feed.refresh_from_db()
+        self.assertEqual(self.feed.websub_state, 'denied')
+        self.assertNotIn(self.feed, websub.due_subscriptions())
+        later = timezone.now() + timedelta(seconds=settings.WEBSUB_RETRY_DELAY + 1)
+        self.assertIn(self.feed, websub.due_subscriptions(now=later))
+
+        # 已被拒绝的订阅不再接受重复的拒绝通知
+        self.assertEqual(self.client.get(self.url, params).status_code, 404)
+
+    def test_signed_push_ingests_articles(self):
+        """测试签名正确的推送交给后台任务保存文章，签名错误的推送被忽略"""
+        import hashlib
+        import hmac
+        from celery_tasks.tasks import ingest_websub_push
+
+        body = (
+            '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+            '<title>推送订阅源</title><item><title>推送文章</title><link>https://example.com/pushed</link></item></channel></rss>'
+        ).encode('utf-8')
+        signature = 'sha256=' + hmac.new(b's3cret', body, hashlib.sha256).hexdigest()
+        Feed.objects.filter(pk=self.feed.pk).update(websub_state='subscribed')
+
+        with mock.patch('core.views.ingest_websub_push.delay') as delay:
+            response = self.client.post(
+                self.url, body, content_type='application/rss+xml', HTTP_X_HUB_SIGNATURE='sha1=bad',
+            )
+            self.assertEqual(response.status_code, 202)
+            delay.assert_not_called()
+
+            response = self.client.post(
+                self.url, body, content_type='application/rss+xml', HTTP_X_HUB_SIGNATURE=signature,
+            )
+            self.assertEqual(response.status_code, 202)
+            delay.assert_called_once()
+
+        ingest_websub_push(*delay.call_args.args)
+        self.assertTrue(Article.objects.filter(feed=self.feed, title='推送文章').exists())
+        self.feed.refresh_from_db()
+        self.assertEqual(self.feed.hub_url, 'https://hub.example.com/')
+
+    def test_push_after_unsubscribe_ignored(self):
+        """测试退订验证后或订阅源停用后，签名正确的推送也被忽略"""
+        import hashlib
+        import hmac
+
+        body = b'<rss version="2.0"><channel><title>t</title></channel></rss>'
+        signature = 'sha256=' + hmac.new(b's3cret', body, hashlib.sha256).hexdigest()
+        params = {
+            'hub.mode': 'unsubscribe',
+            'hub.topic': 'https://example.com/feed',
+            'hub.challenge': 'abc',
+        }
+        Feed.objects.filter(pk=self.feed.pk).update(websub_state='unsubscribing')
+
+        with mock.patch('core.views.ingest_websub_push.delay') as delay:
+            # 退订验证完成前仍接收推送
+            response = self.client.post(
+                self.url, body, content_type='application/rss+xml', HTTP_X_HUB_SIGNATURE=signature,
+            )
+            self.assertEqual(response.status_code, 202)
+            delay.assert_called_once()
+
+            self.assertEqual(self.client.get(self.url, params).status_code, 200)
+            response = self.client.post(
+                self.url, body, content_type='application/rss+xml', HTTP_X_HUB_SIGNATURE=signature,
+            )
+            self.assertEqual(response.status_code, 202)
+            delay.assert_called_once()
+
+            Feed.objects.filter(pk=self.feed.pk).update(websub_state='subscribed', is_active=False)
+            response = self.client.post(
+                self.url, body, content_type='application/rss+xml', HTTP_X_HUB_SIGNATURE=signature,
+            )
+            self.assertEqual(response.status_code, 202)
+            delay.assert_called_once()
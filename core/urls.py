@@ -12,8 +12,11 @@ urlpatterns = [
     path('feeds/', views.FeedListView.as_view(), name='feed_list'),
     path('feeds/create/', views.FeedCreateView.as_view(), name='feed_create'),
     path('feeds/<int:pk>/', views.FeedDetailView.as_view(), name='feed_detail'),
+    path('feeds/<int:pk>/status/', views.feed_status, name='feed_status'),
     path('feeds/refresh/', views.refresh_all_feeds, name='refresh_feeds'),
+    path('feeds/refresh/<str:job_id>/', views.refresh_status, name='refresh_status'),
     path('articles/', views.ArticleListView.as_view(), name='article_list'),
     path('articles/<int:feed_id>/', views.ArticleListView.as_view(), name='feed_articles'),
     path('article/<int:pk>/', views.ArticleDetailView.as_view(), name='article_detail'),
+    path('websub/<int:pk>/', views.websub_callback, name='websub_callback'),
 ]
@@ -2,73 +2,136 @@
 文章处理工具函数
 """
 import logging
-import hashlib
-from core.models import Article
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from core.models import Article, Feed
+# 内容哈希和摘要预览与解析器共用同一实现（解析进程中不能导入 Django 模型）
+from utils.entries import generate_content_hash  # noqa: F401
+from utils.html_cleaner import html_to_excerpt
 
 logger = logging.getLogger(__name__)
 
 
-def generate_content_hash(title, summary, content):
-    """生成文章内容的哈希值，用于检测内容变化"""
-    content_str = f"{title}|{summary}|{content}"
-    return hashlib.md5(content_str.encode('utf-8')).hexdigest()
+def generate_excerpt(text, length=None):
+    """
+    生成列表页使用的纯文本摘要预览
+    去除 HTML 标签和脚本样式、合并空白字符，并按字符数截断
+
+    Args:
+        text: 摘要或正文 HTML
+        length: 最大字符数，默认使用 ARTICLE_EXCERPT_LENGTH
+
+    Returns:
+        纯文本摘要预览
+    """
+    if not text:
+        return ''
+    return html_to_excerpt(text, length or getattr(settings, 'ARTICLE_EXCERPT_LENGTH', 200))
 
 
-def save_or_update_article(feed, entry):
+def save_articles_bulk(feed, entries, batch_size=500):
     """
-    保存或更新文章
-    如果文章不存在则创建，如果存在但内容不同则更新
+    批量保存或更新一个订阅源的文章
+    在一个事务中用一次查询取出已存在文章的 guid 和内容哈希，
+    然后批量创建新文章、批量更新内容哈希有变化的文章
 
     Args:
         feed: Feed 订阅源对象
-        entry: 解析后的文章条目字典
+        entries: 解析后的文章条目（ParsedEntry）列表
+        batch_size: 每批写入的数量
 
     Returns:
-        tuple: (is_new, article) - is_new表示是否是新文章或更新的文章
+        tuple: (created_count, updated_count) - 实际插入的文章数和更新文章数
     """
-    # 获取唯一标识符和实际链接
-    guid = entry.get('guid', entry['link'])
-    link = entry['link']
-
-    title = entry['title'] or '无标题'
-    summary = entry.get('summary', '')
-    content = entry.get('content', '')
-
-    # 使用 filter().first() 查询文章
-    # 优先使用 guid 查询，如果 guid 和 link 不同且未找到，再尝试用 link 查询
-    article = Article.objects.filter(feed=feed, url=guid).first()
-    if not article and guid != link:
-        article = Article.objects.filter(feed=feed, url=link).first()
-
-    if article:
-        # 检查内容是否有变化
-        if (article.title != title or
-            article.summary != summary or
-            article.content != content):
-
-            # 内容有变化，更新文章
-            article.title = title
-            article.author = entry.get('author', '')
-            article.summary = summary
-            article.content = content
-            article.pub_date = entry.get('pub_date')
-            article.save()
-            logger.info(f"更新文章: {title}")
-            return (True, article)
-
-        # 内容没有变化
-        return (False, article)
-    else:
-        # 文章不存在，创建新文章
-        # 使用实际的链接作为 url，确保用户可以点击访问
-        article = Article.objects.create(
-            feed=feed,
-            title=title,
-            url=link,
-            author=entry.get('author', ''),
-            summary=summary,
-            content=content,
-            pub_date=entry.get('pub_date'),
-        )
-        logger.info(f"创建新文章: {title}")
-        return (True, article)
+    if not entries:
+        return (0, 0)
+
+    # 同一批次中 guid 重复的条目只保留第一条
+    unique_entries = {}
+    for entry in entries:
+        unique_entries.setdefault(entry.guid, entry)
+
+    lookup_keys = set()
+    for guid, entry in unique_entries.items():
+        lookup_keys.add(guid)
+        lookup_keys.add(entry.link)
+    lookup_keys = list(lookup_keys)
+
+    to_create = []
+    to_update = []
+    now = timezone.now()
+
+    with transaction.atomic():
+        # 锁定订阅源，同一订阅源的并发抓取（如首次抓取与定时调度）依次比对已有文章
+        list(Feed.objects.select_for_update().filter(pk=feed.pk).values_list('pk', flat=True))
+        existing = {}
+        # 分批查询，避免超过数据库的参数数量限制；不加载标题和正文等大字段
+        for i in range(0, len(lookup_keys), batch_size):
+            chunk = lookup_keys[i:i + batch_size]
+            articles = Article.objects.filter(feed=feed, guid__in=chunk).only(
+                'id', 'guid', 'url', 'content_hash'
+            )
+            for article in articles:
+                existing[article.guid] = article
+
+        for guid, entry in unique_entries.items():
+            link = entry.link
+            summary = entry.summary
+            content = entry.content
+            content_hash = entry.content_hash
+
+            # 优先使用 guid 匹配，再尝试使用 link 匹配（以链接作为 guid 的历史文章）
+            article = existing.get(guid) or existing.get(link)
+
+            if article and article.pk is None:
+                # 与本批次中待创建的文章重复
+                continue
+
+            if article:
+                if article.content_hash != content_hash or article.guid != guid:
+                    article.guid = guid
+                    article.title = entry.title
+                    article.author = entry.author
+                    article.summary = summary
+                    article.content = content
+                    article.pub_date = entry.pub_date
+                    article.content_hash = content_hash
+                    article.excerpt = entry.excerpt
+                    article.updated_at = now
+                    to_update.append(article)
+            else:
+                # 使用实际的链接作为 url，确保用户可以点击访问
+                article = Article(
+                    feed=feed,
+                    title=entry.title,
+                    url=link,
+                    guid=guid,
+                    author=entry.author,
+                    summary=summary,
+                    content=content,
+                    pub_date=entry.pub_date,
+                    content_hash=content_hash,
+                    excerpt=entry.excerpt,
+                )
+                to_create.append(article)
+                # 防止同一批次中 link 相同的条目重复创建
+                existing[link] = article
+
+        created = 0
+        if to_create:
+            # 不支持行锁的数据库（SQLite）上仍可能与并发写入冲突，已存在的文章直接跳过，
+            # 跳过的文章不计入新建数量
+            count_before = Article.objects.filter(feed=feed).count()
+            Article.objects.bulk_create(to_create, batch_size=batch_size, ignore_conflicts=True)
+            created = Article.objects.filter(feed=feed).count() - count_before
+        if to_update:
+            Article.objects.bulk_update(
+                to_update,
+                ['guid', 'title', 'author', 'summary', 'content', 'pub_date',
+                 'content_hash', 'excerpt', 'updated_at'],
+                batch_size=batch_size,
+            )
+
+    logger.info(f"订阅源 {feed.title}: 创建 {created} 篇文章，更新 {len(to_update)} 篇文章")
+    return (created, len(to_update))
@@ -0,0 +1,150 @@
+"""
+游标（keyset）分页工具
+按 (pub_date, id) 定位翻页位置，不使用 OFFSET，也不统计总数
+"""
+import base64
+import binascii
+from datetime import datetime
+
+
+def encode_cursor(pub_date, pk):
+    """将 (pub_date, id) 编码为 URL 安全的游标字符串"""
+    raw = f"{pub_date.isoformat() if pub_date else ''}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    解码游标字符串
+
+    Returns:
+        tuple: (pub_date, pk)，游标无效时返回 None
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        date_str, pk_str = raw.split('|', 1)
+        pub_date = datetime.fromisoformat(date_str) if date_str else None
+        return (pub_date, int(pk_str))
+    except (ValueError, UnicodeError, binascii.Error):
+        return None
+
+
+class KeysetPage:
+    """游标分页的一页数据，属性命名与 Django Page 保持一致"""
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        """下一页（更早的文章）游标"""
+        if not self._has_next or not self.object_list:
+            return None
+        last = self.object_list[-1]
+        return encode_cursor(last.pub_date, last.pk)
+
+    @property
+    def previous_cursor(self):
+        """上一页（更新的文章）游标"""
+        if not self._has_previous or not self.object_list:
+            return None
+        first = self.object_list[0]
+        return encode_cursor(first.pub_date, first.pk)
+
+
+class KeysetPaginator:
+    """
+    按 pub_date 倒序（空值在后）、id 倒序的游标分页器
+
+    有发布时间的文章和没有发布时间的文章分两段查询：前一段沿 (pub_date, id) 索引顺序扫描，
+    后一段按 id 倒序，两段都不需要额外排序。每一页只查询 per_page + 1 行来判断是否还有更多数据，
+    第 N 页与第 1 页的查询代价相同。
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def get_page(self, cursor=None, direction='next'):
+        """
+        获取一页数据
+
+        Args:
+            cursor: 游标字符串，为空时返回第一页
+            direction: next 表示向后翻（更早的文章），prev 表示向前翻（更新的文章）
+
+        Returns:
+            KeysetPage
+        """
+        position = decode_cursor(cursor) if cursor else None
+        limit = self.per_page + 1
+
+        if position is not None and direction == 'prev':
+            rows = self._before(position, limit)
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            rows.reverse()
+            return KeysetPage(rows, True, has_previous)
+
+        rows = self._after(position, limit)
+        return KeysetPage(rows[:self.per_page], len(rows) > self.per_page, position is not None)
+
+    def _dated(self, reverse=False):
+        queryset = self.queryset.filter(pub_date__isnull=False)
+        if reverse:
+            return queryset.order_by('pub_date', 'id')
+        return queryset.order_by('-pub_date', '-id')
+
+    def _undated(self, reverse=False):
+        queryset = self.queryset.filter(pub_date__isnull=True)
+        return queryset.order_by('id' if reverse else '-id')
+
+    def _after(self, position, limit):
+        """排序在游标之后的行（游标为空时从头开始），按显示顺序返回"""
+        rows = []
+        if position is None or position[0] is not None:
+            dated = self._dated()
+            if position is not None:
+                pub_date, pk = position
+                # (pub_date, id) < 游标：pub_date 上的范围条件沿索引扫描，同一时间的行再按 id 排除
+                dated = dated.filter(pub_date__lte=pub_date).exclude(pub_date=pub_date, id__gte=pk)
+            rows = list(dated[:limit])
+            if len(rows) >= limit:
+                return rows
+            undated = self._undated()
+        else:
+            undated = self._undated().filter(id__lt=position[1])
+        return rows + list(undated[:limit - len(rows)])
+
+    def _before(self, position, limit):
+        """排序在游标之前的行，离游标最近的在前"""
+        pub_date, pk = position
+        rows = []
+        if pub_date is None:
+            rows = list(self._undated(reverse=True).filter(id__gt=pk)[:limit])
+            if len(rows) >= limit:
+                return rows
+            dated = self._dated(reverse=True)
+        else:
+            dated = self._dated(reverse=True).filter(pub_date__gte=pub_date).exclude(
+                pub_date=pub_date, id__lte=pk,
+            )
+        return rows + list(dated[:limit - len(rows)])
@@ -1,20 +1,23 @@
 """
 核心视图
 """
-from django.shortcuts import render
+from django.shortcuts import render, get_object_or_404
 from django.views.generic import ListView, DetailView, CreateView
-from django.urls import reverse_lazy
+from django.urls import reverse
 from django.contrib import messages
+from django.db import transaction
 from django.utils import timezone
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse, Http404
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
+import base64
 import logging
+from datetime import timedelta
+from celery_tasks.tasks import fetch_feed, refresh_feeds_job, ingest_websub_push
 from .models import Feed, Article, Category
 from .forms import FeedForm
-from .services.fetcher import RSSFetcher
-from .services.parser import RSSParser
-from .utils.article_utils import save_or_update_article
+from .services import refresh_jobs, websub
+from .utils.pagination import KeysetPaginator
 
 logger = logging.getLogger(__name__)
 
@@ -40,93 +43,40 @@ class FeedCreateView(CreateView):
     model = Feed
     form_class = FeedForm
     template_name = 'core/feed_form.html'
-    success_url = reverse_lazy('core:feed_list')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['action'] = '添加'
         return context
 
+    def get_success_url(self):
+        # 跳转到详情页查看首次抓取进度
+        return reverse('core:feed_detail', args=[self.object.pk])
+
     def form_valid(self, form):
-        """表单验证通过后自动抓取文章"""
+        """保存订阅源后立即返回，首次抓取交给后台 fetch_feed 任务"""
+        form.instance.last_fetch_status = '等待抓取'
         response = super().form_valid(form)
         feed = self.object
 
-        # 自动抓取文章（同步方式）
-        try:
-            from .services.fetcher import RSSFetcher
-            from .services.parser import RSSParser
-            import logging
-
-            logger = logging.getLogger(__name__)
-
-            # 抓取 RSS 内容（使用较短的超时时间）
-            logger.info(f"开始抓取订阅源: {feed.url}")
-            fetcher = RSSFetcher()
-            fetch_response = fetcher.fetch(feed.url, timeout=10)  # 10 秒超时
-
-            if fetch_response:
-                logger.info(f"抓取成功: {feed.url}")
-
-                # 解析 RSS 内容
-                parser = RSSParser()
-                feed_data = parser.parse(fetch_response['content'], fetch_response['encoding'])
-
-                if feed_data:
-                    logger.info(f"解析成功，找到 {len(feed_data['entries'])} 篇文章")
-
-                    # 更新订阅源信息
-                    if feed_data['title'] and not feed.title:
-                        feed.title = feed_data['title']
-                    if feed_data['description'] and not feed.description:
-                        feed.description = feed_data['description']
-                    feed.last_fetch_status = '成功'
-                    feed.last_fetch_at = timezone.now()
-                    feed.save()
-
-                    # 保存文章
-                    new_count = 0
-                    for entry in feed_data['entries']:
-                        is_new, _ = save_or_update_article(feed, entry)
-                        if is_new:
-                            new_count += 1
-
-                    messages.success(
-                        self.request,
-                        f'订阅源 "{feed.title}" 创建成功！已抓取 {new_count} 篇文章。'
-                    )
-                else:
-                    feed.last_fetch_status = '解析失败'
-                    feed.save()
-                    messages.warning(
-                        self.request,
-                        f'订阅源 "{feed.title}" 创建成功，但解析失败。请稍后手动抓取。'
-                    )
-            else:
-                feed.last_fetch_status = '抓取失败'
-                feed.last_fetch_at = timezone.now()
-                feed.save()
-                messages.warning(
-                    self.request,
-                    f'订阅源 "{feed.title}" 创建成功，但抓取失败。请检查 URL 是否正确。'
-                )
-
-        except Exception as e:
-            import traceback
-            logger.error(f"抓取订阅源失败: {feed.url}, 错误: {str(e)}")
-            logger.error(traceback.format_exc())
-
-            feed.last_fetch_status = f'错误: {str(e)[:50]}'
-            feed.last_fetch_at = timezone.now()
-            feed.save()
-
-            messages.error(
-                self.request,
-                f'订阅源 "{feed.title}" 创建成功，但自动抓取出错：{str(e)}'
-            )
+        # 事务提交后再分发任务，避免 worker 读不到新建的订阅源
+        transaction.on_commit(lambda: self._dispatch_initial_fetch(feed))
 
+        messages.success(self.request, f'订阅源 "{feed.title}" 创建成功，正在后台抓取文章。')
         return response
 
+    def _dispatch_initial_fetch(self, feed):
+        # 先推后下次抓取时间，避免首次抓取完成前被 schedule_due_feeds 重复分发
+        now = timezone.now()
+        next_fetch_at = now + timedelta(minutes=feed.fetch_interval)
+        Feed.objects.filter(pk=feed.pk).update(next_fetch_at=next_fetch_at)
+        try:
+            fetch_feed.delay(feed.pk)
+        except Exception as e:
+            # 分发失败时恢复到期状态，由 schedule_due_feeds 补抓
+            logger.error(f"分发首次抓取任务失败: {feed.url}, 错误: {e}")
+            Feed.objects.filter(pk=feed.pk).update(next_fetch_at=now)
+
 
 class FeedDetailView(DetailView):
     """订阅源详情"""
@@ -135,18 +85,43 @@ class FeedDetailView(DetailView):
     context_object_name = 'feed'
 
 
+@require_http_methods(["GET"])
+def feed_status(request, pk):
+    """查询订阅源抓取状态，供详情页轮询首次抓取进度"""
+    feed = get_object_or_404(Feed, pk=pk)
+    return JsonResponse({
+        'success': True,
+        'feed_id': feed.pk,
+        'title': feed.title,
+        'last_fetch_status': feed.last_fetch_status,
+        'last_fetch_at': feed.last_fetch_at.isoformat() if feed.last_fetch_at else None,
+        'in_progress': feed.last_fetch_status in ('等待抓取', '抓取中'),
+        'article_count': feed.articles.count(),
+    })
+
+
 class ArticleListView(ListView):
-    """文章列表"""
+    """文章列表（游标分页，不统计总数）"""
     model = Article
     template_name = 'core/article_list.html'
     context_object_name = 'articles'
     paginate_by = 20
 
     def get_queryset(self):
+        # 列表只展示标题、元信息和摘要预览，不加载正文和原始摘要
+        articles = Article.objects.select_related('feed').defer('summary', 'content')
         feed_id = self.kwargs.get('feed_id')
         if feed_id:
-            return Article.objects.filter(feed_id=feed_id).select_related('feed')
-        return Article.objects.all().select_related('feed')
+            return articles.filter(feed_id=feed_id)
+        return articles
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size)
+        page = paginator.get_page(
+            self.request.GET.get('cursor'),
+            self.request.GET.get('direction', 'next'),
+        )
+        return (paginator, page, page.object_list, page.has_other_pages())
 
 
 class ArticleDetailView(DetailView):
@@ -158,91 +133,73 @@ class ArticleDetailView(DetailView):
     def get_object(self):
         obj = super().get_object()
         # 标记为已读
-        obj.is_read = True
-        obj.save()
+        if not obj.is_read:
+            obj.is_read = True
+            obj.save(update_fields=['is_read'])
         return obj
 
 
 @require_http_methods(["POST"])
 @csrf_exempt
 def refresh_all_feeds(request):
-    """手动刷新所有订阅源"""
-    results = []
-    active_feeds = Feed.objects.filter(is_active=True)
-
-    for feed in active_feeds:
+    """手动刷新所有订阅源：启动后台任务（或加入正在运行的任务）并立即返回任务 ID"""
+    job_id, created = refresh_jobs.create_or_join_job()
+    if created:
         try:
-            # 抓取 RSS 内容
-            fetcher = RSSFetcher()
-            fetch_response = fetcher.fetch(feed.url, timeout=30)
-
-            if not fetch_response:
-                results.append({
-                    'feed_id': feed.pk,
-                    'feed_title': feed.title,
-                    'status': 'error',
-                    'message': '抓取失败'
-                })
-                feed.last_fetch_status = '抓取失败'
-                feed.last_fetch_at = timezone.now()
-                feed.save()
-                continue
-
-            # 解析 RSS 内容
-            parser = RSSParser()
-            feed_data = parser.parse(fetch_response['content'], fetch_response['encoding'])
-
-            if not feed_data:
-                results.append({
-                    'feed_id': feed.pk,
-                    'feed_title': feed.title,
-                    'status': 'error',
-                    'message': '解析失败'
-                })
-                feed.last_fetch_status = '解析失败'
-                feed.last_fetch_at = timezone.now()
-                feed.save()
-                continue
-
-            # 更新订阅源信息
-            if feed_data['title'] and not feed.title:
-                feed.title = feed_data['title']
-            if feed_data['description'] and not feed.description:
-                feed.description = feed_data['description']
-
-            feed.last_fetch_status = '成功'
-            feed.last_fetch_at = timezone.now()
-            feed.save()
-
-            # 保存文章
-            new_articles = 0
-            for entry in feed_data['entries']:
-                is_new, _ = save_or_update_article(feed, entry)
-                if is_new:
-                    new_articles += 1
-
-            results.append({
-                'feed_id': feed.pk,
-                'feed_title': feed.title,
-                'status': 'success',
-                'message': f'成功，新增 {new_articles} 篇文章'
-            })
-            logger.info(f"订阅源 {feed.title} 刷新完成，新增 {new_articles} 篇文章")
-
+            refresh_feeds_job.delay(job_id)
         except Exception as e:
-            logger.error(f"刷新订阅源失败 {feed.title}: {str(e)}")
-            results.append({
-                'feed_id': feed.pk,
-                'feed_title': feed.title,
-                'status': 'error',
-                'message': str(e)[:100]
-            })
-            feed.last_fetch_status = f'错误: {str(e)[:50]}'
-            feed.last_fetch_at = timezone.now()
-            feed.save()
+            logger.error(f"启动刷新任务失败: {e}")
+            refresh_jobs.finish_job(job_id, status='failed')
+            return JsonResponse({'success': False, 'message': '启动刷新任务失败'}, status=503)
 
     return JsonResponse({
         'success': True,
-        'total': len(active_feeds),
-        'results': results
+        'job_id': job_id,
+        'joined': not created,
+        'status_url': reverse('core:refresh_status', args=[job_id]),
     })
+
+
+@require_http_methods(["GET"])
+def refresh_status(request, job_id):
+    """查询刷新任务进度，since 参数用于只获取新增的结果"""
+    try:
+        since = int(request.GET.get('since', 0))
+    except ValueError:
+        since = 0
+
+    job = refresh_jobs.get_job(job_id, since=since)
+    if job is None:
+        return JsonResponse({'success': False, 'message': '刷新任务不存在或已过期'}, status=404)
+
+    return JsonResponse({'success': True, **job})
+
+
+@require_http_methods(["GET", "POST"])
+@csrf_exempt
+def websub_callback(request, pk):
+    """WebSub 回调：GET 为 Hub 的意图验证，POST 为 Hub 推送的订阅源内容"""
+    feed = get_object_or_404(Feed, pk=pk)
+    if request.method == 'GET':
+        challenge = websub.verify_intent(feed, request.GET)
+        if challenge is None:
+            raise Http404('没有对应的订阅请求')
+        return HttpResponse(challenge, content_type='text/plain')
+
+    body = request.body
+    # 签名不正确或订阅已结束时按协议仍返回 2xx，避免 Hub 重试，但忽略推送内容
+    if not websub.accepts_push(feed):
+        logger.warning(f"订阅源 {feed.title} 未处于 WebSub 订阅中，已忽略推送")
+        return HttpResponse(status=202)
+    if not websub.verify_signature(feed, body, request.headers.get('X-Hub-Signature')):
+        logger.warning(f"订阅源 {feed.title} 收到签名无效的 WebSub 推送，已忽略")
+        return HttpResponse(status=202)
+
+    content_type = request.headers.get('Content-Type')
+    try:
+        ingest_websub_push.delay(feed.pk, base64.b64encode(body).decode('ascii'), content_type)
+    except Exception as e:
+        # 任务分发失败时在当前请求中处理，避免丢失推送
+        logger.error(f"分发 WebSub 推送任务失败: {feed.url}, 错误: {e}")
+        websub.ingest(feed, body, content_type)
+    return HttpResponse(status=202)
@@ -1,7 +1,9 @@
 """
 Reader 应用视图测试
 """
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from django.urls import reverse
 from core.models import Category, Feed, Article
@@ -64,6 +66,21 @@ class ReadLaterViewTest(TestCase):
         response = self.client.get(reverse('reader:read_later'))
         self.assertEqual(response.status_code, 200)
 
+    def test_read_later_list_single_query_per_page(self):
+        """测试稍后阅读列表展示摘要预览，不逐条加载被延迟的摘要"""
+        for i in range(3):
+            article = Article.objects.create(
+                feed=self.feed, title=f'文章 {i}', url=f'https://example.com/later/{i}',
+                summary=f'<p>摘要 {i}</p>',
+            )
+            ReadLater.objects.create(user=self.user, article=article)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('reader:read_later'))
+        self.assertContains(response, '摘要 2')
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertNotIn('"core_article"."summary"', sql)
+
     def test_add_read_later(self):
         """测试添加稍后阅读"""
         response = self.client.post(
@@ -16,7 +16,9 @@ def favorites_list(request):
     """收藏列表"""
     favorites = Favorite.objects.filter(
         user=request.user
-    ).select_related('article__feed').order_by('-created_at')
+    ).select_related('article__feed').defer(
+        'article__summary', 'article__content'
+    ).order_by('-created_at')
     return render(request, 'reader/favorites.html', {'favorites': favorites})
 
 
@@ -25,7 +27,9 @@ def read_later_list(request):
     """稍后阅读列表"""
     read_laters = ReadLater.objects.filter(
         user=request.user
-    ).select_related('article__feed').order_by('-created_at')
+    ).select_related('article__feed').defer(
+        'article__summary', 'article__content'
+    ).order_by('-created_at')
     return render(request, 'reader/read_later.html', {'read_laters': read_laters})
 
 
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""
+并发抓取基准测试脚本
+启动本地模拟 RSS 服务器（带人为延迟），对比串行抓取与并发抓取的耗时
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import django
+
+# 设置 Django 环境
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.development')
+django.setup()
+
+from core.services.fetcher import RSSFetcher
+from core.services.async_fetcher import AsyncFetchEngine
+from core.services.circuit_breaker import HostCircuitBreaker
+from core.services.rate_limiter import HostRateLimiter
+
+
+RSS_BODY = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>bench</title>
+<item><title>entry</title><link>https://example.com/1</link></item>
+</channel></rss>
+"""
+
+
+class DelayedFeedHandler(BaseHTTPRequestHandler):
+    """按查询参数 delay（秒）延迟返回的 RSS 处理器"""
+    # 支持 keep-alive，才能体现连接复用
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        time.sleep(float(query.get('delay', ['0'])[0]))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/rss+xml; charset=utf-8')
+        self.send_header('Content-Length', str(len(RSS_BODY)))
+        self.end_headers()
+        self.wfile.write(RSS_BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(host: str) -> int:
+    """在后台线程启动模拟服务器，返回端口"""
+    server = ThreadingHTTPServer((host, 0), DelayedFeedHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1]
+
+
+def main():
+    """主函数"""
+    arg_parser = argparse.ArgumentParser(description='并发抓取基准测试')
+    arg_parser.add_argument('--feeds', type=int, default=40, help='模拟订阅源数量')
+    arg_parser.add_argument('--hosts', type=int, default=10, help='模拟主机数量（127.0.0.x）')
+    arg_parser.add_argument('--min-delay', type=float, default=0.1, help='最小延迟（秒）')
+    arg_parser.add_argument('--max-delay', type=float, default=0.5, help='最大延迟（秒）')
+    arg_parser.add_argument('--concurrency', type=int, default=20, help='全局并发数')
+    arg_parser.add_argument('--per-host', type=int, default=4, help='单主机并发数')
+    args = arg_parser.parse_args()
+
+    # 127.0.0.0/8 均指向本机，每个地址启动一个服务器模拟不同主机
+    hosts = [f'127.0.0.{i + 1}' for i in range(args.hosts)]
+    ports = [start_server(host) for host in hosts]
+    random.seed(42)
+    delays = [random.uniform(args.min_delay, args.max_delay) for _ in range(args.feeds)]
+    urls = [
+        f'http://{hosts[i % args.hosts]}:{ports[i % args.hosts]}/feed/{i}.xml?delay={delay:.3f}'
+        for i, delay in enumerate(delays)
+    ]
+
+    # 只比较抓取方式本身，关闭单主机限速和熔断
+    fetcher = RSSFetcher(
+        proxy_domain='',
+        rate_limiter=HostRateLimiter(rate=0),
+        circuit_breaker=HostCircuitBreaker(threshold=0),
+    )
+
+    print("=" * 80)
+    print(f"订阅源: {args.feeds} 个，主机: {args.hosts} 个，"
+          f"延迟: {args.min_delay}-{args.max_delay} 秒")
+    print(f"延迟总和: {sum(delays):.2f} 秒，最慢订阅源: {max(delays):.2f} 秒")
+    print("=" * 80)
+
+    start = time.perf_counter()
+    serial_results = {url: fetcher.fetch(url, timeout=10) for url in urls}
+    serial_elapsed = time.perf_counter() - start
+    serial_ok = sum(1 for r in serial_results.values() if r)
+    serial_stats = fetcher.connection_stats()
+    print(f"串行抓取: {serial_elapsed:.2f} 秒（成功 {serial_ok}/{len(urls)}，"
+          f"新建连接 {serial_stats['connections']} 个）")
+
+    engine = AsyncFetchEngine(
+        fetcher=fetcher,
+        max_concurrency=args.concurrency,
+        per_host_concurrency=args.per_host,
+    )
+    start = time.perf_counter()
+    concurrent_results = engine.fetch_all(urls, timeout=10)
+    concurrent_elapsed = time.perf_counter() - start
+    concurrent_ok = sum(1 for r in concurrent_results.values() if r)
+    concurrent_stats = fetcher.connection_stats(since=serial_stats)
+    print(f"并发抓取: {concurrent_elapsed:.2f} 秒（成功 {concurrent_ok}/{len(urls)}，"
+          f"全局并发 {args.concurrency}，单主机并发 {args.per_host}，"
+          f"新建连接 {concurrent_stats['connections']} 个）")
+
+    print(f"加速比: {serial_elapsed / concurrent_elapsed:.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+文章条目内存基准测试脚本
+解析一个大体积的模拟订阅源，对比每篇文章使用字典与 ParsedEntry 的内存占用
+"""
+import os
+import sys
+import argparse
+import tracemalloc
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import django
+
+# 设置 Django 环境
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.development')
+django.setup()
+
+from core.services.parser import RSSParser
+from utils.entries import ParsedEntry
+from scripts.bench_parser import build_rss
+
+
+def as_dict(entry: ParsedEntry) -> dict:
+    """与原先解析器输出一致的字典条目（内容哈希在入库时计算，这里一并保存以便公平比较）"""
+    return {
+        'title': entry.title,
+        'link': entry.link,
+        'author': entry.author,
+        'summary': entry.summary,
+        'content': entry.content,
+        'pub_date': entry.pub_date,
+        'guid': entry.guid,
+        'content_hash': entry.content_hash,
+    }
+
+
+def measure(build) -> float:
+    """返回构造结果后仍然占用的内存（MB）"""
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current / 1024 / 1024
+
+
+def main():
+    """主函数"""
+    arg_parser = argparse.ArgumentParser(description='文章条目内存基准测试')
+    arg_parser.add_argument('--items', type=int, default=10000, help='文章数量')
+    arg_parser.add_argument('--body-size', type=int, default=200, help='每篇文章正文字符数')
+    args = arg_parser.parse_args()
+
+    content = build_rss(args.items, args.body_size)
+    entries = RSSParser().parse(content)['entries']
+
+    # 字段字符串由两种表示共享，只统计容器本身的开销
+    dict_mb = measure(lambda: [as_dict(entry) for entry in entries])
+    slot_mb = measure(lambda: [ParsedEntry(*entry.as_tuple()) for entry in entries])
+    parse_mb = measure(lambda: RSSParser().parse(content))
+
+    print("=" * 80)
+    print(f"文章数: {len(entries)}，订阅源 {len(content) / 1024 / 1024:.1f} MB")
+    print("=" * 80)
+    print(f"字典条目:       {dict_mb:.2f} MB，每篇 {dict_mb * 1024 * 1024 / len(entries):.0f} 字节")
+    print(f"ParsedEntry:    {slot_mb:.2f} MB，每篇 {slot_mb * 1024 * 1024 / len(entries):.0f} 字节")
+    print(f"容器内存降低:   {1 - slot_mb / dict_mb:.0%}")
+    print(f"完整解析结果:   {parse_mb:.2f} MB（含字段字符串）")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+多进程解析基准测试脚本
+生成一批模拟订阅源，对比当前进程解析与不同进程数的进程池解析吞吐量
+"""
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import django
+
+# 设置 Django 环境
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.development')
+django.setup()
+
+from core.services import parse_pool
+from core.services.parser import RSSParser
+from scripts.bench_parser import build_rss
+
+
+def main():
+    """主函数"""
+    cpu_count = os.cpu_count() or 1
+    arg_parser = argparse.ArgumentParser(description='多进程解析基准测试')
+    arg_parser.add_argument('--feeds', type=int, default=32, help='订阅源数量')
+    arg_parser.add_argument('--items', type=int, default=50, help='每个订阅源的文章数量')
+    arg_parser.add_argument('--body-size', type=int, default=2000, help='每篇文章正文字符数')
+    arg_parser.add_argument(
+        '--workers', type=int, nargs='+',
+        default=sorted({1, 2, 4, cpu_count}), help='要测试的进程数列表',
+    )
+    args = arg_parser.parse_args()
+
+    jobs = [(build_rss(args.items, args.body_size), 'utf-8', None) for _ in range(args.feeds)]
+    total_mb = sum(len(content) for content, _, _ in jobs) / 1024 / 1024
+
+    print("=" * 80)
+    print(
+        f"订阅源: {args.feeds} 个，每个 {args.items} 篇文章，共 {total_mb:.1f} MB，"
+        f"CPU 核心: {cpu_count}"
+    )
+    print("=" * 80)
+
+    parser = RSSParser()
+    start = time.perf_counter()
+    for content, encoding, _ in jobs:
+        parser.parse(content, encoding)
+    baseline = time.perf_counter() - start
+    print(f"当前进程:   {baseline:.2f} 秒，{args.feeds / baseline:.1f} 个/秒")
+
+    for workers in args.workers:
+        # 预热：启动工作进程并完成模块导入，不计入耗时
+        parse_pool.parse_many(jobs[:workers], workers)
+        start = time.perf_counter()
+        parse_pool.parse_many(jobs, workers)
+        elapsed = time.perf_counter() - start
+        print(f"{workers:>2} 个进程: {elapsed:.2f} 秒，{args.feeds / elapsed:.1f} 个/秒，"
+              f"加速比 {baseline / elapsed:.1f}x")
+
+    parse_pool.shutdown_pool()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+"""
+订阅源解析基准测试脚本
+生成大体积的模拟 RSS/Atom/JSON Feed 文档，对比 feedparser 与专用解析器的耗时和内存峰值
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import django
+
+# 设置 Django 环境
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.development')
+django.setup()
+
+from core.services.parser import RSSParser
+from core.services import stream_parser
+
+
+def build_rss(items: int, body_size: int) -> bytes:
+    """生成模拟 RSS 2.0 文档"""
+    body = '<p>正文内容 <a href="https://example.com/">链接</a></p>' * max(1, body_size // 60)
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/">',
+        '<channel><title>基准测试</title><link>https://example.com/</link><description>bench</description>',
+    ]
+    for i in range(items):
+        parts.append(
+            f'<item><title>文章 {i}</title><link>https://example.com/article/{i}</link>'
+            f'<guid>https://example.com/article/{i}</guid>'
+            f'<pubDate>Mon, 06 Jan 2025 08:00:00 GMT</pubDate>'
+            f'<description><![CDATA[<p>摘要 {i}</p>]]></description>'
+            f'<content:encoded><![CDATA[{body}]]></content:encoded></item>'
+        )
+    parts.append('</channel></rss>')
+    return ''.join(parts).encode('utf-8')
+
+
+def build_atom(items: int, body_size: int) -> bytes:
+    """生成模拟 Atom 文档"""
+    body = (
+        '&lt;p&gt;正文内容 &lt;a href="https://example.com/"&gt;链接&lt;/a&gt;&lt;/p&gt;'
+        * max(1, body_size // 60)
+    )
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<feed xmlns="http://www.w3.org/2005/Atom"><title>基准测试</title>',
+        '<link href="https://example.com/"/>',
+    ]
+    for i in range(items):
+        parts.append(
+            f'<entry><title>文章 {i}</title><id>tag:example.com,2025:{i}</id>'
+            f'<link href="https://example.com/article/{i}"/>'
+            f'<published>2025-01-06T08:00:00Z</published>'
+            f'<summary>摘要 {i}</summary><content type="html">{body}</content></entry>'
+        )
+    parts.append('</feed>')
+    return ''.join(parts).encode('utf-8')
+
+
+def build_json(items: int, body_size: int) -> bytes:
+    """生成与 build_rss 内容相同的模拟 JSON Feed 文档"""
+    body = '<p>正文内容 <a href="https://example.com/">链接</a></p>' * max(1, body_size // 60)
+    return json.dumps({
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': '基准测试',
+        'home_page_url': 'https://example.com/',
+        'items': [
+            {
+                'id': f'https://example.com/article/{i}',
+                'url': f'https://example.com/article/{i}',
+                'title': f'文章 {i}',
+                'date_published': '2025-01-06T08:00:00Z',
+                'summary': f'摘要 {i}',
+                'content_html': body,
+            }
+            for i in range(items)
+        ],
+    }, ensure_ascii=False).encode('utf-8')
+
+
+def measure(parser: RSSParser, content: bytes, repeat: int):
+    """返回 (最短耗时秒数, 内存峰值 MB, 文章数)"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = parser.parse(content)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    result = None
+
+    tracemalloc.start()
+    result = parser.parse(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 1024 / 1024, len(result['entries'])
+
+
+def main():
+    """主函数"""
+    arg_parser = argparse.ArgumentParser(description='订阅源解析基准测试')
+    arg_parser.add_argument('--items', type=int, default=1000, help='文章数量')
+    arg_parser.add_argument('--body-size', type=int, default=2000, help='每篇文章正文字符数')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='重复次数（取最短耗时）')
+    args = arg_parser.parse_args()
+
+    slow = RSSParser(fast_path=False)
+    fast = RSSParser(fast_path=True)
+    backend = 'lxml' if stream_parser.HAS_LXML else 'xml.etree'
+
+    print("=" * 80)
+    print(f"文章数: {args.items}，正文: {args.body_size} 字符，流式解析后端: {backend}")
+    print("内存峰值由 tracemalloc 统计，只包含 Python 分配器上的内存（lxml 的 C 内存不计入）")
+    print("=" * 80)
+
+    for name, builder in (('RSS 2.0', build_rss), ('Atom', build_atom)):
+        content = builder(args.items, args.body_size)
+        slow_time, slow_peak, slow_count = measure(slow, content, args.repeat)
+        fast_time, fast_peak, fast_count = measure(fast, content, args.repeat)
+
+        print(f"{name}（{len(content) / 1024 / 1024:.1f} MB）")
+        print(
+            f"  feedparser: {slow_time:.2f} 秒，内存峰值 {slow_peak:.1f} MB，"
+            f"文章 {slow_count} 篇"
+        )
+        print(
+            f"  流式解析:   {fast_time:.2f} 秒，内存峰值 {fast_peak:.1f} MB，"
+            f"文章 {fast_count} 篇"
+        )
+        print(
+            f"  加速比: {slow_time / fast_time:.1f}x，"
+            f"内存峰值降低 {1 - fast_peak / slow_peak:.0%}"
+        )
+
+    # feedparser 6.0 不支持 JSON Feed，与相同内容的 RSS 文档的 feedparser 解析对比
+    rss_time, rss_peak, _ = measure(slow, build_rss(args.items, args.body_size), args.repeat)
+    content = build_json(args.items, args.body_size)
+    json_time, json_peak, json_count = measure(fast, content, args.repeat)
+    print(f"JSON Feed（{len(content) / 1024 / 1024:.1f} MB）")
+    print(f"  feedparser（同内容 RSS）: {rss_time:.2f} 秒，内存峰值 {rss_peak:.1f} MB")
+    print(f"  json 解析:  {json_time:.2f} 秒，内存峰值 {json_peak:.1f} MB，文章 {json_count} 篇")
+    print(f"  加速比: {rss_time / json_time:.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,14 @@
 """
 CloudFlare 代理工具
 用于通过 CloudFlare Worker 代理访问 RSS 订阅源
+
+ProxyPool 管理多个 Worker 域名：按权重随机或按最低延迟选择代理，
+根据抓取结果被动跟踪健康状态，连续失败的代理暂停使用一段时间。
 """
-from typing import Optional
+import random
+import threading
+import time
+from typing import Optional, List, Dict, Any, Iterable, Union
 
 
 def get_proxy_url(worker_domain: str, target_url: str) -> str:
@@ -54,3 +60,146 @@ class CloudFlareProxy:
     def is_enabled(self) -> bool:
         """检查代理是否启用"""
         return bool(self.worker_domain)
+
+
+STRATEGY_WEIGHTED = 'weighted'
+STRATEGY_LEAST_LATENCY = 'least_latency'
+
+
+class ProxyEndpoint:
+    """代理池中的一个 Worker 域名及其健康状态"""
+
+    def __init__(self, domain: str, weight: float = 1.0):
+        self.domain = domain.rstrip('/')
+        self.weight = weight
+        # 响应耗时的指数移动平均（秒），尚无样本时为 None
+        self.latency: Optional[float] = None
+        self.failures = 0
+        self.down_until = 0.0
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+
+    def get_url(self, target_url: str) -> str:
+        """获取代理 URL（保留目标 URL 的协议头，由 Worker 原样转发）"""
+        return f"{self.domain}/{target_url}"
+
+    def is_healthy(self, now: float) -> bool:
+        return now >= self.down_until
+
+
+class ProxyPool:
+    """
+    CloudFlare Worker 代理池（线程安全）
+
+    Args:
+        endpoints: 代理列表
+        strategy: weighted（按权重随机）或 least_latency（选择平均延迟 × 进行中请求数最小的代理）
+        failure_threshold: 连续失败多少次后暂停使用该代理
+        cooldown: 暂停时长（秒），到期后恢复选择，再次失败时重新暂停
+        latency_alpha: 延迟移动平均中新样本的权重
+    """
+
+    def __init__(
+        self,
+        endpoints: List[ProxyEndpoint],
+        strategy: str = STRATEGY_WEIGHTED,
+        failure_threshold: int = 3,
+        cooldown: float = 60,
+        latency_alpha: float = 0.3,
+    ):
+        if strategy not in (STRATEGY_WEIGHTED, STRATEGY_LEAST_LATENCY):
+            raise ValueError(f'不支持的代理选择策略: {strategy}')
+        self.endpoints = endpoints
+        self.strategy = strategy
+        self.failure_threshold = max(failure_threshold, 1)
+        self.cooldown = cooldown
+        self.latency_alpha = latency_alpha
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(
+        cls, domains: Iterable[Union[str, Dict[str, Any]]], **kwargs,
+    ) -> Optional['ProxyPool']:
+        """
+        根据配置创建代理池
+
+        Args:
+            domains: Worker 域名列表，元素为域名字符串或 {'domain': ..., 'weight': ...}
+            **kwargs: 传给 ProxyPool 的其他参数
+
+        Returns:
+            ProxyPool，没有配置域名时返回 None
+        """
+        endpoints = []
+        for item in domains or []:
+            if isinstance(item, str):
+                item = {'domain': item}
+            if item.get('domain'):
+                endpoints.append(ProxyEndpoint(item['domain'], float(item.get('weight', 1.0))))
+        return cls(endpoints, **kwargs) if endpoints else None
+
+    def select(self, required: bool = False) -> Optional[ProxyEndpoint]:
+        """
+        选择一个代理，选中的代理计入进行中请求数，请求结束后需调用 record_success / record_failure
+
+        Args:
+            required: 所有代理都暂停时是否仍返回最早恢复的代理
+
+        Returns:
+            ProxyEndpoint，所有代理都暂停且 required 为 False 时返回 None（调用方直连）
+        """
+        now = time.time()
+        with self.lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint.is_healthy(now)]
+            if not candidates:
+                if not required:
+                    return None
+                candidates = [min(self.endpoints, key=lambda endpoint: endpoint.down_until)]
+
+            if self.strategy == STRATEGY_LEAST_LATENCY:
+                # 没有样本的代理延迟按 0 计算，优先获得样本
+                endpoint = min(
+                    candidates,
+                    key=lambda e: ((e.latency or 0.0) * (e.in_flight + 1), e.in_flight),
+                )
+            else:
+                endpoint = random.choices(candidates, weights=[e.weight for e in candidates])[0]
+            endpoint.in_flight += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def record_success(self, endpoint: ProxyEndpoint, elapsed: float):
+        """代理正常返回响应（无论源站状态码），记录延迟并清除失败计数"""
+        with self.lock:
+            endpoint.in_flight = max(endpoint.in_flight - 1, 0)
+            endpoint.failures = 0
+            if endpoint.latency is None:
+                endpoint.latency = elapsed
+            else:
+                endpoint.latency += self.latency_alpha * (elapsed - endpoint.latency)
+
+    def record_failure(self, endpoint: ProxyEndpoint):
+        """连接代理失败或超时，连续失败达到阈值时暂停使用"""
+        with self.lock:
+            endpoint.in_flight = max(endpoint.in_flight - 1, 0)
+            endpoint.failures += 1
+            endpoint.errors += 1
+            if endpoint.failures >= self.failure_threshold:
+                endpoint.down_until = time.time() + self.cooldown
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """各代理的请求数、失败数、平均延迟和健康状态"""
+        now = time.time()
+        with self.lock:
+            return [
+                {
+                    'domain': endpoint.domain,
+                    'weight': endpoint.weight,
+                    'requests': endpoint.requests,
+                    'errors': endpoint.errors,
+                    'latency': endpoint.latency,
+                    'healthy': endpoint.is_healthy(now),
+                }
+                for endpoint in self.endpoints
+            ]
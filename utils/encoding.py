@@ -0,0 +1,102 @@
+"""
+订阅源编码检测工具
+按 BOM → XML 声明 → HTTP charset → UTF-8（开头不是合法 UTF-8 时为 GB18030）的顺序
+检测字节流编码，只检查文档开头，不解码全文
+"""
+import codecs
+import re
+from typing import Optional, Tuple
+
+# BOM 与对应编码，UTF-32 需要排在 UTF-16 之前
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+)
+
+# 常见的 GB 系列编码名都按超集 GB18030 解码，避免生僻字被丢弃
+GB_ALIASES = {'gb2312', 'gbk', 'gb_2312-80', 'x-gbk', 'cp936', 'euc-cn', 'csgb2312', 'ms936'}
+
+XML_DECLARATION_RE = re.compile(rb'^\s*<\?xml[^>]*?encoding\s*=\s*["\']([A-Za-z0-9._:-]+)["\']')
+
+# XML 声明只会出现在文档开头
+SNIFF_SIZE = 1024
+# 没有任何编码声明时，检查开头多少字节是否为合法 UTF-8
+UTF8_CHECK_SIZE = 4096
+FALLBACK_ENCODING = 'gb18030'
+
+
+def normalize_encoding(name: Optional[str]) -> Optional[str]:
+    """
+    规范化编码名称
+
+    Returns:
+        Python codecs 的标准名称，未知编码返回 None
+    """
+    if not name:
+        return None
+    name = name.strip().strip('"\'').lower()
+    if name in GB_ALIASES:
+        return 'gb18030'
+    try:
+        canonical = codecs.lookup(name).name
+    except LookupError:
+        return None
+    return 'gb18030' if canonical in GB_ALIASES else canonical
+
+
+def charset_from_content_type(content_type: Optional[str]) -> Optional[str]:
+    """从 Content-Type 头中提取 charset 参数，没有显式声明时返回 None"""
+    if not content_type:
+        return None
+    for param in content_type.split(';')[1:]:
+        key, _, value = param.partition('=')
+        if key.strip().lower() == 'charset' and value.strip():
+            return value.strip().strip('"\'')
+    return None
+
+
+def document_encoding(content: bytes) -> Optional[str]:
+    """文档自身声明的编码（BOM 或 XML 声明），没有声明时返回 None"""
+    for bom, encoding in BOMS:
+        if content.startswith(bom):
+            return encoding
+    match = XML_DECLARATION_RE.match(content[:SNIFF_SIZE])
+    if match:
+        return normalize_encoding(match.group(1).decode('ascii'))
+    return None
+
+
+def detect_encoding(content: bytes, http_charset: Optional[str] = None) -> Tuple[str, bool]:
+    """
+    检测订阅源字节流的编码
+
+    Args:
+        content: 订阅源内容字节流
+        http_charset: HTTP Content-Type 中显式声明的 charset
+
+    Returns:
+        tuple: (encoding, self_described) - self_described 为 True 表示文档本身
+        （BOM、XML 声明或默认的 UTF-8）就能确定该编码，XML 解析器可以直接处理原始字节
+    """
+    declared = document_encoding(content)
+    if declared:
+        return (declared, True)
+    encoding = normalize_encoding(http_charset)
+    if encoding:
+        return (encoding, encoding == 'utf-8')
+    if not _is_utf8_prefix(content):
+        # 没有任何声明且开头不是合法 UTF-8 时，按中文订阅源最常见的 GB18030 处理
+        return (FALLBACK_ENCODING, False)
+    return ('utf-8', True)
+
+
+def _is_utf8_prefix(content: bytes) -> bool:
+    """只检查文档开头是否为合法 UTF-8（末尾被截断的多字节字符不算错误）"""
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(content[:UTF8_CHECK_SIZE], final=False)
+    except UnicodeDecodeError:
+        return False
+    return True
@@ -0,0 +1,62 @@
+"""
+解析后的文章条目
+解析器为每篇文章生成一个 ParsedEntry，从解析、进程池传输一直用到入库，
+guid、内容哈希和 UTC 发布时间在构造时计算一次，不再为每篇文章创建字典。
+"""
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+from .html_cleaner import html_to_excerpt
+
+DEFAULT_TITLE = '无标题'
+
+
+def generate_content_hash(title, summary, content):
+    """生成文章内容的哈希值，用于检测内容变化"""
+    content_str = f"{title}|{summary}|{content}"
+    return hashlib.md5(content_str.encode('utf-8')).hexdigest()
+
+
+def date_from_struct(date_tuple) -> Optional[datetime]:
+    """把 feedparser 的 UTC 时间元组转换为带时区的 datetime，无效时返回 None"""
+    if date_tuple:
+        try:
+            return datetime(*date_tuple[:6], tzinfo=timezone.utc)
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+@dataclass(slots=True)
+class ParsedEntry:
+    """
+    解析后的文章条目
+
+    使用 __slots__ 存储，单条记录比等价的字典小得多；
+    guid 缺失时使用 link，标题为空时使用默认标题，content_hash 和 excerpt 未传入时自动计算。
+    """
+    title: str
+    link: str
+    guid: str = ''
+    author: str = ''
+    summary: str = ''
+    content: str = ''
+    pub_date: Optional[datetime] = None
+    content_hash: str = ''
+    excerpt: Optional[str] = None
+
+    def __post_init__(self):
+        self.title = self.title or DEFAULT_TITLE
+        self.guid = self.guid or self.link
+        if not self.content_hash:
+            self.content_hash = generate_content_hash(self.title, self.summary, self.content)
+        if self.excerpt is None:
+            self.excerpt = html_to_excerpt(self.summary or self.content)
+
+    def as_tuple(self) -> tuple:
+        """按字段顺序返回元组，用于进程间传输（ParsedEntry(*row) 可还原）"""
+        return (
+            self.title, self.link, self.guid, self.author, self.summary,
+            self.content, self.pub_date, self.content_hash, self.excerpt,
+        )
@@ -1,14 +1,29 @@
 """
 Feed 解析工具
-提供 RSS/Atom 订阅源的解析功能
+提供 RSS/Atom/RDF/JSON Feed 订阅源的格式检测和解析功能
 """
 import logging
-from typing import Dict, List, Optional, Any
-from datetime import datetime
+import re
+from typing import Dict, Optional, Any
 import feedparser
+from .encoding import detect_encoding
 
 logger = logging.getLogger(__name__)
 
+FORMAT_RSS = 'rss'
+FORMAT_ATOM = 'atom'
+FORMAT_RDF = 'rdf'
+FORMAT_JSON = 'json'
+FORMAT_UNKNOWN = 'unknown'
+
+# 根元素（去掉命名空间前缀后）对应的格式
+ROOT_FORMATS = {'rss': FORMAT_RSS, 'feed': FORMAT_ATOM, 'rdf': FORMAT_RDF}
+# 根元素通常出现在文档开头，只检查前 4KB
+SNIFF_SIZE = 4096
+COMMENT_RE = re.compile(r'<!--.*?-->', re.S)
+# 第一个开始标签（跳过 XML 声明、处理指令和 DOCTYPE）
+ROOT_TAG_RE = re.compile(r'<([A-Za-z_][\w.:-]*)')
+
 
 def parse_feed_url(url: str) -> Optional[Dict[str, Any]]:
     """
@@ -38,71 +53,40 @@ def parse_feed_url(url: str) -> Optional[Dict[str, Any]]:
         return None
 
 
-def parse_feed_content(content: bytes, encoding: str = 'utf-8') -> Optional[Dict[str, Any]]:
+def parse_feed_content(content: bytes, encoding: Optional[str] = None) -> Optional[Dict[str, Any]]:
     """
-    解析 Feed 内容
+    解析 Feed 内容（与抓取流程使用同一个解析器，按格式选择专用解析器）
 
     Args:
-        content: Feed 内容字节流
-        encoding: 内容编码
+        content: Feed 内容字节流（不需要预先解码）
+        encoding: HTTP 响应头声明的编码，文档没有 BOM 和 XML 声明时使用
 
     Returns:
-        解析后的数据字典
+        与 RSSParser.parse 相同的字典（title / description / link / entries），失败时返回 None
     """
-    try:
-        # 解码内容
-        if isinstance(content, bytes):
-            content_str = content.decode(encoding, errors='ignore')
-        else:
-            content_str = content
-
-        parsed = feedparser.parse(content_str)
-
-        return {
-            'feed': {
-                'title': parsed.feed.get('title', ''),
-                'description': parsed.feed.get('description', ''),
-                'link': parsed.feed.get('link', ''),
-            },
-            'entries': [
-                {
-                    'title': entry.get('title', ''),
-                    'link': entry.get('link', ''),
-                    'description': entry.get('description', ''),
-                    'summary': entry.get('summary', ''),
-                    'content': _get_content(entry),
-                    'author': entry.get('author', ''),
-                    'published': _parse_date(entry.get('published_parsed')),
-                    'updated': _parse_date(entry.get('updated_parsed')),
-                    'guid': entry.get('id', entry.get('link', '')),
-                }
-                for entry in parsed.entries
-            ],
-        }
+    from core.services.parser import RSSParser
 
-    except Exception as e:
-        logger.exception(f"解析 Feed 内容失败: {e}")
-        return None
+    return RSSParser().parse(content, encoding)
 
 
-def _get_content(entry: Dict) -> str:
-    """提取文章内容"""
-    if 'content' in entry:
-        content_list = entry.get('content', [])
-        if content_list and isinstance(content_list[0], dict):
-            return content_list[0].get('value', '')
-
-    return entry.get('summary', entry.get('description', ''))
+def sniff_feed_format(content: bytes, encoding: str = 'utf-8') -> str:
+    """
+    根据文档开头的根元素判断订阅源格式，只解码前 SNIFF_SIZE 字节
 
+    Args:
+        content: Feed 内容字节流
+        encoding: 文档编码
 
-def _parse_date(date_tuple) -> Optional[datetime]:
-    """解析日期元组"""
-    if date_tuple:
-        try:
-            return datetime(*date_tuple[:6])
-        except (TypeError, ValueError):
-            pass
-    return None
+    Returns:
+        Feed 类型（rss, atom, rdf, json 或 unknown）
+    """
+    head = content[:SNIFF_SIZE].decode(encoding, errors='ignore').lstrip('\ufeff \t\r\n')
+    if head.startswith('{'):
+        return FORMAT_JSON
+    match = ROOT_TAG_RE.search(COMMENT_RE.sub('', head))
+    if not match:
+        return FORMAT_UNKNOWN
+    return ROOT_FORMATS.get(match.group(1).rpartition(':')[2].lower(), FORMAT_UNKNOWN)
 
 
 def detect_feed_type(content: bytes) -> str:
@@ -113,15 +97,6 @@ def detect_feed_type(content: bytes) -> str:
         content: Feed 内容
 
     Returns:
-        Feed 类型（rss, atom, rdf, 或 unknown）
+        Feed 类型（rss, atom, rdf, json 或 unknown）
     """
-    content_str = content.decode('utf-8', errors='ignore').lower()
-
-    if '<rss' in content_str or '<rss:' in content_str:
-        return 'rss'
-    elif '<feed' in content_str or '<atom:' in content_str:
-        return 'atom'
-    elif '<rdf:' in content_str:
-        return 'rdf'
-    else:
-        return 'unknown'
+    return sniff_feed_format(content, detect_encoding(content)[0])
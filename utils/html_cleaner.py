@@ -0,0 +1,180 @@
+"""
+HTML 清理工具
+入库时对文章摘要和正文做一次清理：移除脚本、样式等不安全内容和非白名单标签/属性，
+合并空白字符并补全未闭合的标签；同一遍解析中收集纯文本，生成列表页使用的摘要预览。
+"""
+import re
+from html import escape
+from html.parser import HTMLParser
+from typing import List, Tuple
+
+DEFAULT_EXCERPT_LENGTH = 200
+
+# 允许保留的标签
+ALLOWED_TAGS = frozenset({
+    'a', 'abbr', 'acronym', 'address', 'article', 'aside', 'audio', 'b', 'bdi', 'bdo', 'big',
+    'blockquote', 'br', 'caption', 'center', 'cite', 'code', 'col', 'colgroup', 'dd', 'del',
+    'details', 'dfn', 'div', 'dl', 'dt', 'em', 'figcaption', 'figure', 'font', 'footer', 'h1',
+    'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'i', 'img', 'ins', 'kbd', 'li', 'mark', 'ol',
+    'p', 'picture', 'pre', 'q', 's', 'samp', 'section', 'small', 'source', 'span', 'strike',
+    'strong', 'sub', 'summary', 'sup', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'time',
+    'tr', 'tt', 'u', 'ul', 'var', 'video', 'wbr',
+})
+# 连同内容一起移除的标签
+DROP_CONTENT_TAGS = frozenset({
+    'script', 'style', 'iframe', 'frame', 'frameset', 'object', 'embed', 'applet', 'noscript',
+    'template', 'svg', 'math', 'head', 'title', 'textarea', 'select', 'button',
+})
+VOID_TAGS = frozenset({'area', 'br', 'col', 'hr', 'img', 'source', 'wbr'})
+# 生成纯文本时需要与前后文字隔开的块级标签
+BLOCK_TAGS = frozenset({
+    'address', 'article', 'aside', 'blockquote', 'br', 'caption', 'dd', 'details', 'div', 'dl',
+    'dt', 'figcaption', 'figure', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr',
+    'li', 'ol', 'p', 'pre', 'section', 'summary', 'table', 'td', 'th', 'tr', 'ul',
+})
+# 保留空白字符的标签
+PREFORMATTED_TAGS = frozenset({'pre'})
+
+ALLOWED_ATTRIBUTES = frozenset({
+    'abbr', 'align', 'alt', 'cite', 'colspan', 'controls', 'datetime', 'dir', 'height', 'href',
+    'hreflang', 'lang', 'loop', 'muted', 'poster', 'rowspan', 'scope', 'span', 'src', 'srcset',
+    'start', 'title', 'valign', 'width',
+})
+URL_ATTRIBUTES = frozenset({'href', 'src', 'cite', 'poster'})
+SAFE_SCHEMES = frozenset({'http', 'https', 'mailto', 'ftp'})
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_SCHEME_RE = re.compile(r'^([a-zA-Z][a-zA-Z0-9+.-]*):')
+_URL_NOISE_RE = re.compile(r'[\x00-\x20\x7f]+')
+
+
+def _safe_url(value: str) -> bool:
+    """相对地址和白名单协议的地址是安全的（忽略浏览器会跳过的空白和控制字符）"""
+    match = _SCHEME_RE.match(_URL_NOISE_RE.sub('', value))
+    return match is None or match.group(1).lower() in SAFE_SCHEMES
+
+
+class _Cleaner(HTMLParser):
+    """单遍 HTML 清理器，同时输出安全 HTML 和（截断所需长度的）纯文本"""
+
+    def __init__(self, text_limit: int):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.text: List[str] = []
+        self.text_size = 0
+        self.text_limit = text_limit
+        self.open_tags: List[str] = []
+        self.drop_tag = None
+        self.drop_depth = 0
+        self.pre_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if self.drop_tag is not None:
+            if tag == self.drop_tag:
+                self.drop_depth += 1
+            return
+        if tag in DROP_CONTENT_TAGS:
+            self.drop_tag = tag
+            self.drop_depth = 1
+            return
+        if tag in BLOCK_TAGS:
+            self._add_text(' ')
+        if tag not in ALLOWED_TAGS:
+            return
+
+        kept = []
+        for name, value in attrs:
+            if name not in ALLOWED_ATTRIBUTES:
+                continue
+            if value is None:
+                kept.append(f' {name}')
+                continue
+            if name in URL_ATTRIBUTES and not _safe_url(value):
+                continue
+            kept.append(f' {name}="{escape(value)}"')
+        self.parts.append(f'<{tag}{"".join(kept)}>')
+
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+            if tag in PREFORMATTED_TAGS:
+                self.pre_depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS and self.drop_tag is None:
+            # 自闭合的 <iframe/> 等没有内容，不能进入丢弃状态
+            return
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self.drop_tag is not None:
+            if tag == self.drop_tag:
+                self.drop_depth -= 1
+                if self.drop_depth == 0:
+                    self.drop_tag = None
+            return
+        if tag in BLOCK_TAGS:
+            self._add_text(' ')
+        if tag not in self.open_tags:
+            # 没有对应开始标签的结束标签直接丢弃
+            return
+        # 关闭到对应的开始标签为止，顺带补全中间未闭合的标签
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            if open_tag in PREFORMATTED_TAGS:
+                self.pre_depth -= 1
+            self.parts.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self.drop_tag is not None or not data:
+            return
+        if not self.pre_depth:
+            data = _WHITESPACE_RE.sub(' ', data)
+        self.parts.append(escape(data, quote=False))
+        self._add_text(data)
+
+    def _add_text(self, text: str):
+        if self.text_size <= self.text_limit:
+            self.text.append(text)
+            self.text_size += len(text)
+
+    def result(self) -> Tuple[str, str]:
+        self.close()
+        while self.open_tags:
+            self.parts.append(f'</{self.open_tags.pop()}>')
+        return ''.join(self.parts).strip(), _WHITESPACE_RE.sub(' ', ''.join(self.text)).strip()
+
+
+def truncate_text(text: str, length: int) -> str:
+    """按字符数截断纯文本，截断时追加省略号"""
+    if len(text) <= length:
+        return text
+    return text[:length].rstrip() + '...'
+
+
+def clean_html(html: str, excerpt_length: int = DEFAULT_EXCERPT_LENGTH) -> Tuple[str, str]:
+    """
+    清理 HTML 并生成纯文本摘要预览
+
+    Args:
+        html: 订阅源中的 HTML 片段
+        excerpt_length: 摘要预览的最大字符数
+
+    Returns:
+        tuple: (safe_html, excerpt) - 清理后的 HTML 和截断后的纯文本
+    """
+    if not html or not html.strip():
+        return ('', '')
+    # 多收集一些文字，保证合并空白后仍有足够的长度用于截断
+    cleaner = _Cleaner(excerpt_length * 2 + 64)
+    cleaner.feed(html)
+    safe_html, text = cleaner.result()
+    return (safe_html, truncate_text(text, excerpt_length))
+
+
+def html_to_excerpt(html: str, length: int = DEFAULT_EXCERPT_LENGTH) -> str:
+    """生成 HTML 片段的纯文本摘要预览"""
+    return clean_html(html, length)[1]